@@ -7,6 +7,7 @@ from urllib.parse import urljoin
 
 from django.conf import settings
 
+from common.rate_limit import BrokerTrafficGuard, INQUIRIES
 from common.designpatterns import SingletonClass
 from common.mixins import AdapterMixin
 from common.utils import DotDict
@@ -130,11 +131,11 @@ class FEPServerAdapterClass(SingletonClass, AdapterMixin):
 
     def get_access_token(self, vendor_code, ci):
         url = f'/api/v1/{vendor_code}/oauth'
-        return self.request(url, data={'ci_valu': ci})
+        return self.request_vendor(vendor_code, url, data={'ci_valu': ci})
 
     def register_third_party_agreement(self, vendor_code, ci):
         url = f'/api/v1/{vendor_code}/customer/third-party'
-        return self.request(url, data={'ci_valu': ci})
+        return self.request_vendor(vendor_code, url, data={'ci_valu': ci})
 
     def get_vendor_data(self, vendor_code, url, account_number, account_alias, ci, method, **data):
         data = {'acct_no': account_number, 'ci_valu': ci, **data}
@@ -142,7 +143,12 @@ class FEPServerAdapterClass(SingletonClass, AdapterMixin):
         if vendor_code == 'hanaw':
             data = {'acct_alias': account_alias, 'ci_valu': ci, **data}
 
-        return self.request(url, data=data, method=method)
+        return self.request_vendor(vendor_code, url, data=data, method=method)
+
+    def request_vendor(self, vendor_code, url, **kwargs):
+        # 증권사 호출은 vendor 단위 rate limit, circuit breaker 적용
+        guard = BrokerTrafficGuard(vendor_code=vendor_code, endpoint_class=INQUIRIES)
+        return guard.call(self.request, url, **kwargs)
 
 
 firmbanking_adapter = FirmbankingAdapterClass.instance()
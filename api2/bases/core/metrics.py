@@ -0,0 +1,318 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.core.cache import caches
+
+from common.caches import incr
+
+logger = logging.getLogger(__name__)
+
+# stage
+STAGE_FETCH_ACCOUNTS = "order_account_fetcher"
+STAGE_REGISTER_QUEUE = "register_queue"
+STAGE_EXECUTE_TWAP = "execute_twap"
+STAGE_SPLIT_EXECUTION = "split_execution"
+STAGE_BROKER = "broker_http"
+STAGE_INFOMAX = "infomax_http"
+STAGE_DB_WRITE = "db_write"
+
+OK = "ok"
+ERROR = "error"
+
+LABELS = ("stage", "name", "vendor", "position", "account", "outcome")
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRICS_PREFIX = "metrics"
+METRICS_TIMEOUT = 60 * 60 * 24  # 거래일 단위 집계
+METRICS_FLUSH_INTERVAL = 5  # seconds
+METRICS_MAX_ACCOUNT_SERIES = 10000  # 계좌 label series 상한
+METRICS_REGISTER_CHECK_INTERVAL = 60  # seconds, series 등록 여부 재확인 주기
+
+STAGE_INDEX = "stage"
+ACCOUNT_INDEX = "account"
+
+
+class MetricsCollector:
+    """
+    단계별 처리 시간, 처리 결과 집계(프로세스 내 버퍼 -> 공유 cache)
+
+    - 단계(stage), 세부 구분(name), vendor, position, 결과(ok/error) 별 count, sum, histogram
+    - 계좌(account) 별로는 count, sum 만 집계(series 수 제한)
+    - 가장 바깥 단계 종료 시, 혹은 METRICS_FLUSH_INTERVAL 마다 cache 로 flush
+      (celery worker 간 합산, metrics endpoint 에서 조회)
+    - series 등록은 series 별 cache.add + slot 번호 incr 로 원자적으로 처리
+      (worker 간 동시 flush 시 index 덮어쓰기 없음), 계좌 series 는 별도 index 에
+      max_account_series 개까지만 등록
+    - 프로세스 내 등록 여부는 재확인 주기(timeout 보다 짧게) 동안만 재사용,
+      이후 등록 키, slot 이 만료됐거나 slot 이 다른 series 로 바뀌었으면 재등록
+
+    usage:
+    with collector.timed(STAGE_BROKER, name="orders", vendor="kb") as labels:
+        resp = session.post(...)
+        labels["outcome"] = ERROR if resp.status_code >= 500 else OK
+    """
+
+    def __init__(
+        self,
+        cache=None,
+        prefix=METRICS_PREFIX,
+        timeout=METRICS_TIMEOUT,
+        max_account_series=METRICS_MAX_ACCOUNT_SERIES,
+    ):
+        self.cache = cache or caches["default"]
+        self.prefix = prefix
+        self.timeout = timeout
+        self.max_account_series = max_account_series
+        self._buffer = dict()
+        self._registered = dict()  # series: (등록 여부, 재확인 시각)
+        self.register_check_interval = min(METRICS_REGISTER_CHECK_INTERVAL, timeout / 2)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._flushed_at = time.monotonic()
+
+    def get_index_key(self, index, field):
+        return f"{self.prefix}:series:{index}:{field}"
+
+    def get_key(self, series, field):
+        return f"{self.prefix}:{'|'.join(series)}:{field}"
+
+    def register(self, series, with_buckets) -> bool:
+        """
+        series 를 index slot 에 등록, 등록 키에는 slot 번호(상한 초과 시 False) 저장
+
+        :return: 등록 여부, 계좌 index 상한 초과 시 False(해당 series 는 집계하지 않음)
+        """
+        now = time.monotonic()
+        registered = self._registered.get(series)
+        if registered is not None and now < registered[1]:
+            return registered[0]
+
+        index = STAGE_INDEX if with_buckets else ACCOUNT_INDEX
+        series_id = "|".join(series)
+        registered_key = self.get_key(series, "registered")
+        slot = self.cache.get(registered_key)
+        if slot and self.cache.get(self.get_index_key(index, slot)) != series_id:
+            # slot 만료 혹은 index size 만료 후 다른 series 가 같은 slot 에 등록된 경우
+            self.cache.delete(registered_key)
+            slot = None
+
+        if slot is None and self.cache.add(registered_key, 0, timeout=self.timeout):
+            slot = incr(self.cache, self.get_index_key(index, "size"), self.timeout)
+            if index == STAGE_INDEX or slot <= self.max_account_series:
+                self.cache.set(
+                    self.get_index_key(index, slot), series_id, timeout=self.timeout
+                )
+            else:
+                slot = False
+            self.cache.set(registered_key, slot, timeout=self.timeout)
+        elif slot is None:
+            # 다른 worker 가 등록 중(slot 0)이거나 등록 완료
+            slot = self.cache.get(registered_key, 0)
+
+        self._registered[series] = (
+            slot is not False,
+            now + self.register_check_interval,
+        )
+        return slot is not False
+
+    def observe(self, stage, duration, outcome=OK, **labels):
+        labels = {"stage": stage, "outcome": outcome, **labels}
+        series = tuple(str(labels.get(label) or "") for label in LABELS)
+        stage_series = series[:4] + ("",) + series[5:]
+
+        with self._lock:
+            if series == stage_series:
+                self._add(series, duration, with_buckets=True)
+            else:
+                self._add(series, duration, with_buckets=False)
+                self._add(stage_series, duration, with_buckets=True)
+
+        if time.monotonic() - self._flushed_at >= METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def _add(self, series, duration, with_buckets):
+        values = self._buffer.setdefault(
+            series,
+            {
+                "count": 0,
+                "sum_us": 0,
+                "buckets": [0] * len(LATENCY_BUCKETS),
+                "with_buckets": with_buckets,
+            },
+        )
+        values["count"] += 1
+        values["sum_us"] += int(duration * 1_000_000)
+        for i, le in enumerate(LATENCY_BUCKETS):
+            if duration <= le:
+                values["buckets"][i] += 1
+                break
+
+    def flush(self):
+        with self._lock:
+            buffer, self._buffer = self._buffer, dict()
+            self._flushed_at = time.monotonic()
+        if not buffer:
+            return
+
+        try:
+            for series, values in buffer.items():
+                if not self.register(series, values["with_buckets"]):
+                    continue
+
+                fields = {"count": values["count"], "sum_us": values["sum_us"]}
+                if values["with_buckets"]:
+                    fields.update(
+                        {
+                            f"bucket:{i}": count
+                            for i, count in enumerate(values["buckets"])
+                            if count
+                        }
+                    )
+                for field, delta in fields.items():
+                    incr(self.cache, self.get_key(series, field), self.timeout, delta)
+        except Exception as e:
+            # 집계 실패가 주문 처리에 영향을 주지 않도록 함
+            logger.warning(f"metrics flush failed: {e}")
+
+    @contextmanager
+    def timed(self, stage, **labels):
+        labels = {label: value for label, value in labels.items() if value is not None}
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        started = time.perf_counter()
+        try:
+            yield labels
+        except Exception:
+            labels["outcome"] = ERROR
+            raise
+        finally:
+            self._local.depth = depth
+            self.observe(
+                stage,
+                time.perf_counter() - started,
+                **{"outcome": OK, **labels},
+            )
+            if depth == 0:
+                self.flush()
+
+    def instrument(self, stage, **labels):
+        """timed decorator"""
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timed(stage, **labels):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def collect(self) -> list:
+        """
+        :return: [{"labels": {...}, "count": int, "sum": float, "buckets": [cumulative] | None}]
+        """
+        index = dict()
+        for index_name, with_buckets in ((STAGE_INDEX, True), (ACCOUNT_INDEX, False)):
+            size = self.cache.get(self.get_index_key(index_name, "size")) or 0
+            if index_name == ACCOUNT_INDEX:
+                size = min(size, self.max_account_series)
+            slot_keys = [
+                self.get_index_key(index_name, slot) for slot in range(1, size + 1)
+            ]
+            for series_id in self.cache.get_many(slot_keys).values():
+                index[series_id] = with_buckets
+
+        keys = []
+        for series_id, with_buckets in index.items():
+            series = tuple(series_id.split("|"))
+            keys += [self.get_key(series, "count"), self.get_key(series, "sum_us")]
+            if with_buckets:
+                keys += [
+                    self.get_key(series, f"bucket:{i}")
+                    for i in range(len(LATENCY_BUCKETS))
+                ]
+        values = self.cache.get_many(keys)
+
+        samples = []
+        for series_id, with_buckets in sorted(index.items()):
+            series = tuple(series_id.split("|"))
+            count = values.get(self.get_key(series, "count"))
+            if count is None:
+                continue
+
+            buckets = None
+            if with_buckets:
+                buckets, cumulative = [], 0
+                for i in range(len(LATENCY_BUCKETS)):
+                    cumulative += values.get(self.get_key(series, f"bucket:{i}"), 0)
+                    buckets.append(cumulative)
+            samples.append(
+                {
+                    "labels": dict(zip(LABELS, series)),
+                    "count": count,
+                    "sum": values.get(self.get_key(series, "sum_us"), 0) / 1_000_000,
+                    "buckets": buckets,
+                }
+            )
+        return samples
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        stage_lines, account_lines = [], []
+        for sample in self.collect():
+            if sample["buckets"] is None:
+                account_lines += format_sample(
+                    "oms_account_stage_duration_seconds", sample["labels"], sample
+                )
+                continue
+
+            labels = {k: v for k, v in sample["labels"].items() if k != "account"}
+            for le, count in zip(LATENCY_BUCKETS, sample["buckets"]):
+                stage_lines.append(
+                    format_line(
+                        "oms_stage_duration_seconds_bucket", {**labels, "le": le}, count
+                    )
+                )
+            stage_lines.append(
+                format_line(
+                    "oms_stage_duration_seconds_bucket",
+                    {**labels, "le": "+Inf"},
+                    sample["count"],
+                )
+            )
+            stage_lines += format_sample("oms_stage_duration_seconds", labels, sample)
+
+        lines = [
+            "# HELP oms_stage_duration_seconds Order pipeline stage duration",
+            "# TYPE oms_stage_duration_seconds histogram",
+            *stage_lines,
+            "# HELP oms_account_stage_duration_seconds Stage duration by account",
+            "# TYPE oms_account_stage_duration_seconds summary",
+            *account_lines,
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def format_line(metric, labels: dict, value) -> str:
+    label_str = ",".join(
+        '{}="{}"'.format(key, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, v in labels.items()
+        if v != ""
+    )
+    return f"{metric}{{{label_str}}} {value}"
+
+
+def format_sample(metric, labels: dict, sample: dict) -> list:
+    return [
+        format_line(f"{metric}_count", labels, sample["count"]),
+        format_line(f"{metric}_sum", labels, f"{sample['sum']:.6f}"),
+    ]
+
+
+collector = MetricsCollector()
+timed = collector.timed
+instrument = collector.instrument
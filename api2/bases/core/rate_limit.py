@@ -0,0 +1,16 @@
+from common.rate_limit import BrokerTrafficGuard as BaseBrokerTrafficGuard
+
+from api.bases.core.metrics import ERROR, STAGE_BROKER, timed
+
+
+class BrokerTrafficGuard(BaseBrokerTrafficGuard):
+    """common.rate_limit.BrokerTrafficGuard + 요청 처리 시간, 결과(5xx 는 error) 집계"""
+
+    def send(self, func, *args, **kwargs):
+        with timed(
+            STAGE_BROKER, name=self.endpoint_class, vendor=self.vendor_code
+        ) as labels:
+            resp = super().send(func, *args, **kwargs)
+            if self.is_failure(resp):
+                labels["outcome"] = ERROR
+            return resp
@@ -3,6 +3,7 @@ from django.contrib import admin
 from api.bases.accounts.admin import AccountNumberSearchMixin
 from api.bases.managements.models import (
     Queue,
+    QueueBasketLine,
     OrderLog,
     OrderReport,
     ErrorSet,
@@ -30,12 +31,25 @@ class OrderLogTabularInline(admin.TabularInline):
     ]
 
 
+class QueueBasketLineTabularInline(admin.TabularInline):
+    model = QueueBasketLine
+    ordering = ["id"]
+    can_delete = False
+    extra = 0
+    readonly_fields = QueueBasketLine.COLUMNS
+
+
 class OrderReportTabularInline(admin.TabularInline):
     model = OrderReport
     ordering = ["-created"]
     can_delete = False
     extra = 0
-    readonly_fields = ["order_id", "report_type", "title", "body", "config"]
+    readonly_fields = ["order_id", "report_type", "title", "rendered_body", "config"]
+
+    def rendered_body(self, obj):
+        return obj.render_body()
+
+    rendered_body.short_description = "body"
 
 
 @admin.register(Queue)
@@ -52,7 +66,11 @@ class OrderQueueAdmin(AccountNumberSearchMixin, admin.ModelAdmin):
     ]
     list_filter = ("status", "mode", "vendor_code")
 
-    inlines = [OrderLogTabularInline, OrderReportTabularInline]
+    inlines = [
+        QueueBasketLineTabularInline,
+        OrderLogTabularInline,
+        OrderReportTabularInline,
+    ]
 
     def get_readonly_fields(self, request, obj=None):
         if obj:
@@ -82,9 +100,15 @@ class OrderLogAdmin(AccountNumberSearchMixin, admin.ModelAdmin):
 
 @admin.register(OrderReport)
 class OrderReportAdmin(admin.ModelAdmin):
-    list_display = ["order_id", "report_type", "title", "body", "config"]
+    list_display = ["order_id", "report_type", "title", "config"]
     list_filter = ("report_type",)
-    readonly_fields = ("order",)
+    exclude = ("body",)
+    readonly_fields = ("order", "rendered_body")
+
+    def rendered_body(self, obj):
+        return obj.render_body()
+
+    rendered_body.short_description = "body"
 
 
 @admin.register(ErrorSet)
@@ -1,7 +1,21 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
 import requests
 import pandas as pd
 from typing import List
 from django.core.cache import caches
+from django.utils import timezone
+
+from api.bases.core.metrics import STAGE_INFOMAX, timed
+from api.bases.core.requests_with_retry import get_requests_retry_session
+
+logger = logging.getLogger(__name__)
+
+PRICE_SNAPSHOT_TIMEOUT = 60 * 60 * 24  # seconds
 
 
 class UnsupportedTicker(RuntimeError):
@@ -12,12 +26,44 @@ class UnsupportedTicker(RuntimeError):
         return self.value
 
 
+def get_seconds_until_midnight() -> int:
+    now = timezone.localtime()
+    midnight = (now + timedelta(days=1)).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    return max(int((midnight - now).total_seconds()), 1)
+
+
 class TickerStager:
+    """
+    infomax master, quote, close 조회
+
+    - 요청 symbols 를 page_size 단위로 나눠 동시 조회, 응답에 next 가 있으면 이어서 조회
+    - api_url 별 keep-alive 세션 재사용
+    - master(거래 가능 여부)는 당일 캐시
+      (price cache 는 주문 실행마다 flush_all 로 초기화되므로 default cache 사용)
+    """
+
     page_size = 100
+    max_workers = 4
+    timeout = (3.05, 10)  # (connect, read) seconds
+    master_cache = caches["default"]
+
+    _sessions = dict()
+    _sessions_lock = threading.Lock()
 
     def __init__(self, api_url):
         self._api_url = api_url
 
+    @property
+    def session(self) -> requests.Session:
+        with self._sessions_lock:
+            session = self._sessions.get(self._api_url)
+            if session is None:
+                session = get_requests_retry_session(retries=2, backoff_factor=0.5)
+                self._sessions[self._api_url] = session
+        return session
+
     def to_str(self, symbols: List[str]) -> str:
         if not isinstance(symbols, str):
             return ",".join(set(symbols))
@@ -29,31 +75,17 @@ class TickerStager:
         if symbols.empty:
             return pd.DataFrame().rename_axis("symbol")
 
-        master_df = pd.DataFrame(self.get_master(symbols=symbols))
-        if master_df.empty:
-            raise UnsupportedTicker(f"symbols({set(symbols)}) are unavailable assets")
-
-        master_df.set_index("symbol", inplace=True)
-
-        # tradable asset
-        row_indexer = (master_df["nationCode"] == "US") & master_df["expireDate"].isna()
-        master_df = master_df.loc[row_indexer, :]
-        if not symbols.isin(master_df.index).all():
-            raise UnsupportedTicker(
-                f"symbols({set(symbols) - set(master_df.index)}) are unavailable assets"
-            )
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            quote_future = executor.submit(self.get_quote, symbols=symbols)
+            master_df = self.get_tradable_master(symbols=symbols)
+            quote_df = pd.DataFrame(
+                quote_future.result(), columns=["symbol", "last"]
+            ).set_index("symbol")
 
-        quote_df = pd.DataFrame(self.get_quote(symbols=master_df.index)).set_index(
-            "symbol"
-        )
-        price_df = pd.merge(
-            left=master_df[["prevClose"]],
-            right=quote_df,
-            left_index=True,
-            right_index=True,
-            how="outer",
+        price_df = master_df[["prevClose"]].join(
+            quote_df.loc[~quote_df.index.duplicated(), "last"], how="left"
         )
-        price_sr = price_df.apply(func=self.calc_price, axis=1)
+        price_sr = price_df["last"].fillna(price_df["prevClose"]).astype(float)
         return price_sr.to_frame(name="price")
 
     def get_close_prices_on_date(self, symbols, date):
@@ -62,6 +94,16 @@ class TickerStager:
         if symbols.empty:
             return pd.DataFrame().rename_axis("symbol")
 
+        master_df = self.get_tradable_master(symbols=symbols)
+
+        close_data = self.get_close(symbols=master_df.index, date=date)
+        if not close_data:
+            raise ValueError(f"No data on {date}")
+
+        close_df = pd.DataFrame(close_data).set_index("symbol")
+        return close_df[["open", "last"]]
+
+    def get_tradable_master(self, symbols: pd.Index) -> pd.DataFrame:
         master_df = pd.DataFrame(self.get_master(symbols=symbols))
         if master_df.empty:
             raise UnsupportedTicker(f"symbols({set(symbols)}) are unavailable assets")
@@ -75,52 +117,67 @@ class TickerStager:
             raise UnsupportedTicker(
                 f"symbols({set(symbols) - set(master_df.index)}) are unavailable assets"
             )
+        return master_df
 
-        close_data = self.get_close(symbols=master_df.index, date=date)
-        if not close_data:
-            raise ValueError(f"No data on {date}")
-
-        close_df = pd.DataFrame(close_data).set_index("symbol")
-        return close_df[["open", "last"]]
-
-    def get_close(self, symbols, date=None) -> pd.DataFrame:
-        params = {"symbols": self.to_str(symbols), "page_size": self.page_size}
+    def get_close(self, symbols, date=None) -> list:
+        params = dict()
         if date is not None:
             params["date"] = date  # str, yyyymmdd | yyyy-mm-dd
+        return self.get_data(path="close", symbols=symbols, **params)
 
-        resp = requests.get(f"{self._api_url}/api/v1/infomax/close", params=params)
-        resp.raise_for_status()
-        return resp.json()["data"]
+    def get_master(self, symbols) -> list:
+        if isinstance(symbols, str):
+            symbols = symbols.split(",")
+        date = timezone.localdate().strftime("%Y%m%d")
+        keys = {f"master:{date}:{symbol}": symbol for symbol in set(symbols)}
+        cached = self.master_cache.get_many(list(keys))
 
-    def get_master(self, symbols) -> pd.DataFrame:
-        resp = requests.get(
-            f"{self._api_url}/api/v1/infomax/master",
-            params={"symbols": self.to_str(symbols), "page_size": self.page_size},
+        missed = {keys[key] for key in set(keys) - set(cached)}
+        data = self.get_data(path="master", symbols=missed)
+        self.master_cache.set_many(
+            {f"master:{date}:{item['symbol']}": item for item in data},
+            timeout=get_seconds_until_midnight(),
         )
-        resp.raise_for_status()
-        return resp.json()["data"]
+        return list(cached.values()) + data
 
-    def get_bid(self, symbols) -> pd.DataFrame:
-        resp = requests.get(
-            f"{self._api_url}/api/v1/infomax/bid",
-            params={"symbols": self.to_str(symbols), "page_size": self.page_size},
-        )
-        resp.raise_for_status()
-        return resp.json()["data"]
+    def get_bid(self, symbols) -> list:
+        return self.get_data(path="bid", symbols=symbols)
 
-    def get_quote(self, symbols) -> pd.DataFrame:
-        resp = requests.get(
-            f"{self._api_url}/api/v1/infomax/quote",
-            params={"symbols": self.to_str(symbols), "page_size": self.page_size},
-        )
-        resp.raise_for_status()
-        return resp.json()["data"]
+    def get_quote(self, symbols) -> list:
+        return self.get_data(path="quote", symbols=symbols)
+
+    def get_data(self, path, symbols, **params) -> list:
+        if isinstance(symbols, str):
+            symbols = symbols.split(",")
+        symbols = sorted(set(symbols))
+        chunks = [
+            symbols[i : i + self.page_size]
+            for i in range(0, len(symbols), self.page_size)
+        ]
+        if len(chunks) <= 1:
+            results = [self.get_pages(path, chunk, **params) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(chunks))
+            ) as executor:
+                results = executor.map(
+                    lambda chunk: self.get_pages(path, chunk, **params), chunks
+                )
+        return [item for data in results for item in data]
 
-    @staticmethod
-    def calc_price(row):
-        if pd.isna(row["last"]):
-            return float(row["prevClose"])
-        return float(row["last"])
+    def get_pages(self, path, symbols, **params) -> list:
+        url = f"{self._api_url}/api/v1/infomax/{path}"
+        params = {"symbols": self.to_str(symbols), "page_size": self.page_size, **params}
+
+        data = []
+        while url:
+            with timed(STAGE_INFOMAX, name=path):
+                resp = self.session.get(url, params=params, timeout=self.timeout)
+                resp.raise_for_status()
+            body = resp.json()
+            data.extend(body["data"])
+            url, params = body.get("next"), None
+        return data
 
 
 class CachedTickerStager(TickerStager):
@@ -145,7 +202,8 @@ class CachedTickerStager(TickerStager):
 
     @classmethod
     def flush_all(cls):
-        cls.cache.clear()
+        """가격 캐시(price)만 초기화, master/가격 스냅샷은 유지"""
+        CachedTickerStager.cache.clear()
 
     def checksum_symbols(self, symbols, prices):
         symbols = pd.Index(symbols)
@@ -156,3 +214,65 @@ class CachedTickerStager(TickerStager):
         raise UnsupportedTicker(
             f"Not supported symbols: {symbols[~symbol_exist_flags]}"
         )
+
+
+class PriceSnapshotStager(CachedTickerStager):
+    """
+    실행(run) 단위 가격 스냅샷
+
+    OrderAccountFetcher 실행 시 MP 유니버스 가격을 한 번 조회해 snapshot_id 로 저장하고,
+    하위 태스크는 같은 snapshot_id 의 가격을 사용
+    MP 외 보유 종목은 최초 조회 가격을 스냅샷에 추가(cache.add)해 이후 계좌도 같은 가격 사용
+    스냅샷은 default cache 에 저장(flush_all 로 price cache 를 초기화해도 실행 중인
+    하위 태스크의 스냅샷은 유지)
+
+    usage:
+    snapshot_id = PriceSnapshotStager.create_snapshot(api_url=api_url, symbols=universe)
+    PriceSnapshotStager(api_url=api_url, snapshot_id=snapshot_id).get_prices(symbols)
+    """
+
+    cache = caches["default"]
+
+    def __init__(self, api_url, snapshot_id):
+        super().__init__(api_url=api_url)
+        self.snapshot_id = snapshot_id
+
+    @classmethod
+    def create_snapshot(cls, api_url, symbols) -> str:
+        snapshot_id = f"{timezone.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        stager = cls(api_url=api_url, snapshot_id=snapshot_id)
+        prices = TickerStager.get_prices(stager, symbols=list(set(symbols)))
+        stager.add_prices(prices=prices)
+        logger.info(f"price snapshot({snapshot_id}) created: {len(prices)} symbols")
+        return snapshot_id
+
+    def get_key(self, symbol) -> str:
+        return f"snapshot:{self.snapshot_id}:{symbol}"
+
+    def add_prices(self, prices: pd.DataFrame):
+        for symbol, row in prices.iterrows():
+            self.cache.add(
+                self.get_key(symbol), row.to_dict(), timeout=PRICE_SNAPSHOT_TIMEOUT
+            )
+
+    def get_prices(self, symbols):
+        cached_prices = self.get_cached_last_prices(symbols=symbols)
+        missed = set(symbols) - set(cached_prices.index)
+        if missed:
+            last_prices = TickerStager.get_prices(self, symbols=list(missed))
+            self.add_prices(prices=last_prices)
+            # 동시에 추가된 경우 먼저 저장된 가격 사용
+            cached_prices = self.get_cached_last_prices(symbols=symbols)
+        self.checksum_symbols(symbols=symbols, prices=cached_prices)
+        return cached_prices
+
+    def get_cached_last_prices(self, symbols):
+        if isinstance(symbols, pd.Index):
+            symbols = symbols.to_list()
+        keys = {self.get_key(symbol): symbol for symbol in set(symbols)}
+        cached = self.cache.get_many(list(keys))
+        prices = pd.DataFrame(
+            {keys[key]: value for key, value in cached.items()}
+        ).transpose()
+        prices.index.name = "symbol"
+        return prices
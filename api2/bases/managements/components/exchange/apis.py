@@ -5,6 +5,8 @@ import requests
 
 from django.conf import settings
 
+from api.bases.core.rate_limit import BrokerTrafficGuard
+from common.rate_limit import EXCHANGE
 from api.bases.core.requests_with_retry import get_requests_retry_session_with_logging
 from api.bases.accounts.models import Account
 from api.bases.managements.components.exchange.currencies import ForeignCurrency
@@ -33,13 +35,20 @@ class AbstractExchangeAPI(ABC):
     def get_uri_by_function_name(cls, function_name: str) -> str:
         return f"{cls.host}{cls.paths[function_name]}"
 
+    @staticmethod
+    def get_guard(account: Account) -> BrokerTrafficGuard:
+        return BrokerTrafficGuard(
+            vendor_code=account.vendor_code, endpoint_class=EXCHANGE
+        )
+
     @classmethod
     def get_exchangeable_currencies(
         cls, account: Account
     ) -> AbstractAPIResultFromGetExchangeableCurrencies:
         """[TR] 환전 가능 금액 조회"""
 
-        response = get_requests_retry_session_with_logging().get(
+        response = cls.get_guard(account).call(
+            get_requests_retry_session_with_logging().get,
             cls.get_uri_by_function_name("exchange_apply"),
             params=cls._build_params_for_get_exchangeable_currencies(account),
         )
@@ -63,7 +72,8 @@ class AbstractExchangeAPI(ABC):
     ) -> AbstractAPIResultFromConvertUSDToKRW:
         """[TR] 환전 신청"""
 
-        response = get_requests_retry_session_with_logging().post(
+        response = cls.get_guard(account).call(
+            get_requests_retry_session_with_logging().post,
             cls.get_uri_by_function_name("exchange_apply"),
             json=cls._build_payload_for_convert_usd_to_krw(account, usd_currency),
         )
@@ -1,6 +1,7 @@
 from abc import ABC, abstractstaticmethod, abstractmethod
 from contextlib import contextmanager
 import logging
+from typing import Optional
 
 from tenacity import (
     retry,
@@ -61,6 +62,20 @@ class AbstractCurrencyExchanger(ABC):
         self._validate_account(self.account)
         return self.process_exchange(self.account)
 
+    def validate(self) -> None:
+        self._validate_account(self.account)
+
+    def process_without_retry(
+        self, usd_currency: Optional[ForeignCurrency] = None
+    ) -> CurrencyExchangerResult:
+        """
+        일괄 환전용, 재시도 없이 1회 처리(재시도는 호출 측에서 재예약)
+
+        :param usd_currency: 미리 조회한 환전 가능 금액, 없으면 조회
+        """
+        with self._process_exchange_contextmanager(self.account):
+            return self.exchange_if_possible(self.account, usd_currency=usd_currency)
+
     @abstractstaticmethod
     def _validate_account(account: Account) -> None:
         pass
@@ -89,7 +104,9 @@ class AbstractCurrencyExchanger(ABC):
         return self.exchange_if_possible(account)
 
     @abstractmethod
-    def exchange_if_possible(self, account: Account) -> CurrencyExchangerResult:
+    def exchange_if_possible(
+        self, account: Account, usd_currency: Optional[ForeignCurrency] = None
+    ) -> CurrencyExchangerResult:
         # Call self.get_exchangeable, self.exchange here.
         pass
 
@@ -175,14 +192,17 @@ class CurrencyExchangerForAccountBeingClosed(AbstractCurrencyExchanger):
         finally:
             self.save_account(account, previous_account_status)
 
-    def exchange_if_possible(self, account: Account) -> CurrencyExchangerResult:
+    def exchange_if_possible(
+        self, account: Account, usd_currency: Optional[ForeignCurrency] = None
+    ) -> CurrencyExchangerResult:
         """환전 처리
 
         환전 가능 금액 미보유 시 → account.status 변경 후 종료
         환전 가능 금액 보유 시 → 환전 신청
         """
         # 환전 가능 금액 조회
-        usd_currency = self.get_exchangeable(account)
+        if usd_currency is None:
+            usd_currency = self.get_exchangeable(account)
 
         # 환전 가능 금액 미보유 시 account.status 변경 후 종료
         try:
@@ -244,14 +264,17 @@ class CurrencyExchangerForAccountNormal(AbstractCurrencyExchanger):
         if account.status != Account.STATUS.normal:
             raise WrongTargetError
 
-    def exchange_if_possible(self, account: Account) -> CurrencyExchangerResult:
+    def exchange_if_possible(
+        self, account: Account, usd_currency: Optional[ForeignCurrency] = None
+    ) -> CurrencyExchangerResult:
         """환전 처리
 
         환전 가능 금액 미보유 시 → 종료
         환전 가능 금액 보유 시 → 환전 신청
         """
         # 환전 가능 금액 조회
-        usd_currency = self.get_exchangeable(account)
+        if usd_currency is None:
+            usd_currency = self.get_exchangeable(account)
 
         # 환전 가능 금액 미보유 시 종료
         try:
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod, abstractproperty
+from collections import Counter
 from functools import cached_property
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from api.bases.accounts.models import Account
 from api.bases.managements.components.exchange.currencies import ForeignCurrency
@@ -174,3 +175,67 @@ class CurrencyExchangerResultForCompleted(CurrencyExchangerResult):
             requested_amount=self.result.requested_amount,
             exchanged_amount=self.result.exchanged_amount,
         )
+
+
+@dataclass
+class CurrencyExchangerResultForFailed(CurrencyExchangerResult):
+    account: Account
+    error: Exception
+    is_retryable: bool = False
+
+    @property
+    def data(self):
+        return dict(
+            account_alias=self.account.account_alias,
+            error=f"{self.error.__class__.__name__}: {self.error}",
+            is_retryable=self.is_retryable,
+        )
+
+
+@dataclass
+class CurrencyExchangerBatchResult:
+    """일괄 환전 계좌별 결과 요약"""
+
+    vendor_code: str
+    attempt: int = 1
+    results: list = field(default_factory=list)
+    retry_account_aliases: list = field(default_factory=list)
+
+    def add(self, result: CurrencyExchangerResult) -> None:
+        self.results.append(result)
+        if isinstance(result, CurrencyExchangerResultForFailed) and result.is_retryable:
+            self.retry_account_aliases.append(result.account.account_alias)
+
+    @property
+    def data(self):
+        groups = dict(
+            completed=CurrencyExchangerResultForCompleted,
+            not_exchangeable=CurrencyExchangerResultForNotExchangeable,
+            failed=CurrencyExchangerResultForFailed,
+        )
+        return dict(
+            vendor_code=self.vendor_code,
+            attempt=self.attempt,
+            count=dict(
+                Counter(
+                    name
+                    for result in self.results
+                    for name, result_class in groups.items()
+                    if isinstance(result, result_class)
+                )
+            ),
+            exchanged_amount=sum(
+                result.result.exchanged_amount or 0
+                for result in self.results
+                if isinstance(result, CurrencyExchangerResultForCompleted)
+            ),
+            retry_account_aliases=self.retry_account_aliases,
+            **{
+                name: [
+                    result.data
+                    for result in self.results
+                    if isinstance(result, result_class)
+                ]
+                for name, result_class in groups.items()
+            },
+        )
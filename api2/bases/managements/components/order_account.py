@@ -1,17 +1,26 @@
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import pytz
 import requests
 from dateutil.relativedelta import relativedelta
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.core.cache import caches
 from django.utils import timezone
 from typing import List
 
+from api.bases.core.rate_limit import BrokerTrafficGuard
+from common.rate_limit import BrokerUnavailable, INQUIRIES, ORDERS
 from api.bases.managements.models import ASK, OrderLog, MAX_NOTE_SIZE
 from api.bases.managements.components.abc import (
     ABCOrderManagement,
     ABCOrderAccountProxy,
 )
+from api.bases.managements.components.order_log_writer import OrderLogWriter
+from api.bases.managements.components.trade_history import normalize_trade_history
 from common.exceptions import StopOrderOperation
 from common.decorators import cached_property
 
@@ -21,8 +30,67 @@ EXECUTED_ORDERS = "1"
 UNEXECUTED_ORDERS = "2"
 RA_CHANNEL_NAME = "RA(일임사)"
 
+ORDER_REQUEST_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+ORDER_REQUEST_MAX_WORKERS = 8
+ACCOUNT_SNAPSHOT_TTL = 60  # seconds
+
 logger = logging.getLogger(__name__)
 
+_vendor_sessions = dict()
+_vendor_sessions_lock = threading.Lock()
+
+
+def get_vendor_session(vendor_code, pool_maxsize=ORDER_REQUEST_MAX_WORKERS):
+    """
+    vendor 별 keep-alive 세션(프로세스 내 공유)
+    주문 API 는 중복 주문 방지를 위해 재시도하지 않음
+    """
+    with _vendor_sessions_lock:
+        session = _vendor_sessions.get(vendor_code)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _vendor_sessions[vendor_code] = session
+    return session
+
+
+class AccountSnapshot:
+    """
+    계좌별 증권사 조회 결과(잔고, 예수금, 평가, 거래내역) 캐시
+
+    TWAP 슬롯마다 ExecutionManagement 가 다시 생성되어도 TTL 내에는 같은 조회를 재사용
+    주문, 정정, 취소 요청 시 해당 계좌의 스냅샷은 삭제(invalidate)
+    """
+
+    cache = caches["default"]
+    KINDS = ["assets", "balances", "stocks", "trades"]
+
+    def __init__(self, vendor_code, account_number, ttl=ACCOUNT_SNAPSHOT_TTL):
+        self.vendor_code = vendor_code
+        self.account_number = account_number
+        self.ttl = ttl
+
+    def get_key(self, kind) -> str:
+        return f"account_snapshot:{self.vendor_code}:{self.account_number}:{kind}"
+
+    def get_or_fetch(self, kind, fetch):
+        """fetch 결과가 None 이면(조회 실패) 캐시하지 않고 다음 조회 시 다시 요청"""
+        if not self.ttl:
+            return fetch()
+
+        key = self.get_key(kind)
+        value = self.cache.get(key)
+        if value is None:
+            value = fetch()
+            if value is not None:
+                self.cache.set(key, value, timeout=self.ttl)
+        return value
+
+    def invalidate(self):
+        self.cache.delete_many([self.get_key(kind) for kind in self.KINDS])
+
 
 class OrderAccountProxy(ABCOrderAccountProxy):
     SHARES_COLUMNS = [
@@ -148,13 +216,20 @@ class OrderAccountProxy(ABCOrderAccountProxy):
         if self.is_ignore_personal_trade:
             return True
 
-        resp = self.requester.request_trade_history(
-            account_number=self.manager.account_number, executed_flag=ALL_ORDERS
-        )
-        if not resp:
+        def _get_trade_history():
+            resp = self.requester.request_trade_history(
+                account_number=self.manager.account_number, executed_flag=ALL_ORDERS
+            )
+            if not resp:
+                return None
+            return resp.json()
+
+        response = self.requester.get_snapshot(
+            self.manager.account_number
+        ).get_or_fetch("trades", _get_trade_history)
+        if response is None:
             return True
 
-        response = resp.json()
         trades = response.get("trades", [])
         if not trades:
             return True
@@ -223,13 +298,47 @@ class OrderRequester:
         "매도취소": OrderLog.TYPE.ASK_CANCEL,
     }
 
-    def __init__(self, api_base, vendor_code):
+    def __init__(
+        self,
+        api_base,
+        vendor_code,
+        max_workers=ORDER_REQUEST_MAX_WORKERS,
+        timeout=ORDER_REQUEST_TIMEOUT,
+        snapshot_ttl=ACCOUNT_SNAPSHOT_TTL,
+    ):
+        """
+        :param max_workers: 주문/정정/취소 동시 전송 수, 1 이면 순차 전송
+        :param timeout: 요청별 (connect, read) timeout
+        :param snapshot_ttl: 계좌 조회 결과 캐시 시간(AccountSnapshot), 0 이면 캐시 미사용
+        """
         self.api_base = api_base
         self.vendor_code = vendor_code
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.snapshot_ttl = snapshot_ttl
+        self.session = get_vendor_session(vendor_code)
+
+    def guard(self, endpoint_class) -> BrokerTrafficGuard:
+        return BrokerTrafficGuard(
+            vendor_code=self.vendor_code, endpoint_class=endpoint_class
+        )
+
+    def get_snapshot(self, account_number) -> AccountSnapshot:
+        return AccountSnapshot(
+            vendor_code=self.vendor_code,
+            account_number=account_number,
+            ttl=self.snapshot_ttl,
+        )
+
+    def invalidate_snapshots(self, account_numbers):
+        for account_number in set(account_numbers):
+            self.get_snapshot(account_number).invalidate()
 
     def request_base_amount(self, account_number):
-        resp = requests.get(
-            f"{self.api_base}/api/v1/{self.vendor_code}/accounts/{account_number}/amount/base"
+        resp = self.guard(INQUIRIES).call(
+            self.session.get,
+            f"{self.api_base}/api/v1/{self.vendor_code}/accounts/{account_number}/amount/base",
+            timeout=self.timeout,
         )
         return resp.json()
 
@@ -238,29 +347,24 @@ class OrderRequester:
             tz = pytz.timezone("America/New_York")
             from_date = timezone.now().astimezone(tz)
 
-        resp = requests.get(
+        resp = self.guard(INQUIRIES).call(
+            self.session.get,
             f"{self.api_base}/api/v1/{self.vendor_code}/accounts/{account_number}/execution",
             params={
                 "from_date": from_date.strftime("%Y%m%d"),
                 "to_date": timezone.localtime().strftime("%Y%m%d"),
                 "exec_sign": executed_flag,
             },
+            timeout=self.timeout,
         )
         return resp
 
     def get_trade_history(
         self, account_number, min_update_seconds, executed_flag=UNEXECUTED_ORDERS
     ):
-        tz_map = {
-            "KST": pytz.timezone("Asia/Seoul"),
-            "UTC": pytz.timezone("UTC"),
-            "USD": pytz.timezone("America/New_York"),
-        }
-
         tz = pytz.timezone("America/New_York")
         from_date = timezone.now().astimezone(tz)
 
-        trades_df = pd.DataFrame()
         old_delta = timezone.now() - relativedelta(seconds=min_update_seconds)
         resp = self.request_trade_history(
             account_number=account_number,
@@ -268,62 +372,36 @@ class OrderRequester:
             from_date=from_date,
         )
 
-        if resp.json().get("trades", None):
-            _trd_history = resp.json().get("trades")
-
-            for item in _trd_history:
-                currency_code = item.get("currency_code")
-                req_date = pd.to_datetime(
-                    item.get("order_date") + item.get("order_time"),
-                    format="%Y%m%d%H%M%S",
-                )
-
-                # Todo. 환율정보가 미국인경우 미국시간 맞춰 처리하도록 해놨으나 증시별로 구분필요.
-                if currency_code == "USD" and req_date.hour <= 14:
-                    req_date += relativedelta(days=1)
-
-                req_date = req_date.tz_localize(tz_map.get("KST"))
-                req_date = req_date.tz_convert(tz_map.get("UTC"))
-
-                item.update({"req_date": req_date})
-
-            trades_df = pd.DataFrame(_trd_history)
-            trades_df["order_time_tz"] = trades_df["order_time"].apply(
-                lambda x: timezone.now()
-                .strptime(from_date.strftime("%Y%m%d") + x, "%Y%m%d%H%M%S")
-                .astimezone(tz)
-                .strftime("%H%M%S")
-            )
-            trades_df["is_old"] = trades_df["req_date"] <= old_delta
-            trades_df["trd_type"] = trades_df["trade_sec_name"].apply(
-                lambda x: self.update_type_map.get(x)
-            )
-            trades_df["max_gap_pct"] = trades_df["trade_sec_name"].apply(
-                lambda x: 3 if "매수" in x else 5
-            )
+        trades_df = normalize_trade_history(
+            trades=resp.json().get("trades") or [],
+            from_date=from_date,
+            old_delta=old_delta,
+            update_type_map=self.update_type_map,
+        )
         return trades_df
 
     def get_account_assets(self, account_number):
-        resp = requests.get(
-            f"{self.api_base}/api/v1/{self.vendor_code}/accounts/{account_number}/assets"
+        return self.get_snapshot(account_number).get_or_fetch(
+            "assets", lambda: self._get_account_assets(account_number)
         )
 
-        _shares = []
-        resp.raise_for_status()
+    def _get_account_assets(self, account_number):
+        resp = self.guard(INQUIRIES).call(
+            self.session.get,
+            f"{self.api_base}/api/v1/{self.vendor_code}/accounts/{account_number}/assets",
+            timeout=self.timeout,
+        )
 
+        resp.raise_for_status()
         return resp.json()
 
     def get_account_stocks(self, account_number):
         # 해외 계좌 잔고 평가조회
-        resp = requests.get(
-            f"{self.api_base}/api/v1/{self.vendor_code}/accounts/{account_number}/evaluate/stocks",
-            params={"refe_curr_yn": 1},
+        _stocks = self.get_snapshot(account_number).get_or_fetch(
+            "stocks", lambda: self._get_account_stocks(account_number)
         )
 
         _shares_prices = []
-        resp.raise_for_status()
-
-        _stocks = resp.json().get("stocks")
         if _stocks is not None and isinstance(_stocks, list):
             _stocks = [item for item in _stocks if item.get("holding_qty") > 0]
             _shares_prices = [
@@ -338,17 +416,78 @@ class OrderRequester:
 
         return pd.DataFrame(_shares_prices, columns=self.SHARES_PRICES_COLUMNS)
 
+    def _get_account_stocks(self, account_number):
+        resp = self.guard(INQUIRIES).call(
+            self.session.get,
+            f"{self.api_base}/api/v1/{self.vendor_code}/accounts/{account_number}/evaluate/stocks",
+            params={"refe_curr_yn": 1},
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        return resp.json().get("stocks")
+
     def get_account_balances(self, account_number):
         # 계좌 잔고조회(TA-1001)
-        resp = requests.get(
-            f"{self.api_base}/api/v1/{self.vendor_code}/accounts/{account_number}/balances"
+        balances = self.get_snapshot(account_number).get_or_fetch(
+            "balances", lambda: self._get_account_balances(account_number)
         )
-        resp.raise_for_status()
-        balances = resp.json()
 
         # 외화 예수금 원화환산액이 있는경우(배당금) 순자산 평가금액에서 제외처리
         return balances.get("won_exchange_amt", 0)
 
+    def _get_account_balances(self, account_number):
+        resp = self.guard(INQUIRIES).call(
+            self.session.get,
+            f"{self.api_base}/api/v1/{self.vendor_code}/accounts/{account_number}/balances",
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    def _send_orders(self, method, payloads: List[dict]) -> list:
+        """
+        주문/정정/취소 요청을 max_workers 만큼 동시 전송
+
+        :return: payloads 순서의 응답, 통신 오류 시 requests.RequestException,
+                 rate limit 초과 혹은 차단(circuit open) 시 BrokerUnavailable
+        """
+        url = f"{self.api_base}/api/v1/{self.vendor_code}/accounts/order"
+        guard = self.guard(ORDERS)
+
+        def _send(payload):
+            try:
+                return guard.call(
+                    self.session.request,
+                    method,
+                    url,
+                    json=payload,
+                    timeout=self.timeout,
+                )
+            except (requests.RequestException, BrokerUnavailable) as e:
+                return e
+
+        if self.max_workers <= 1 or len(payloads) <= 1:
+            return [_send(payload) for payload in payloads]
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(payloads))
+        ) as executor:
+            return list(executor.map(_send, payloads))
+
+    @staticmethod
+    def _fail_order_log(order_log: OrderLog, resp, desc):
+        order_log.status = OrderLog.STATUS.failed
+        if isinstance(resp, (requests.RequestException, BrokerUnavailable)):
+            logger.warning(f"FAIL {desc}: {resp}")
+            error_msg = str(resp)
+        else:
+            logger.warning(f"FAIL {desc}: {resp.text}")
+            try:
+                error_msg = resp.json().get("msg")
+            except ValueError:
+                error_msg = resp.text
+        order_log.error_msg = str(error_msg)[:MAX_NOTE_SIZE]
+
     def cancel_orders(
         self, order_queue_id, updatable_orders_df: pd.DataFrame
     ) -> List[OrderLog]:
@@ -371,23 +510,25 @@ class OrderRequester:
             "req_date",
         ]
 
-        trd_target = updatable_orders_df
-
-        for item in trd_target[columns].to_dict(orient="records"):
-            order_log, is_created = OrderLog.objects.get_or_create(
-                order_id=order_queue_id,
-                code=item.get("code"),
-                type=item.get("trd_type"),
-                status=OrderLog.STATUS.on_hold,
-                order_price=item.get("price"),
-                market_price=item.get("market_price"),
-                currency_code=item.get("ex_code"),
-                shares=item.get("ord_qty"),
-            )
-
-            resp = requests.put(
-                f"{self.api_base}/api/v1/{self.vendor_code}/accounts/order",
-                json={
+        items = updatable_orders_df[columns].to_dict(orient="records")
+        order_log_writer = OrderLogWriter(order_queue_id=order_queue_id)
+        order_logs = order_log_writer.get_or_build(
+            lookups=[
+                dict(
+                    code=item.get("code"),
+                    type=item.get("trd_type"),
+                    order_price=item.get("price"),
+                    market_price=item.get("market_price"),
+                    currency_code=item.get("ex_code"),
+                    shares=item.get("ord_qty"),
+                )
+                for item in items
+            ],
+        )
+        responses = self._send_orders(
+            "put",
+            [
+                {
                     "account": item.get("account"),
                     "code": item.get("code"),
                     "price": item.get("price"),
@@ -395,23 +536,22 @@ class OrderRequester:
                     "ex_code": "US",
                     "update_type": item.get("update_type"),
                     "order_no": item.get("order_no"),
-                },
-            )
+                }
+                for item in items
+            ],
+        )
 
-            if is_created:
-                order_log.ordered_at = timezone.now()
+        for order_log, resp in zip(order_logs, responses):
+            order_log_writer.mark_ordered(order_log)
 
-            if resp:
-                resp = resp.json()
+            if isinstance(resp, requests.Response) and resp:
                 order_log.status = OrderLog.STATUS.completed
-                order_log.order_no = resp.get("order_no")
+                order_log.order_no = resp.json().get("order_no")
             else:
-                order_log.status = OrderLog.STATUS.failed
-                logger.warning(f"FAIL CANCEL ORDER: {resp.text}")
-                error_msg = resp.json().get("msg")
-                order_log.error_msg = str(error_msg)[:MAX_NOTE_SIZE]
-            order_log.save()
-            order_logs.append(order_log)
+                self._fail_order_log(order_log, resp, desc="CANCEL ORDER")
+
+        order_log_writer.flush()
+        self.invalidate_snapshots(item["account"] for item in items)
         return order_logs
 
     def update_orders(
@@ -448,20 +588,25 @@ class OrderRequester:
         if trd_target is None:
             return order_logs
 
-        for item in trd_target[columns].to_dict(orient="records"):
-            order_log, is_created = OrderLog.objects.get_or_create(
-                order_id=order_queue_id,
-                code=item.get("code"),
-                type=item.get("trd_type"),
-                status=OrderLog.STATUS.on_hold,
-                order_price=item.get("price"),
-                market_price=item.get("market_price"),
-                currency_code=item.get("ex_code"),
-                shares=item.get("ord_qty"),
-            )
-            resp = requests.put(
-                f"{self.api_base}/api/v1/{self.vendor_code}/accounts/order",
-                json={
+        items = trd_target[columns].to_dict(orient="records")
+        order_log_writer = OrderLogWriter(order_queue_id=order_queue_id)
+        order_logs = order_log_writer.get_or_build(
+            lookups=[
+                dict(
+                    code=item.get("code"),
+                    type=item.get("trd_type"),
+                    order_price=item.get("price"),
+                    market_price=item.get("market_price"),
+                    currency_code=item.get("ex_code"),
+                    shares=item.get("ord_qty"),
+                )
+                for item in items
+            ],
+        )
+        responses = self._send_orders(
+            "put",
+            [
+                {
                     "account": item.get("account"),
                     "code": item.get("code"),
                     "price": item.get("price"),
@@ -469,76 +614,72 @@ class OrderRequester:
                     "ex_code": "US",
                     "update_type": item.get("update_type"),
                     "order_no": item.get("order_no"),
-                },
-            )
-
-            if is_created:
-                order_log.ordered_at = timezone.now()
+                }
+                for item in items
+            ],
+        )
 
-            if resp:
-                resp = resp.json()
-                OrderLog.objects.filter(
-                    order_id=order_queue_id,
-                    code=item.get("code"),
-                    status=OrderLog.STATUS.processing,
-                ).update(status=OrderLog.STATUS.skipped)
+        for order_log, resp in zip(order_logs, responses):
+            order_log_writer.mark_ordered(order_log)
 
-                order_log.order_no = resp.get("order_no")
+            if isinstance(resp, requests.Response) and resp:
+                # 정정된 종목의 기존 진행중 주문은 건너뜀 처리
+                order_log_writer.skip_processing([order_log.code])
+                order_log.order_no = resp.json().get("order_no")
                 order_log.status = OrderLog.STATUS.processing
             else:
-                order_log.status = OrderLog.STATUS.failed
-                logger.warning(f"FAIL UPDATE ORDER: {resp.text}")
-                error_msg = resp.json().get("msg")
-                order_log.error_msg = str(error_msg)[:MAX_NOTE_SIZE]
-            order_log.save()
-            order_logs.append(order_log)
+                self._fail_order_log(order_log, resp, desc="UPDATE ORDER")
+
+        order_log_writer.flush()
+        self.invalidate_snapshots(item["account"] for item in items)
         return order_logs
 
     def request_orders(
         self, order_queue_id, order_book_table: pd.DataFrame
     ) -> List[OrderLog]:
-        order_logs = []
-        for item in order_book_table.to_dict(orient="records"):
-            order_log, is_created = OrderLog.objects.get_or_create(
-                order_id=order_queue_id,
-                code=item.get("code"),
-                type=OrderLog.TYPE.ASK_REGISTER
-                if item.get("trd_type") == ASK
-                else OrderLog.TYPE.BID_REGISTER,
-                status=OrderLog.STATUS.on_hold,
-                order_price=item.get("order_price"),
-                market_price=item.get("market_price"),
-                currency_code=item.get("ex_code"),
-                shares=item.get("ord_qty"),
-            )
-
-            resp = requests.post(
-                f"{self.api_base}/api/v1/{self.vendor_code}/accounts/order",
-                json={
+        items = order_book_table.to_dict(orient="records")
+        order_log_writer = OrderLogWriter(order_queue_id=order_queue_id)
+        order_logs = order_log_writer.get_or_build(
+            lookups=[
+                dict(
+                    code=item.get("code"),
+                    type=OrderLog.TYPE.ASK_REGISTER
+                    if item.get("trd_type") == ASK
+                    else OrderLog.TYPE.BID_REGISTER,
+                    order_price=item.get("order_price"),
+                    market_price=item.get("market_price"),
+                    currency_code=item.get("ex_code"),
+                    shares=item.get("ord_qty"),
+                )
+                for item in items
+            ],
+        )
+        responses = self._send_orders(
+            "post",
+            [
+                {
                     "account": item["account"],
                     "code": item["code"],
                     "price": item["order_price"],
                     "exchange_rate": item["exchange_rate"],
                     "trd_type": item["trd_type"],
                     "shares": item["ord_qty"],
-                },
-            )
+                }
+                for item in items
+            ],
+        )
 
-            if is_created:
-                order_log.ordered_at = timezone.now()
+        for order_log, resp in zip(order_logs, responses):
+            order_log_writer.mark_ordered(order_log)
 
-            if resp:
+            if isinstance(resp, requests.Response) and resp:
                 order_log.status = OrderLog.STATUS.processing
                 order_log.order_no = resp.json().get("order_no")
             else:
-                order_log.status = OrderLog.STATUS.failed
-                logger.warning(f"FAIL REQUEST ORDER: {resp.text}")
-                error_msg = resp.json().get("msg")
-                order_log.error_msg = str(error_msg)[:MAX_NOTE_SIZE]
-
-            order_log.save()
-            order_logs.append(order_log)
+                self._fail_order_log(order_log, resp, desc="REQUEST ORDER")
 
+        order_log_writer.flush()
+        self.invalidate_snapshots(item["account"] for item in items)
         return order_logs
 
 
@@ -0,0 +1,134 @@
+import logging
+import math
+from typing import List
+
+from django.utils import timezone
+
+from api.bases.core.metrics import STAGE_DB_WRITE, timed
+from api.bases.managements.models import OrderLog
+
+logger = logging.getLogger(__name__)
+
+BULK_BATCH_SIZE = 500
+
+# OrderLog.objects.get_or_create 조회 조건(order_id, status=on_hold 제외)
+LOOKUP_FIELDS = [
+    "code",
+    "type",
+    "order_price",
+    "market_price",
+    "currency_code",
+    "shares",
+]
+UPDATE_FIELDS = ["status", "order_no", "ordered_at", "error_msg", "modified"]
+
+
+class OrderLogWriter:
+    """
+    Queue 단위 OrderLog 일괄 저장
+
+    종목별 get_or_create + save 대신
+    - get_or_create: 대기중(on_hold) OrderLog 1회 조회 후 (order, code, type, status) 충돌 시 기존 로그 사용
+    - save: flush 시 신규 로그 bulk_create, 기존 로그 bulk_update
+    - ordered_at: 신규 로그만 주문 응답 시점으로 기록(get_or_create 의 is_created 와 같음)
+
+    usage:
+    writer = OrderLogWriter(order_queue_id=queue.id)
+    order_logs = writer.get_or_build(lookups=[{"code": "SPY", "type": ..., ...}])
+    ... (주문 요청 후 order_log.status, order_no, error_msg 설정)
+    writer.flush()
+    """
+
+    def __init__(self, order_queue_id):
+        self.order_queue_id = order_queue_id
+        self._buffer = []
+        self._skipped_codes = set()
+        self._lookup_statements = 0
+        self.statements = 0
+        self.saved_statements = 0
+
+    def get_or_build(self, lookups: List[dict]) -> List[OrderLog]:
+        on_hold_logs = dict()
+        for order_log in OrderLog.objects.filter(
+            order_id=self.order_queue_id,
+            status=OrderLog.STATUS.on_hold,
+            code__in={lookup["code"] for lookup in lookups},
+        ).order_by("id"):
+            on_hold_logs.setdefault(self.get_key(order_log), order_log)
+        self._lookup_statements += 1
+
+        order_logs = []
+        for lookup in lookups:
+            order_log = on_hold_logs.pop(self.get_key(lookup), None)
+            if order_log is None:
+                order_log = OrderLog(
+                    order_id=self.order_queue_id,
+                    status=OrderLog.STATUS.on_hold,
+                    **lookup,
+                )
+            order_logs.append(order_log)
+        self._buffer.extend(order_logs)
+        return order_logs
+
+    @staticmethod
+    def get_key(order_log) -> tuple:
+        if isinstance(order_log, dict):
+            return tuple(order_log[field] for field in LOOKUP_FIELDS)
+        return tuple(getattr(order_log, field) for field in LOOKUP_FIELDS)
+
+    @staticmethod
+    def is_created(order_log: OrderLog) -> bool:
+        return order_log.pk is None
+
+    def mark_ordered(self, order_log: OrderLog):
+        if self.is_created(order_log):
+            order_log.ordered_at = timezone.now()
+
+    def skip_processing(self, codes):
+        """flush 시 codes 의 진행중 OrderLog 를 건너뜀 처리(정정 주문으로 대체된 주문)"""
+        self._skipped_codes.update(codes)
+
+    def flush(self) -> int:
+        """
+        :return: 마지막 flush 이후 사용한 쿼리 수(조회 포함)
+        """
+        statements = self._lookup_statements
+        now = timezone.now()
+        new_order_logs = [o for o in self._buffer if self.is_created(o)]
+        old_order_logs = [o for o in self._buffer if not self.is_created(o)]
+        for order_log in old_order_logs:
+            order_log.modified = now
+
+        with timed(STAGE_DB_WRITE, name="order_log"):
+            if self._skipped_codes:
+                OrderLog.objects.filter(
+                    order_id=self.order_queue_id,
+                    code__in=self._skipped_codes,
+                    status=OrderLog.STATUS.processing,
+                ).update(status=OrderLog.STATUS.skipped)
+                statements += 1
+
+            if new_order_logs:
+                OrderLog.objects.bulk_create(new_order_logs, batch_size=BULK_BATCH_SIZE)
+                statements += math.ceil(len(new_order_logs) / BULK_BATCH_SIZE)
+
+            if old_order_logs:
+                OrderLog.objects.bulk_update(
+                    old_order_logs, UPDATE_FIELDS, batch_size=BULK_BATCH_SIZE
+                )
+                statements += math.ceil(len(old_order_logs) / BULK_BATCH_SIZE)
+
+        # 종목별 get_or_create(조회, 생성) + save + 건너뜀 처리 대비
+        per_row_statements = 3 * len(self._buffer) + len(self._skipped_codes)
+        saved_statements = max(per_row_statements - statements, 0)
+        self.statements += statements
+        self.saved_statements += saved_statements
+        logger.info(
+            f"OrderLog flush(order_id={self.order_queue_id}): "
+            f"created {len(new_order_logs)}, updated {len(old_order_logs)}, "
+            f"statements {statements}, saved {saved_statements}"
+        )
+
+        self._buffer, self._skipped_codes = [], set()
+        self._lookup_statements = 0
+        return statements
@@ -1,3 +1,4 @@
+from api.bases.core.metrics import STAGE_DB_WRITE, timed
 from api.bases.managements.models import Queue, OrderReport
 
 
@@ -30,8 +31,9 @@ class OrderReporter:
     def update_title(self, title):
         self._report.title = title
 
-    def write_body(self, data, desc=""):
-        self._report.write_body(data=data, desc=desc)
+    def write_body(self, data, desc="", section=None):
+        self._report.write_body(data=data, desc=desc, section=section)
 
     def save(self):
-        self._report.save()
+        with timed(STAGE_DB_WRITE, name="order_report"):
+            self._report.save()
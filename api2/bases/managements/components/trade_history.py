@@ -0,0 +1,67 @@
+from datetime import datetime
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pytz
+
+KST = pytz.timezone("Asia/Seoul")
+UTC = pytz.timezone("UTC")
+US_EASTERN = pytz.timezone("America/New_York")
+
+DATETIME_FORMAT = "%Y%m%d%H%M%S"
+NEXT_DAY_MAX_HOUR = 14  # USD 주문: 한국시간 14시 이전 주문은 다음날 주문일로 처리
+BID_MAX_GAP_PCT = 3
+ASK_MAX_GAP_PCT = 5
+
+
+def normalize_trade_history(
+    trades: List[dict], from_date, old_delta, update_type_map: dict
+) -> pd.DataFrame:
+    """
+    증권사 주문/체결 내역(trades) -> OrderRequester.get_trade_history DataFrame
+
+    종목별 pd.to_datetime, relativedelta, apply 대신 컬럼 단위로 계산
+    - req_date: 주문일시(KST -> UTC), USD 주문은 NEXT_DAY_MAX_HOUR 시 이전이면 다음날
+    - order_time_tz: from_date 기준 서버 로컬 시간 -> 미국 동부 시간(HHMMSS)
+    - is_old: req_date <= old_delta
+    - trd_type: update_type_map(trade_sec_name), 없는 경우 None
+    - max_gap_pct: 매수 3, 매도 5
+
+    :param from_date: 조회 기준일(America/New_York)
+    :param old_delta: 갱신 기준 일시(aware datetime)
+    """
+    trades_df = pd.DataFrame(trades)
+    if trades_df.empty:
+        return pd.DataFrame()
+
+    req_date = pd.to_datetime(
+        trades_df["order_date"] + trades_df["order_time"], format=DATETIME_FORMAT
+    )
+    # Todo. 환율정보가 미국인경우 미국시간 맞춰 처리하도록 해놨으나 증시별로 구분필요.
+    if "currency_code" in trades_df:
+        is_next_day = (trades_df["currency_code"] == "USD") & (
+            req_date.dt.hour <= NEXT_DAY_MAX_HOUR
+        )
+        req_date = req_date + pd.to_timedelta(is_next_day.astype(int), unit="D")
+    trades_df["req_date"] = req_date.dt.tz_localize(KST).dt.tz_convert(UTC)
+
+    # naive datetime.astimezone 과 같이 서버 로컬 시간으로 간주
+    local_tz = datetime.now().astimezone().tzinfo
+    trades_df["order_time_tz"] = (
+        pd.to_datetime(
+            from_date.strftime("%Y%m%d") + trades_df["order_time"],
+            format=DATETIME_FORMAT,
+        )
+        .dt.tz_localize(local_tz)
+        .dt.tz_convert(US_EASTERN)
+        .dt.strftime("%H%M%S")
+    )
+    trades_df["is_old"] = trades_df["req_date"] <= old_delta
+    trades_df["trd_type"] = trades_df["trade_sec_name"].map(update_type_map.get)
+    trades_df["max_gap_pct"] = np.where(
+        trades_df["trade_sec_name"].str.contains("매수", regex=False),
+        BID_MAX_GAP_PCT,
+        ASK_MAX_GAP_PCT,
+    )
+    return trades_df
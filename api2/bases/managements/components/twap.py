@@ -0,0 +1,67 @@
+import pandas as pd
+
+RA_ORDER_TOOL_NAME = "RA(일임사)"
+TRADE_SEC_POSITION_MAP = {"매도": "S", "매도정정": "S", "매수": "L", "매수정정": "L"}
+
+
+def calc_twap_order_basket(
+    order_basket: pd.DataFrame, traded_info: pd.DataFrame, order_type_to_plan: dict
+) -> pd.DataFrame:
+    """
+    TWAP 회차별 주문 수량 계산(ExecutionManagement.calc_order_basket)
+
+    - remaining_qty: 목표 수량(new_shares) - 당일 체결 수량(RA 주문, 같은 포지션)
+    - org_twap_qty: new_shares / 전체 회차, new_twap_qty: remaining_qty / (남은 회차 + 1)
+    - order_now_qty: min(max(org_twap_qty, new_twap_qty, min_qty), remaining_qty)
+
+    :param order_basket: ExecutionManagement.order_basket(new_shares), 컬럼이 추가됨
+    :param traded_info: 체결 내역(code, exec_qty, trade_sec_name, order_tool_name)
+    """
+    position = order_type_to_plan["position"]
+    long_short = 1 if position == "L" else -1
+    _remaining_order_count = order_type_to_plan["remaining_number_of_order"] + 1
+    _total_number_of_order = order_type_to_plan["total_number_of_order"]
+
+    if traded_info.empty:
+        order_basket["remaining_qty"] = order_basket["new_shares"]
+    else:
+        traded_info = traded_info.loc[
+            traded_info.order_tool_name.isin([RA_ORDER_TOOL_NAME])
+        ].reset_index(drop=True)
+        traded_info["trade_sec_name"] = traded_info["trade_sec_name"].map(
+            TRADE_SEC_POSITION_MAP
+        )
+
+        s_ticker_to_traded_qty = (
+            traded_info.query(f"trade_sec_name=='{position}'")
+            .groupby("code")
+            .sum("exec_qty")["exec_qty"]
+        )
+        s_ticker_to_traded_qty = s_ticker_to_traded_qty * long_short
+        order_basket["remaining_qty"] = order_basket["new_shares"].subtract(
+            s_ticker_to_traded_qty, fill_value=0
+        )
+
+    order_basket[["new_shares", "remaining_qty"]] = order_basket[
+        ["new_shares", "remaining_qty"]
+    ].abs()
+
+    order_basket["org_twap_qty"] = (
+        order_basket["new_shares"].div(_total_number_of_order).round(0).astype(int)
+    )
+    order_basket["new_twap_qty"] = (
+        order_basket["remaining_qty"].div(_remaining_order_count).round(0).astype(int)
+    )
+
+    order_basket["min_qty"] = order_type_to_plan["min_qty"]
+    order_basket["order_now_qty"] = order_basket[
+        ["org_twap_qty", "new_twap_qty", "min_qty"]
+    ].max(axis=1)
+    order_basket["order_now_qty"] = order_basket[["order_now_qty", "remaining_qty"]].min(
+        axis=1
+    )
+
+    order_basket[["new_shares", "remaining_qty", "order_now_qty"]] = (
+        order_basket[["new_shares", "remaining_qty", "order_now_qty"]] * long_short
+    )
+    return order_basket
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+
+from api.bases.managements.simulators.broker import (
+    DEFAULT_SYMBOLS,
+    SimulatorConfig,
+    create_server,
+)
+
+
+class Command(BaseCommand):
+    help = "Run local brokerage(TR_BACKEND) and infomax stand-in server for load tests"
+
+    def add_arguments(self, parser):
+        defaults = SimulatorConfig()
+        parser.add_argument("--host", type=str, default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=18080)
+        parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+        parser.add_argument(
+            "--latency-jitter-ms", type=float, default=defaults.latency_jitter_ms
+        )
+        parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+        parser.add_argument("--error-status", type=int, default=defaults.error_status)
+        parser.add_argument("--fill-rate", type=float, default=defaults.fill_rate)
+        parser.add_argument(
+            "--partial-fill-ratio", type=float, default=defaults.partial_fill_ratio
+        )
+        parser.add_argument(
+            "--price-volatility", type=float, default=defaults.price_volatility
+        )
+        parser.add_argument("--initial-cash", type=float, default=defaults.initial_cash)
+        parser.add_argument(
+            "--exchange-rate", type=float, default=defaults.exchange_rate
+        )
+        parser.add_argument("--symbols", type=str, default=",".join(DEFAULT_SYMBOLS))
+        parser.add_argument("--seed", type=int, default=defaults.seed)
+
+    def handle(self, *args, **options):
+        config = SimulatorConfig(
+            latency_ms=options["latency_ms"],
+            latency_jitter_ms=options["latency_jitter_ms"],
+            error_rate=options["error_rate"],
+            error_status=options["error_status"],
+            fill_rate=options["fill_rate"],
+            partial_fill_ratio=options["partial_fill_ratio"],
+            price_volatility=options["price_volatility"],
+            initial_cash=options["initial_cash"],
+            exchange_rate=options["exchange_rate"],
+            symbols=options["symbols"].split(","),
+            seed=options["seed"],
+        )
+        server = create_server(options["host"], options["port"], config)
+        self.stdout.write(
+            f"broker simulator listening on http://{options['host']}:{options['port']} "
+            f"({config})"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
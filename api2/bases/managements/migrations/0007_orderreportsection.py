@@ -0,0 +1,85 @@
+# Generated by Django 3.0.3 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("managements", "0006_queue_vendor_code"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="orderreport",
+            name="body",
+            field=models.TextField(default="", help_text="본문(기존 리포트)"),
+        ),
+        migrations.CreateModel(
+            name="OrderReportSection",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "section",
+                    models.CharField(
+                        choices=[
+                            ("basket", "주문 대상 종목"),
+                            ("order_book", "주문 장부"),
+                            ("updates", "정정 주문"),
+                            ("cancels", "취소 주문"),
+                            ("portfolio", "포트폴리오"),
+                            ("message", "메시지"),
+                        ],
+                        default="message",
+                        help_text="섹션 종류(basket: 주문 대상 종목, order_book: 주문 장부, updates: 정정 주문, cancels: 취소 주문, portfolio: 포트폴리오, message: 메시지)",
+                        max_length=16,
+                    ),
+                ),
+                (
+                    "desc",
+                    models.CharField(
+                        blank=True, default="", help_text="설명", max_length=200
+                    ),
+                ),
+                (
+                    "format",
+                    models.CharField(
+                        choices=[("table", "DataFrame"), ("text", "텍스트")],
+                        default="text",
+                        max_length=8,
+                    ),
+                ),
+                ("data", models.BinaryField(help_text="zlib 압축 JSON")),
+                (
+                    "written_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, help_text="작성 일시"
+                    ),
+                ),
+                (
+                    "report",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sections",
+                        to="managements.OrderReport",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="orderreportsection",
+            index=models.Index(
+                fields=["report", "section"], name="managements_report_section_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.0.3 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("managements", "0007_orderreportsection"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="queue",
+            index=models.Index(fields=["created"], name="queue_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="orderlog",
+            index=models.Index(fields=["created"], name="orderlog_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="erroroccur",
+            index=models.Index(
+                fields=["account_alias", "error"], name="erroroccur_account_error_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 3.0.3 on 2026-10-18 12:00
+
+import json
+
+from django.db import migrations, models
+import common.models
+import django.db.models.deletion
+
+COLUMNS = ["code", "shares", "new_shares", "krw_price", "usd_price", "buy_price"]
+
+
+def migrate_order_baskets(apps, schema_editor):
+    """기존 Queue.order_basket(JSON 문자열) -> QueueBasketLine"""
+    Queue = apps.get_model("managements", "Queue")
+    QueueBasketLine = apps.get_model("managements", "QueueBasketLine")
+
+    lines = []
+    queues = Queue.objects.exclude(order_basket__isnull=True).values_list(
+        "id", "order_basket"
+    )
+    for queue_id, order_basket in queues.iterator(chunk_size=1000):
+        if not order_basket:
+            continue
+        if isinstance(order_basket, str):
+            order_basket = json.loads(order_basket)
+        for row in order_basket or []:
+            lines.append(
+                QueueBasketLine(
+                    queue_id=queue_id,
+                    **{column: row.get(column) for column in COLUMNS},
+                )
+            )
+        if len(lines) >= 1000:
+            QueueBasketLine.objects.bulk_create(lines)
+            lines = []
+    QueueBasketLine.objects.bulk_create(lines)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("managements", "0008_monitor_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="queue",
+            name="order_basket",
+            field=common.models.JSONField(
+                blank=True,
+                default="",
+                editable=False,
+                help_text="OrderBasket(기존 주문, 신규 주문은 QueueBasketLine 사용)",
+                null=True,
+            ),
+        ),
+        migrations.CreateModel(
+            name="QueueBasketLine",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("code", models.CharField(help_text="종목코드", max_length=12)),
+                ("shares", models.IntegerField(default=0, help_text="목표수량")),
+                ("new_shares", models.IntegerField(default=0, help_text="주문수량")),
+                (
+                    "krw_price",
+                    models.FloatField(blank=True, help_text="가격(원화)", null=True),
+                ),
+                (
+                    "usd_price",
+                    models.FloatField(blank=True, help_text="가격(외화)", null=True),
+                ),
+                (
+                    "buy_price",
+                    models.FloatField(blank=True, help_text="구매가격(원화)", null=True),
+                ),
+                (
+                    "queue",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="basket_lines",
+                        to="managements.Queue",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="queuebasketline",
+            index=models.Index(
+                fields=["code", "queue"], name="basket_line_code_queue_idx"
+            ),
+        ),
+        migrations.RunPython(migrate_order_baskets, migrations.RunPython.noop),
+    ]
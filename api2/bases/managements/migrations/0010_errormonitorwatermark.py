@@ -0,0 +1,28 @@
+# Generated by Django 3.0.3 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("managements", "0009_queuebasketline"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ErrorMonitorWatermark",
+            fields=[
+                (
+                    "monitor_date",
+                    models.DateField(
+                        help_text="모니터링 일자", primary_key=True, serialize=False
+                    ),
+                ),
+                ("queue_id", models.BigIntegerField(default=0)),
+                ("orderlog_id", models.BigIntegerField(default=0)),
+                ("account_updated_at", models.DateTimeField(null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,5 +1,6 @@
 import json
-from django.db import models
+import zlib
+from django.db import models, transaction
 from model_utils.choices import Choices
 from model_utils.fields import StatusField
 from model_utils.models import TimeStampedModel
@@ -10,8 +11,8 @@ from api.bases.accounts.models import Account
 from common.models import JSONField
 from common.utils import gen_choice_desc
 from common.utils import get_local_today
+import numpy as np
 import pandas as pd
-from datetime import datetime
 from typing import List
 from django.utils import timezone
 
@@ -20,6 +21,43 @@ ASK = "01"
 BID = "02"
 
 MAX_NOTE_SIZE = 120
+BASKET_LINE_BATCH_SIZE = 1000
+
+
+class QueueManager(models.Manager):
+    def holding_ticker(self, code):
+        """주문 바스켓에 code 종목이 포함된 주문"""
+        return self.filter(basket_lines__code=code).distinct()
+
+    def get_order_baskets(self, queue_ids) -> dict:
+        """
+        :return: {queue_id: order_basket(DataFrame, index: code)}, 한 번의 조회로 묶어서 읽음
+        """
+        lines = pd.DataFrame(
+            QueueBasketLine.objects.filter(queue_id__in=queue_ids)
+            .order_by("queue_id", "id")
+            .values_list("queue_id", *QueueBasketLine.COLUMNS),
+            columns=["queue_id", *QueueBasketLine.COLUMNS],
+        )
+        return {
+            queue_id: basket.drop(columns="queue_id").set_index("code")
+            for queue_id, basket in lines.groupby("queue_id", sort=False)
+        }
+
+    def bulk_create_with_baskets(self, queues: list, **kwargs) -> list:
+        """bulk_create 는 save 를 호출하지 않으므로 바스켓 라인도 함께 저장"""
+        with transaction.atomic():
+            queues = self.bulk_create(queues, **kwargs)
+            lines = []
+            for queue in queues:
+                for line in getattr(queue, "_pending_basket_lines", []):
+                    line.queue = queue
+                    lines.append(line)
+                queue._pending_basket_lines = []
+            QueueBasketLine.objects.bulk_create(
+                lines, batch_size=BASKET_LINE_BATCH_SIZE
+            )
+        return queues
 
 
 class Queue(StatusCheckable, TimeStampedModel):
@@ -60,9 +98,18 @@ class Queue(StatusCheckable, TimeStampedModel):
     portfolio_id = models.CharField(max_length=20, null=True, blank=True)
     note = models.CharField(max_length=128, null=True, blank=True, help_text="예외사항 정보")
     order_basket = JSONField(
-        null=True, editable=False, blank=True, default="", help_text="OrderBasket"
+        null=True,
+        editable=False,
+        blank=True,
+        default="",
+        help_text="OrderBasket(기존 주문, 신규 주문은 QueueBasketLine 사용)",
     )
 
+    objects = QueueManager()
+
+    class Meta:
+        indexes = [models.Index(fields=["created"], name="queue_created_idx")]
+
     def set_order_basket(self, order_basket, note=""):
         if isinstance(order_basket, pd.DataFrame):
             if self.mode == self.MODES.bid:
@@ -78,16 +125,31 @@ class Queue(StatusCheckable, TimeStampedModel):
                     note = "기청산된 주문"
             else:
                 self.status = Queue.STATUS.on_hold
-
-                self.order_basket = json.dumps(
-                    order_basket.reset_index().to_dict(orient="records")
-                )
+                self._pending_basket_lines = QueueBasketLine.build_lines(order_basket)
         else:
             self.status = Queue.STATUS.canceled
 
         if note:
             self.note = note[:MAX_NOTE_SIZE]
 
+    def get_order_basket(self) -> pd.DataFrame:
+        """
+        :return: order_basket(index: code), 바스켓이 없으면 빈 DataFrame
+        basket_lines 를 prefetch 한 경우 추가 조회 없음
+        """
+        lines = [
+            {column: getattr(line, column) for column in QueueBasketLine.COLUMNS}
+            for line in self.basket_lines.all()
+        ]
+        if not lines and self.order_basket:
+            # QueueBasketLine 도입 이전 주문(JSON 문자열)
+            lines = self.order_basket
+            if isinstance(lines, str):
+                lines = json.loads(lines)
+        if not lines:
+            return pd.DataFrame()
+        return pd.DataFrame(lines).set_index("code")
+
     def __str__(self):
         return f"Queue({self.id}, {self.STATUS[self.status]}, {self.MODES[self.mode]})"
 
@@ -109,7 +171,60 @@ class Queue(StatusCheckable, TimeStampedModel):
             self.portfolio_id = (
                 portfolio_id if portfolio_id is not None else self.account.risk_type
             )
-        return super().save(*args, **kwargs)
+        pending_lines = getattr(self, "_pending_basket_lines", [])
+        with transaction.atomic():
+            result = super().save(*args, **kwargs)
+            if pending_lines:
+                self.basket_lines.all().delete()
+                for line in pending_lines:
+                    line.queue = self
+                QueueBasketLine.objects.bulk_create(
+                    pending_lines, batch_size=BASKET_LINE_BATCH_SIZE
+                )
+        self._pending_basket_lines = []
+        return result
+
+
+class QueueBasketLine(models.Model):
+    """주문 바스켓 종목별 라인(Queue.set_order_basket)"""
+
+    COLUMNS = ["code", "shares", "new_shares", "krw_price", "usd_price", "buy_price"]
+
+    queue = models.ForeignKey(
+        Queue, on_delete=models.CASCADE, related_name="basket_lines"
+    )
+    code = models.CharField(max_length=12, help_text="종목코드")
+    shares = models.IntegerField(default=0, help_text="목표수량")
+    new_shares = models.IntegerField(default=0, help_text="주문수량")
+    krw_price = models.FloatField(null=True, blank=True, help_text="가격(원화)")
+    usd_price = models.FloatField(null=True, blank=True, help_text="가격(외화)")
+    buy_price = models.FloatField(null=True, blank=True, help_text="구매가격(원화)")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["code", "queue"], name="basket_line_code_queue_idx")
+        ]
+
+    def __str__(self):
+        return f"QueueBasketLine({self.queue_id}, {self.code}, {self.new_shares})"
+
+    @classmethod
+    def build_lines(cls, order_basket: pd.DataFrame) -> list:
+        """:param order_basket: index 혹은 컬럼이 code 인 DataFrame"""
+        if "code" not in order_basket.columns:
+            order_basket = order_basket.rename_axis("code").reset_index()
+        lines = order_basket.reindex(columns=cls.COLUMNS)
+        records = lines.astype(object).where(lines.notna(), None).to_dict("records")
+        return [
+            cls(
+                **{
+                    **record,
+                    "shares": int(record["shares"] or 0),
+                    "new_shares": int(record["new_shares"] or 0),
+                }
+            )
+            for record in records
+        ]
 
 
 class OrderLogManager(models.Manager):
@@ -176,6 +291,9 @@ class OrderLog(StatusCheckable, TimeStampedModel):
         max_length=128, null=True, blank=True, help_text="에러 사유"
     )
 
+    class Meta:
+        indexes = [models.Index(fields=["created"], name="orderlog_created_idx")]
+
     def __str__(self):
         return f"OrderLog({self.id},{self.order.account.account_number},{self.TYPE[self.type]},{self.STATUS[self.status]})"
 
@@ -205,17 +323,129 @@ class OrderReport(TimeStampedModel):
         help_text=gen_choice_desc("리포트 종류", REPORT_TYPES),
     )
     title = models.CharField(default="", max_length=200, help_text="주문 리포트")
-    body = models.TextField(default="", help_text="본문")
+    body = models.TextField(default="", help_text="본문(기존 리포트)")
     config = JSONField(default={}, help_text="사용한 설정 값")
 
-    def write_body(self, data, desc=""):
-        if desc:
-            self.body += f"# {desc} at {datetime.now().isoformat()}\n"
+    def write_body(self, data, desc="", section=None):
+        """
+        본문을 OrderReportSection 으로 추가, save 시 신규 섹션만 일괄 저장
+        (본문 전체 재저장 없음, 텍스트 본문은 render_body 로 생성)
+        """
+        if not hasattr(self, "_pending_sections"):
+            self._pending_sections = []
+        self._pending_sections.append(
+            OrderReportSection.build(
+                data=data,
+                desc=desc,
+                section=section or OrderReportSection.SECTIONS.message,
+            )
+        )
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        pending_sections = getattr(self, "_pending_sections", [])
+        if pending_sections:
+            for section in pending_sections:
+                section.report = self
+            OrderReportSection.objects.bulk_create(pending_sections)
+            self._pending_sections = []
+
+    def render_body(self) -> str:
+        """기존 텍스트 본문 형식으로 변환(admin 조회용)"""
+        return self.body + "".join(
+            section.render() for section in self.sections.order_by("id")
+        )
+
+
+class OrderReportSection(models.Model):
+    SECTIONS = Choices(
+        ("basket", "주문 대상 종목"),
+        ("order_book", "주문 장부"),
+        ("updates", "정정 주문"),
+        ("cancels", "취소 주문"),
+        ("portfolio", "포트폴리오"),
+        ("message", "메시지"),
+    )
+    FORMATS = Choices(("table", "DataFrame"), ("text", "텍스트"))
+
+    report = models.ForeignKey(
+        OrderReport, on_delete=models.CASCADE, related_name="sections"
+    )
+    section = models.CharField(
+        max_length=16,
+        choices=SECTIONS,
+        default=SECTIONS.message,
+        help_text=gen_choice_desc("섹션 종류", SECTIONS),
+    )
+    desc = models.CharField(default="", blank=True, max_length=200, help_text="설명")
+    format = models.CharField(max_length=8, choices=FORMATS, default=FORMATS.text)
+    data = models.BinaryField(help_text="zlib 압축 JSON")
+    written_at = models.DateTimeField(default=timezone.now, help_text="작성 일시")
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["report", "section"], name="managements_report_section_idx"
+            )
+        ]
 
+    @classmethod
+    def build(cls, data, desc="", section=SECTIONS.message):
         if isinstance(data, pd.DataFrame):
-            self.body += data.to_string(float_format=lambda x: "%.3f" % x) + "\n\n"
+            payload = data.to_dict(orient="split")
+            payload["index_names"] = list(data.index.names)
+            payload["dtypes"] = data.dtypes.astype(str).tolist()
+            data_format = cls.FORMATS.table
         else:
-            self.body += str(data) + "\n\n"
+            payload = str(data)
+            data_format = cls.FORMATS.text
+
+        return cls(
+            section=section,
+            desc=desc,
+            format=data_format,
+            data=zlib.compress(
+                json.dumps(payload, default=cls.json_default).encode("utf-8")
+            ),
+        )
+
+    @staticmethod
+    def json_default(obj):
+        if isinstance(obj, np.generic):
+            return obj.item()
+        return str(obj)
+
+    def get_data(self):
+        """:return: DataFrame(table) 혹은 str(text)"""
+        payload = json.loads(zlib.decompress(bytes(self.data)).decode("utf-8"))
+        if self.format != self.FORMATS.table:
+            return payload
+
+        index_names = payload["index_names"]
+        if len(index_names) > 1:
+            index = pd.MultiIndex.from_tuples(
+                [tuple(i) for i in payload["index"]], names=index_names
+            )
+        else:
+            index = pd.Index(payload["index"], name=index_names[0])
+        df = pd.DataFrame(payload["data"], index=index, columns=payload["columns"])
+        for column, dtype in zip(df.columns, payload.get("dtypes", [])):
+            if dtype.startswith("datetime64"):
+                df[column] = pd.to_datetime(df[column])
+        return df
+
+    def render(self) -> str:
+        text = ""
+        if self.desc:
+            written_at = self.written_at
+            if timezone.is_aware(written_at):
+                written_at = timezone.localtime(written_at).replace(tzinfo=None)
+            text += f"# {self.desc} at {written_at.isoformat()}\n"
+
+        data = self.get_data()
+        if isinstance(data, pd.DataFrame):
+            return text + data.to_string(float_format=lambda x: "%.3f" % x) + "\n\n"
+        return text + data + "\n\n"
 
 
 class ErrorSet(models.Model):
@@ -260,6 +490,13 @@ class ErrorOccur(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["account_alias", "error"], name="erroroccur_account_error_idx"
+            )
+        ]
+
     def __str__(self):
         return f"{self.account_alias}({self.error_id})({self.error_occur_id})"
 
@@ -277,3 +514,16 @@ class ErrorSolved(models.Model):
 
     def __str__(self):
         return str(self.error_occur_id)
+
+
+class ErrorMonitorWatermark(models.Model):
+    """ErrorAccountMonitor 일자별 처리 위치(마지막으로 처리한 Queue, OrderLog id, 계좌 updated_at)"""
+
+    monitor_date = models.DateField(primary_key=True, help_text="모니터링 일자")
+    queue_id = models.BigIntegerField(default=0)
+    orderlog_id = models.BigIntegerField(default=0)
+    account_updated_at = models.DateTimeField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return str(self.monitor_date)
@@ -22,7 +22,8 @@ from api.bases.managements.components.order_table import (
     BID,
 )
 from api.bases.managements.components.state import QueueStatusContext
-from api.bases.managements.models import Queue, OrderLog
+from api.bases.managements.components.twap import calc_twap_order_basket
+from api.bases.managements.models import Queue, OrderLog, OrderReportSection
 from api.bases.managements.portfolio.price_engine import OrderPriceEngine
 from common.decorators import cached_property
 from common.exceptions import PreconditionFailed
@@ -125,76 +126,22 @@ class ExecutionManagement(ABCOrderManagement):
 
     @cached_property
     def order_basket(self):
-        _order_basket = self.order_queue.order_basket
-        if _order_basket:
-            _order_basket = pd.DataFrame(_order_basket).set_index("code")
+        _order_basket = self.order_queue.get_order_basket()
+        if not _order_basket.empty:
             _order_basket.update(self.get_prices(symbols=_order_basket.index))
-            return _order_basket
-        return pd.DataFrame(_order_basket)
+        return _order_basket
 
     def calc_order_basket(self, order_type_to_plan):
-        position = order_type_to_plan["position"]
-        long_short = 1 if position == "L" else -1
-        _remaining_order_count = order_type_to_plan["remaining_number_of_order"] + 1
-        _total_number_of_order = order_type_to_plan["total_number_of_order"]
         resp = self._proxy.requester.request_trade_history(
             account_number=self.account_number, executed_flag=EXECUTED_ORDERS
         )
         resp.raise_for_status()
-        df_traded_info = pd.DataFrame(resp.json()["trades"])
-
-        if df_traded_info.empty:
-            self.order_basket["remaining_qty"] = self.order_basket["new_shares"]
-        else:
-            df_traded_info = df_traded_info.loc[
-                df_traded_info.order_tool_name.isin(["RA(일임사)"])
-            ].reset_index(drop=True)
-            df_traded_info["trade_sec_name"] = df_traded_info["trade_sec_name"].map(
-                {"매도": "S", "매도정정": "S", "매수": "L", "매수정정": "L"}
-            )
-
-            s_ticker_to_traded_qty = (
-                df_traded_info.query(f"trade_sec_name=='{position}'")
-                .groupby("code")
-                .sum("exec_qty")["exec_qty"]
-            )
-            s_ticker_to_traded_qty = s_ticker_to_traded_qty * long_short
-            self.order_basket["remaining_qty"] = self.order_basket[
-                "new_shares"
-            ].subtract(s_ticker_to_traded_qty, fill_value=0)
-
-        self.order_basket[["new_shares", "remaining_qty"]] = self.order_basket[
-            ["new_shares", "remaining_qty"]
-        ].abs()
-
-        self.order_basket["org_twap_qty"] = (
-            self.order_basket["new_shares"]
-            .div(_total_number_of_order)
-            .round(0)
-            .astype(int)
-        )
-        self.order_basket["new_twap_qty"] = (
-            self.order_basket["remaining_qty"]
-            .div(_remaining_order_count)
-            .round(0)
-            .astype(int)
+        return calc_twap_order_basket(
+            order_basket=self.order_basket,
+            traded_info=pd.DataFrame(resp.json()["trades"]),
+            order_type_to_plan=order_type_to_plan,
         )
 
-        self.order_basket["min_qty"] = order_type_to_plan["min_qty"]
-        self.order_basket["order_now_qty"] = self.order_basket[
-            ["org_twap_qty", "new_twap_qty", "min_qty"]
-        ].max(axis=1)
-        self.order_basket["order_now_qty"] = self.order_basket[
-            ["order_now_qty", "remaining_qty"]
-        ].min(axis=1)
-
-        self.order_basket[["new_shares", "remaining_qty", "order_now_qty"]] = (
-            self.order_basket[["new_shares", "remaining_qty", "order_now_qty"]]
-            * long_short
-        )
-
-        return self.order_basket
-
     def route_orders(self, order_type_to_plan) -> list:
         order_logs = []
 
@@ -203,14 +150,22 @@ class ExecutionManagement(ABCOrderManagement):
                 self.status_context.transition(status=Queue.STATUS.completed)
                 return order_logs
 
-            self.reporter.write_body(data=self.order_basket, desc="주문 대상 종목")
+            self.reporter.write_body(
+                data=self.order_basket,
+                desc="주문 대상 종목",
+                section=OrderReportSection.SECTIONS.basket,
+            )
             order_now = self.calc_order_basket(order_type_to_plan)
             order_now["new_shares"] = order_now["order_now_qty"]
             order_book_table = self.create_order_book(
                 order_basket=order_now
             )  # 주문 장부 생성
 
-            self.reporter.write_body(data=order_book_table, desc="주문 장부")
+            self.reporter.write_body(
+                data=order_book_table,
+                desc="주문 장부",
+                section=OrderReportSection.SECTIONS.order_book,
+            )
 
             if order_book_table.has_orders_on_hold:
                 order_logs = self.execute_orders(order_book_table=order_book_table)
@@ -257,6 +212,7 @@ class ExecutionManagement(ABCOrderManagement):
             self.reporter.write_body(
                 data=updatable_orders_df,
                 desc=f"Update Orders at {datetime.now().isoformat()}",
+                section=OrderReportSection.SECTIONS.updates,
             )
             order_logs = self._proxy.requester.update_orders(
                 order_queue_id=self.order_queue.id,
@@ -292,6 +248,7 @@ class ExecutionManagement(ABCOrderManagement):
                 self.reporter.write_body(
                     data=cancelable_orders_df,
                     desc=f"Cancel Orders at {datetime.now().isoformat()}",
+                    section=OrderReportSection.SECTIONS.cancels,
                 )
                 order_logs = self._proxy.requester.cancel_orders(
                     order_queue_id=self.order_queue.id,
@@ -14,6 +14,7 @@ from api.bases.managements.portfolio.manager import PortfolioManager
 from api.bases.managements.portfolio.price_engine import OrderPriceEngine
 from api.bases.managements.models import Queue
 from api.bases.orders.models import Event
+from common.exceptions import PreconditionFailed
 
 logger = logging.getLogger(__name__)
 TR_BACKEND = settings.TR_BACKEND
@@ -222,6 +223,8 @@ class OrderManagement(ABCOrderManagement):
                 max_ord_base=self.max_ord_base,
                 asset_prices=self.prices,
                 emphasis=self.emphasis,
+                emphasis_options=self.strategies.get("emphasis_options"),
+                current_portfolio=self.current_portfolio,
             )
             setattr(self, "_rebalancing_portfolio", rebalancing_portfolio)
         return rebalancing_portfolio
@@ -239,6 +242,21 @@ class OrderManagement(ABCOrderManagement):
             setattr(self, "_order_basket", order_basket)
         return order_basket
 
+    def set_batch_result(self, batch_result):
+        """
+        BatchPortfolioManager 로 계산한 리밸런싱 포트폴리오, 주문 바스켓 사용
+        (testbed_krx_tickers 가 있는 계좌의 주문 바스켓은 개별 계산)
+        """
+        account_alias = self.account.account_alias
+        if account_alias in batch_result.errors:
+            raise PreconditionFailed(batch_result.errors[account_alias])
+
+        self._rebalancing_portfolio = batch_result.get_rebalancing_portfolio(
+            account_alias
+        )
+        if not self.testbed_krx_tickers:
+            self._order_basket = batch_result.get_order_basket(account_alias)
+
     @property
     def bid_order_basket(self):
         return self.order_basket.loc[self.order_basket.new_shares > 0]
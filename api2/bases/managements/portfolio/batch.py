@@ -0,0 +1,305 @@
+import logging
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from api.bases.managements.portfolio.manager import PortfolioManager
+from api.bases.managements.portfolio.price_engine import (
+    OrderPriceEngine,
+    OPTIMIZED_DEPOSIT_MAX_NODES,
+    OPTIMIZED_DEPOSIT_TIME_LIMIT,
+)
+from common.exceptions import PreconditionFailed
+
+logger = logging.getLogger(__name__)
+
+ORDER_BASKET_COLUMNS = ["shares", "new_shares", "krw_price", "usd_price", "buy_price"]
+
+
+class BatchOrderPriceEngine:
+    """
+    OrderPriceEngine emphasis 계산의 계좌 x 종목 행렬 버전
+
+    - bases: (계좌,) 주문 가능 금액(max_ord_base)
+    - weights, prices: (종목,) MP 비중, 원화 가격
+    - optimal_shares, prev_buy_price, prev_shares, is_held: (계좌, 종목)
+
+    :return: (계좌, 종목) 목표 수량, {계좌 위치: 오류 메시지}
+    """
+
+    @staticmethod
+    def calc_optimal_shares(bases, optimal_weight, universe_asset_price):
+        if not (universe_asset_price > 0).all():
+            raise PreconditionFailed(
+                f"Price validation error price must be greater than 0, "
+                f"{universe_asset_price[universe_asset_price <= 0]}"
+            )
+        return (bases[:, None] * optimal_weight[None, :]) / universe_asset_price[None, :]
+
+    @staticmethod
+    def emphasis_optimized_deposit(
+        bases,
+        prices,
+        optimal_shares,
+        max_nodes=OPTIMIZED_DEPOSIT_MAX_NODES,
+        time_limit=OPTIMIZED_DEPOSIT_TIME_LIMIT,
+        **kwargs,
+    ):
+        order_poss_shares = optimal_shares.astype(int)
+        budgets = bases - (order_poss_shares * prices[None, :]).sum(axis=1)
+        opt_shares = order_poss_shares.copy()
+        errors = {}
+
+        for i, budget in enumerate(budgets.tolist()):
+            picks, is_exhausted = OrderPriceEngine._search_max_spend(
+                prices=prices, budget=budget, max_nodes=max_nodes, time_limit=time_limit
+            )
+            if is_exhausted:
+                logger.warning(
+                    f"optimized_deposit search budget exceeded"
+                    f"(max_nodes={max_nodes}, time_limit={time_limit}), use best found"
+                )
+            if picks is not None:
+                opt_shares[i] += np.asarray(picks, dtype=opt_shares.dtype)
+
+            if (opt_shares[i] < 0).any() or (opt_shares[i] == 0).all():
+                errors[i] = f"unexpected calc shares: {opt_shares[i].tolist()}"
+        return opt_shares, errors
+
+    @staticmethod
+    def emphasis_weight_first(bases, weights, prices, optimal_shares, **kwargs):
+        s_qty = optimal_shares.astype(int)
+        cheapest_asset_price = prices.min()
+
+        # mp floating point error defense logic
+        s_mp = weights[weights > 0.0001]
+        assert round(s_mp.sum(), 5) == 1
+        s_mp = s_mp / s_mp.sum()
+
+        # prioritize items by score and weight difference
+        priority = np.lexsort((-prices[weights > 0.0001], -s_mp))
+        sorted_columns = np.flatnonzero(weights > 0.0001)[priority]
+
+        # round up items following priority
+        left_amt = bases - (s_qty * prices[None, :]).sum(axis=1)
+        for j in sorted_columns.tolist():
+            is_round_up = (left_amt >= cheapest_asset_price) & (
+                left_amt - prices[j] >= 0
+            )
+            s_qty[:, j] += is_round_up
+            left_amt = left_amt - is_round_up * prices[j]
+        return s_qty, {}
+
+    @staticmethod
+    def emphasis_strict_ratio(
+        bases, weights, prices, prev_buy_price, prev_shares, is_held, **kwargs
+    ):
+        max_ord_price = np.floor(bases[:, None] * weights[None, :]) - prev_buy_price
+        with np.errstate(invalid="ignore"):
+            new_shares = np.where(
+                max_ord_price == 0, 0.0, np.floor(max_ord_price / prices[None, :])
+            )
+        new_shares = np.where((max_ord_price < 0) & is_held, -prev_shares, new_shares)
+        return prev_shares + new_shares, {}
+
+    @staticmethod
+    def emphasis_min_deposit(
+        bases,
+        weights,
+        prices,
+        prev_buy_price,
+        prev_shares,
+        tot_buy_price,
+        allow_minus_gross=True,
+        **kwargs,
+    ):
+        is_poss_ord = tot_buy_price < bases
+        base_ord_price = np.floor(bases[:, None] * weights[None, :]) - prev_buy_price
+
+        # 계좌 방향으로는 벡터 연산, 종목 방향으로는 rest 를 이어받아 순서대로 계산
+        new_shares = np.zeros_like(base_ord_price)
+        rest = np.zeros(len(bases))
+        for j, price in enumerate(prices.tolist()):
+            max_ord_price = base_ord_price[:, j] + rest
+            new_shares[:, j] = np.floor(max_ord_price / price)
+            rest = max_ord_price - (new_shares[:, j] * price)
+
+        is_orderable = (is_poss_ord | allow_minus_gross)[:, None]
+        return prev_shares + np.where(is_orderable, new_shares, 0), {}
+
+
+@dataclass
+class BatchRebalancingResult:
+    bases: pd.Series
+    rebalancing_portfolio: pd.DataFrame
+    is_rebalancing_condition_met: pd.Series
+    order_baskets: pd.DataFrame
+    errors: dict = field(default_factory=dict)
+
+    def get_rebalancing_portfolio(self, account_alias) -> pd.DataFrame:
+        return self.rebalancing_portfolio.xs(account_alias, level="account_alias")
+
+    def get_order_basket(self, account_alias) -> pd.DataFrame:
+        return self.order_baskets.xs(account_alias, level="account_alias")
+
+
+class BatchPortfolioManager(PortfolioManager):
+    """
+    같은 MP(strategy_code, risk_type)로 운용되는 계좌들의 리밸런싱 포트폴리오, 리밸런싱 조건,
+    주문 바스켓을 한 번에 계산
+
+    usage:
+    bpm = BatchPortfolioManager(
+        price_engine=BatchOrderPriceEngine(), portfolio=port_data, asset_prices=prices
+    )
+    result = bpm.calc_batch_rebalancing(
+        bases=max_ord_bases, current_portfolios=current_portfolios, emphasis="min_deposit"
+    )
+    result.get_order_basket(account_alias)
+    """
+
+    def __init__(self, price_engine, portfolio, asset_prices: pd.DataFrame):
+        super().__init__(price_engine=price_engine, portfolio=portfolio)
+        self.asset_prices = asset_prices
+
+    def get_holdings(self, account_aliases, current_portfolios: dict):
+        if current_portfolios:
+            # pd.concat(dict) 의 MultiIndex 생성은 계좌 수에 대해 O(n^2) 이므로 직접 생성
+            frames = list(current_portfolios.values())
+            holdings = pd.concat(frames)
+            holdings.index = pd.MultiIndex.from_arrays(
+                [
+                    np.repeat(list(current_portfolios), [len(f) for f in frames]),
+                    holdings.index,
+                ],
+                names=["account_alias", "code"],
+            )
+        else:
+            holdings = pd.DataFrame(
+                columns=["buy_price", "shares", "evaluate_amount"],
+                index=pd.MultiIndex.from_tuples([], names=["account_alias", "code"]),
+            )
+        held_codes = holdings.index.get_level_values("code").unique()
+        codes = self.model_portfolio.index.append(
+            held_codes.difference(self.model_portfolio.index)
+        )
+        return {
+            column: holdings[column]
+            .unstack("code")
+            .reindex(index=account_aliases, columns=codes)
+            for column in ["buy_price", "shares", "evaluate_amount"]
+        }
+
+    def calc_batch_rebalancing(
+        self,
+        bases: pd.Series,
+        current_portfolios: dict,
+        emphasis="optimized_deposit",
+        emphasis_options=None,
+        slippage_threshold=0.05,
+        mode=None,
+    ) -> BatchRebalancingResult:
+        """
+        :param bases: 계좌별 주문 가능 금액(max_ord_base), index: account_alias
+        :param current_portfolios: {account_alias: current_portfolio(DataFrame)}
+        :param slippage_threshold: float 혹은 계좌별 pd.Series
+        """
+        account_aliases = bases.index
+        holdings = self.get_holdings(account_aliases, current_portfolios)
+        codes = holdings["shares"].columns
+        is_held = holdings["shares"].notna().to_numpy()
+        prev_buy_price = holdings["buy_price"].fillna(0).to_numpy(dtype=float)
+        prev_shares = holdings["shares"].fillna(0).to_numpy(dtype=float)
+        evaluate_amount = holdings["evaluate_amount"].fillna(0).to_numpy(dtype=float)
+
+        asset_prices = self.asset_prices.reindex(codes)
+        krw_price = asset_prices.krw_price.to_numpy(dtype=float)
+        base_values = bases.to_numpy(dtype=float)
+
+        # 1. 리밸런싱 포트폴리오(MP 비중 > 0 종목)
+        optimal_portfolio = self.model_portfolio[self.model_portfolio.weight > 0]
+        optimal_columns = codes.get_indexer(optimal_portfolio.index)
+        optimal_weight = optimal_portfolio.weight.to_numpy(dtype=float)
+        optimal_price = krw_price[optimal_columns]
+
+        optimal_shares = self._price_engine.calc_optimal_shares(
+            bases=base_values,
+            optimal_weight=optimal_weight,
+            universe_asset_price=optimal_price,
+        )
+        emphasis_func = getattr(self._price_engine, f"emphasis_{emphasis}")
+        rebalancing_shares, error_positions = emphasis_func(
+            bases=base_values,
+            weights=optimal_weight,
+            prices=optimal_price,
+            optimal_shares=optimal_shares,
+            prev_buy_price=prev_buy_price[:, optimal_columns],
+            prev_shares=prev_shares[:, optimal_columns],
+            is_held=is_held[:, optimal_columns],
+            tot_buy_price=prev_buy_price.sum(axis=1),
+            **(emphasis_options or {}),
+        )
+        rebalancing_weight = (
+            optimal_price[None, :] * rebalancing_shares / base_values[:, None]
+        )
+
+        # 2. 리밸런싱 조건 |RP - CP| > a
+        if not isinstance(slippage_threshold, pd.Series):
+            slippage_threshold = pd.Series(slippage_threshold, index=account_aliases)
+        thresholds = slippage_threshold.reindex(account_aliases).to_numpy(dtype=float)
+
+        current_weight = evaluate_amount / base_values[:, None]
+        slippage = -current_weight
+        slippage[:, optimal_columns] += rebalancing_weight
+        deposit_ratio_gap = np.abs(
+            current_weight.sum(axis=1) - rebalancing_weight.sum(axis=1)
+        )
+        is_asset_disparate = (np.abs(slippage) > thresholds[:, None]).any(axis=1)
+        is_deposit_disparate = deposit_ratio_gap > thresholds
+
+        # 3. 주문 바스켓(MP 종목 + 보유 종목)
+        target_shares = np.zeros_like(prev_shares)
+        if mode != "sell":
+            target_shares[:, optimal_columns] = rebalancing_shares
+
+        is_basket_row = is_held.copy()
+        is_basket_row[:, : len(self.model_portfolio.index)] = True
+
+        basket_index = pd.MultiIndex.from_product(
+            [account_aliases, codes], names=["account_alias", "code"]
+        )
+        order_baskets = pd.DataFrame(
+            {
+                "shares": target_shares.ravel(),
+                "new_shares": (target_shares - prev_shares).ravel(),
+                "krw_price": np.tile(krw_price, len(account_aliases)),
+                "usd_price": np.tile(
+                    asset_prices.usd_price.to_numpy(dtype=float), len(account_aliases)
+                ),
+                "buy_price": prev_buy_price.ravel(),
+            },
+            columns=ORDER_BASKET_COLUMNS,
+            index=basket_index,
+        )[is_basket_row.ravel()]
+
+        rebalancing_index = pd.MultiIndex.from_product(
+            [account_aliases, optimal_portfolio.index], names=["account_alias", "code"]
+        )
+        rebalancing_portfolio = pd.DataFrame(
+            {
+                "weight": rebalancing_weight.ravel(),
+                "shares": rebalancing_shares.ravel(),
+            },
+            index=rebalancing_index,
+        )
+
+        return BatchRebalancingResult(
+            bases=bases,
+            rebalancing_portfolio=rebalancing_portfolio,
+            is_rebalancing_condition_met=pd.Series(
+                is_asset_disparate | is_deposit_disparate, index=account_aliases
+            ),
+            order_baskets=order_baskets,
+            errors={account_aliases[i]: msg for i, msg in error_positions.items()},
+        )
@@ -60,7 +60,12 @@ class PortfolioManager:
         return is_deposit_disparate or is_asset_disparate
 
     def calc_rebalancing_portfolio(
-        self, max_ord_base, asset_prices, emphasis="optimized_deposit"
+        self,
+        max_ord_base,
+        asset_prices,
+        emphasis="optimized_deposit",
+        emphasis_options=None,
+        current_portfolio=None,
     ):
         optimal_portfolio = self.model_portfolio[self.model_portfolio.weight > 0].copy()
         krw_asset_price = asset_prices.krw_price
@@ -82,9 +87,11 @@ class PortfolioManager:
 
         rebalancing_portfolio.loc[:, "shares"] = emphasis_func(
             model_portfolio=self.model_portfolio,
+            current_portfolio=current_portfolio,
             universe_asset_price=universe_asset_krw_price,
             optimal_shares=optimal_shares,
             input_amount=max_ord_base,
+            **(emphasis_options or {}),
         )
         rebalancing_portfolio.loc[:, "weight"] = (
             krw_asset_price[rebalancing_portfolio.index]
@@ -1,5 +1,6 @@
 import logging
-from collections import deque
+import math
+import time
 
 import numpy as np
 import pandas as pd
@@ -8,6 +9,10 @@ from common.exceptions import PreconditionFailed
 
 logger = logging.getLogger(__name__)
 
+OPTIMIZED_DEPOSIT_MAX_NODES = 500000
+OPTIMIZED_DEPOSIT_TIME_LIMIT = 1.0  # seconds
+OPTIMIZED_DEPOSIT_AMOUNT_SCALE = 10_000  # 금액 비교 단위(0.0001원)
+
 
 class OrderPriceEngine:
     @staticmethod
@@ -54,85 +59,40 @@ class OrderPriceEngine:
 
     @staticmethod
     def emphasis_optimized_deposit(
-        universe_asset_price, optimal_shares, input_amount, **kwargs
+        universe_asset_price,
+        optimal_shares,
+        input_amount,
+        max_nodes=OPTIMIZED_DEPOSIT_MAX_NODES,
+        time_limit=OPTIMIZED_DEPOSIT_TIME_LIMIT,
+        **kwargs,
     ):
-        def calc_rest_if_buy(input, share, price):
-            return input - (share * price)
-
-        def cost_function(mp_shares, poss_shares):
-            price_weighted_share_gaps = universe_asset_price * (mp_shares - poss_shares)
-            return price_weighted_share_gaps.sum()
+        """
+        예수금 최적화 계산
 
+        종목별 내림/올림 수량 조합 중 투자금액을 넘지 않으면서 MP 대비 금액 차이가 가장 작은 조합을 찾는다.
+        max_nodes, time_limit 초과 시 그때까지 찾은 최선의 조합을 반환한다.
+        """
         if universe_asset_price.empty:
             raise PreconditionFailed("Price data is empty")
 
         universe_asset_price = universe_asset_price.loc[optimal_shares.index]
         order_poss_shares = optimal_shares.astype(int)
-        queue = deque()
-        queue.append(
-            [
-                0,
-                [order_poss_shares[0]],
-                calc_rest_if_buy(
-                    input=input_amount,
-                    share=order_poss_shares[0],
-                    price=universe_asset_price[0],
-                ),
-            ]
-        )
-        queue.append(
-            [
-                0,
-                [order_poss_shares[0] + 1],
-                calc_rest_if_buy(
-                    input=input_amount,
-                    share=order_poss_shares[0] + 1,
-                    price=universe_asset_price[0],
-                ),
-            ]
+        prices = universe_asset_price.to_numpy(dtype=float)
+
+        # 모든 종목 내림 수량 매수 후 남는 금액 안에서 올림(+1주)할 종목을 선택
+        budget = input_amount - float((order_poss_shares.to_numpy() * prices).sum())
+        picks, is_exhausted = OrderPriceEngine._search_max_spend(
+            prices=prices, budget=budget, max_nodes=max_nodes, time_limit=time_limit
         )
+        if is_exhausted:
+            logger.warning(
+                f"optimized_deposit search budget exceeded"
+                f"(max_nodes={max_nodes}, time_limit={time_limit}), use best found"
+            )
 
-        min_cost = input_amount
         opt_shares = order_poss_shares
-
-        while queue:
-            idx, _share, rest = queue.popleft()
-
-            if rest < 0:
-                pass
-
-            elif len(_share) < len(order_poss_shares):
-                queue.append(
-                    [
-                        idx + 1,
-                        _share + [order_poss_shares[idx + 1]],
-                        calc_rest_if_buy(
-                            input=rest,
-                            share=order_poss_shares[idx + 1],
-                            price=universe_asset_price[idx + 1],
-                        ),
-                    ]
-                )
-                queue.append(
-                    [
-                        idx + 1,
-                        _share + [order_poss_shares[idx + 1] + 1],
-                        calc_rest_if_buy(
-                            input=rest,
-                            share=order_poss_shares[idx + 1] + 1,
-                            price=universe_asset_price[idx + 1],
-                        ),
-                    ]
-                )
-
-            if len(_share) == len(order_poss_shares):
-                _share = pd.Series(_share, index=optimal_shares.index)
-                _cost = cost_function(mp_shares=optimal_shares, poss_shares=_share)
-
-                if rest > 0 and _cost < min_cost:
-                    min_cost = _cost
-                    min_rest = rest
-                    opt_shares = _share
+        if picks is not None:
+            opt_shares = order_poss_shares + pd.Series(picks, index=optimal_shares.index)
 
         if (opt_shares < 0).any() or (opt_shares == 0).all():
             raise PreconditionFailed(
@@ -140,6 +100,77 @@ class OrderPriceEngine:
             )
         return opt_shares
 
+    @staticmethod
+    def _search_max_spend(prices, budget, max_nodes, time_limit):
+        """
+        branch and bound: prices 중 일부를 골라 budget 미만에서 합계가 최대인 조합 탐색
+
+        금액은 OPTIMIZED_DEPOSIT_AMOUNT_SCALE 단위 정수로 비교해 합산 순서에 따른 부동소수점 오차가
+        동점 판단에 영향을 주지 않도록 한다. 합계가 같은 조합이 여럿이면 종목 순서대로 내림(0)을 우선한
+        조합(사전순 첫 조합)을 반환한다.
+
+        :return: (종목별 올림 여부 list 또는 None, 탐색 예산 초과 여부)
+        """
+        n = len(prices)
+        if budget <= 0:
+            return None, False
+
+        prices = [
+            round(price * OPTIMIZED_DEPOSIT_AMOUNT_SCALE) for price in prices.tolist()
+        ]
+        budget = math.ceil(budget * OPTIMIZED_DEPOSIT_AMOUNT_SCALE)
+
+        # remaining[i]: i 번째 이후 종목을 모두 올림했을 때 추가 금액(상한)
+        remaining = np.append(np.cumsum(prices[::-1])[::-1], 0).tolist()
+
+        # 탐색 예산 초과 시 반환할 초기 해(가격이 큰 종목부터 greedy 올림)
+        best_picks, best_spent = [0] * n, 0
+        for i in sorted(range(n), key=lambda x: -prices[x]):
+            if best_spent + prices[i] < budget:
+                best_picks[i] = 1
+                best_spent += prices[i]
+
+        state = dict(
+            best_picks=best_picks,
+            best_spent=best_spent,
+            is_heuristic=True,
+            nodes=0,
+            is_exhausted=False,
+        )
+        picks = [0] * n
+        deadline = time.monotonic() + time_limit if time_limit else None
+
+        def search(idx, spent):
+            if state["is_exhausted"] or spent >= budget:
+                return
+
+            state["nodes"] += 1
+            if (max_nodes and state["nodes"] > max_nodes) or (
+                deadline and state["nodes"] % 1024 == 0 and time.monotonic() > deadline
+            ):
+                state["is_exhausted"] = True
+                return
+
+            upper = spent + remaining[idx]
+            if upper < state["best_spent"] or (
+                upper == state["best_spent"] and not state["is_heuristic"]
+            ):
+                return
+
+            if idx == n:
+                state["best_picks"] = picks.copy()
+                state["best_spent"] = spent
+                state["is_heuristic"] = False
+                return
+
+            search(idx + 1, spent)
+            picks[idx] = 1
+            search(idx + 1, spent + prices[idx])
+            picks[idx] = 0
+
+        search(0, 0)
+        return state["best_picks"], state["is_exhausted"]
+
     @staticmethod
     def emphasis_weight_first(
         model_portfolio, universe_asset_price, optimal_shares, input_amount, **kwargs
@@ -185,108 +216,101 @@ class OrderPriceEngine:
             left_amt -= universe_asset_price[ticker]
         return s_qty.dropna()
 
+    @staticmethod
+    def _align_current_portfolio(model_portfolio, current_portfolio):
+        """
+        MP 종목 순서에 맞춘 현재 보유 매입금액, 수량, 보유 여부
+        """
+        if current_portfolio is None or current_portfolio.empty:
+            n = len(model_portfolio.index)
+            return np.zeros(n), np.zeros(n), np.zeros(n, dtype=bool)
+
+        aligned = current_portfolio.reindex(model_portfolio.index)
+        is_held = model_portfolio.index.isin(current_portfolio.index)
+        return (
+            aligned["buy_price"].fillna(0).to_numpy(dtype=float),
+            aligned["shares"].fillna(0).to_numpy(dtype=float),
+            is_held,
+        )
+
     @staticmethod
     def emphasis_strict_ratio(
-        model_portfolio, current_portfolio, input_amount, universe_asset_price, **kwargs
+        model_portfolio,
+        input_amount,
+        universe_asset_price,
+        current_portfolio=None,
+        **kwargs,
     ):
         """
         비중 우선 계산
         :param df: 포트폴리오(pd.DataFrame)
-        :return: pd.DataFrame
+        :return: pd.Series
         """
-        portfolio_df = model_portfolio.copy()
-        current_portfolio_map = current_portfolio.to_dict()
-        krw_price_map = universe_asset_price.to_dict()
-
-        for index, row in portfolio_df.iterrows():
-            max_ord_price = np.floor(
-                input_amount * row["weight"]
-            ) - current_portfolio_map["buy_price"].get(index, 0)
-            portfolio_df.loc[index, "new_shares"] = np.floor(
-                max_ord_price / krw_price_map.get(index)
-            )
+        prev_buy_price, prev_shares, is_held = OrderPriceEngine._align_current_portfolio(
+            model_portfolio=model_portfolio, current_portfolio=current_portfolio
+        )
+        weight = model_portfolio["weight"].to_numpy(dtype=float)
+        krw_price = universe_asset_price.reindex(model_portfolio.index).to_numpy(
+            dtype=float
+        )
 
-            if max_ord_price < 0:
-                portfolio_df.loc[index, "new_shares"] = -(
-                    current_portfolio_map["shares"].get(
-                        index, -portfolio_df.loc[index, "new_shares"]
-                    )
-                )
-
-            portfolio_df.loc[index, "buy_price"] = current_portfolio_map[
-                "buy_price"
-            ].get(index, 0) + portfolio_df.loc[index, "new_shares"] * krw_price_map.get(
-                index, 0
+        max_ord_price = np.floor(input_amount * weight) - prev_buy_price
+        with np.errstate(invalid="ignore"):
+            new_shares = np.where(
+                max_ord_price == 0, 0.0, np.floor(max_ord_price / krw_price)
             )
-            portfolio_df.loc[index, "shares"] = (
-                current_portfolio_map["shares"].get(index, 0)
-                + portfolio_df.loc[index, "new_shares"]
-            )
-        return portfolio_df["shares"]
+
+        # 목표 금액보다 많이 보유한 종목은 전량 매도
+        new_shares = np.where((max_ord_price < 0) & is_held, -prev_shares, new_shares)
+        return pd.Series(
+            prev_shares + new_shares, index=model_portfolio.index, name="shares"
+        )
 
     @staticmethod
     def emphasis_min_deposit(
         model_portfolio,
-        current_portfolio,
         input_amount,
         universe_asset_price,
+        current_portfolio=None,
         allow_minus_gross=True,
         **kwargs,
     ):
         """
         예수금 최소화 우선 계산
         :param portfolio_df: 포트폴리오(pd.DataFrame)
-        :return: pd.DataFrame
+        :return: pd.Series
         """
-        portfolio_df = model_portfolio.copy()
-        rest = 0
-        tot_buy_price = current_portfolio["buy_price"].sum()
+        prev_buy_price, prev_shares, _ = OrderPriceEngine._align_current_portfolio(
+            model_portfolio=model_portfolio, current_portfolio=current_portfolio
+        )
+        weight = model_portfolio["weight"].to_numpy(dtype=float)
+        krw_price = universe_asset_price.reindex(model_portfolio.index).to_numpy(
+            dtype=float
+        )
+        shares = prev_shares.copy()
+
+        # MP 에서 제외된 종목은 전량 매도
+        is_excluded = weight == 0
+        shares[is_excluded] = 0
 
         # TODO UPDATE flag to order_router sell & buy at once
+        tot_buy_price = (
+            0 if current_portfolio is None else current_portfolio["buy_price"].sum()
+        )
         is_poss_ord = tot_buy_price < input_amount
+        if not (is_poss_ord or allow_minus_gross):
+            return pd.Series(shares, index=model_portfolio.index, name="shares")
+
+        # 종목별 주문 후 남은 금액(rest)은 다음 종목 주문 금액에 더해지므로 순서대로 계산
+        # (rest 는 주문 금액을 가격으로 나눈 나머지라 누적합으로 표현되지 않음)
+        base_ord_price = (np.floor(input_amount * weight) - prev_buy_price).tolist()
+        prices = krw_price.tolist()
+        new_shares = [0.0] * len(prices)
+        rest = 0
+        for i in np.flatnonzero(~is_excluded).tolist():
+            max_ord_price = base_ord_price[i] + rest
+            new_shares[i] = np.floor(max_ord_price / prices[i])
+            rest = max_ord_price - (new_shares[i] * prices[i])
 
-        current_portfolio_map = current_portfolio.to_dict()
-        krw_price_map = universe_asset_price.to_dict()
-        for index, row in portfolio_df.iterrows():
-            prev_buy_price = current_portfolio_map["buy_price"].get(index, 0)
-            portfolio_df.loc[index, "shares"] = current_portfolio_map["shares"].get(
-                index, 0
-            )
-            asset_krw_price = universe_asset_price[index]
-
-            if row["weight"] == 0:
-                portfolio_df.loc[index, "max_ord_price"] = -prev_buy_price
-                portfolio_df.loc[index, "buy_price"] = prev_buy_price
-                portfolio_df.loc[index, "new_shares"] = -portfolio_df.loc[
-                    index, "shares"
-                ]
-                portfolio_df.loc[index, "shares"] = 0
-                portfolio_df.loc[index, "ratio"] = 0
-            elif is_poss_ord or allow_minus_gross:
-                portfolio_df.loc[index, "org_max_ord_price"] = np.floor(
-                    input_amount * row["weight"]
-                )
-                max_ord_price = (
-                    np.floor(input_amount * row["weight"]) - prev_buy_price + rest
-                )
-                new_shares = np.floor(max_ord_price / krw_price_map.get(index))
-                buy_price = prev_buy_price + (new_shares * asset_krw_price)
-
-                portfolio_df.loc[index, "max_ord_price"] = max_ord_price
-                portfolio_df.loc[index, "new_buy_price"] = new_shares * asset_krw_price
-                portfolio_df.loc[index, "new_shares"] = new_shares
-                portfolio_df.loc[index, "buy_price"] = buy_price
-                portfolio_df.loc[index, "ratio"] = buy_price / input_amount
-                portfolio_df.loc[index, "shares"] = (
-                    portfolio_df.loc[index, "shares"] + new_shares
-                )
-
-                rest = max_ord_price - (new_shares * universe_asset_price[index])
-                portfolio_df.loc[index, "rest"] = rest
-            else:
-                portfolio_df.loc[index, "max_ord_price"] = prev_buy_price
-                portfolio_df.loc[index, "buy_price"] = prev_buy_price
-                portfolio_df.loc[index, "new_shares"] = 0
-                portfolio_df.loc[index, "shares"] = portfolio_df.loc[index, "shares"]
-                portfolio_df.loc[index, "ratio"] = prev_buy_price / tot_buy_price
-        return portfolio_df["shares"]
+        shares[~is_excluded] += np.asarray(new_shares)[~is_excluded]
+        return pd.Series(shares, index=model_portfolio.index, name="shares")
@@ -0,0 +1,433 @@
+"""
+증권사(TR_BACKEND), infomax(INFOMAX_BACKEND) 부하 테스트용 로컬 대역 서버
+
+OrderRequester, TickerStager, ForeignCurrency.get_exchange_rate 가 사용하는 endpoint 만 구현하며,
+django 설정 없이 실행 가능(표준 라이브러리 http.server)
+
+usage:
+python manage.py run_broker_simulator --port 18080 --latency-ms 80 --error-rate 0.01
+settings.TR_BACKEND[vendor].HOST, settings.INFOMAX_BACKEND.API_HOST = "http://127.0.0.1:18080"
+"""
+import json
+import logging
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+logger = logging.getLogger(__name__)
+
+ASK = "01"
+BID = "02"
+UPDATE_ORDER = 1
+CANCEL_ORDER = 2
+ALL_ORDERS = "0"
+EXECUTED_ORDERS = "1"
+UNEXECUTED_ORDERS = "2"
+RA_CHANNEL_NAME = "RA(일임사)"
+TRADE_SEC_NAMES = {
+    (BID, None): "매수",
+    (BID, UPDATE_ORDER): "매수정정",
+    (BID, CANCEL_ORDER): "매수취소",
+    (ASK, None): "매도",
+    (ASK, UPDATE_ORDER): "매도정정",
+    (ASK, CANCEL_ORDER): "매도취소",
+}
+
+INFOMAX_PATH = r"^/api/v1/infomax"
+VENDOR_PATH = r"^/api/v1/\w+"
+ACCOUNT_PATH = rf"{VENDOR_PATH}/accounts/(?P<n>[\w-]+)"
+
+DEFAULT_SYMBOLS = (
+    "SPY,QQQ,IWM,EFA,EEM,VWO,EWJ,EWY,TLT,IEF,SHY,SPTI,SCHP,TIP,LQD,HYG,"
+    "GLD,SLV,DBO,DBB,CORN,SOYB,VNQ,XLK,XLF,XLV,XLE,XLI,XLY,XLP"
+).split(",")
+
+
+@dataclass
+class SimulatorConfig:
+    """
+    :param latency_ms: 응답 지연 평균(ms), latency_jitter_ms 범위에서 균등 분포
+    :param error_rate: 5xx(error_status) 응답 비율
+    :param fill_rate: 체결 조회(execution, assets) 시 미체결 주문이 체결될 확률
+    :param partial_fill_ratio: 체결 시 부분 체결 비율 상한, 1 이면 항상 전량 체결
+    :param price_volatility: 가격 조회 간 random walk 표준편차(비율)
+    """
+
+    latency_ms: float = 50
+    latency_jitter_ms: float = 20
+    error_rate: float = 0.0
+    error_status: int = HTTPStatus.SERVICE_UNAVAILABLE
+    fill_rate: float = 0.5
+    partial_fill_ratio: float = 1.0
+    price_volatility: float = 0.001
+    initial_cash: float = 10_000_000  # krw
+    initial_holdings: int = 3  # 계좌별 초기 보유 종목 수
+    exchange_rate: float = 1_300.0
+    page_size: int = 100
+    symbols: List[str] = field(default_factory=lambda: list(DEFAULT_SYMBOLS))
+    seed: int = 0
+
+
+class SimulatedAccount:
+    def __init__(self, account_number, market: "SimulatedMarket"):
+        seed = zlib.crc32(f"{market.config.seed}:{account_number}".encode())
+        rng = random.Random(seed)
+        self.account_number = account_number
+        self.cash = market.config.initial_cash
+        self.holdings = dict()  # code: {"qty", "buy_amt"}
+        self.orders = dict()  # order_no: order
+        for code in rng.sample(market.config.symbols, market.config.initial_holdings):
+            qty = rng.randint(1, 20)
+            self.holdings[code] = {
+                "qty": qty,
+                "buy_amt": qty * market.get_krw_price(code) * rng.uniform(0.9, 1.1),
+            }
+            self.cash -= self.holdings[code]["buy_amt"]
+        self.cash = max(self.cash, 0)
+
+
+class SimulatedMarket:
+    """계좌, 주문, 가격 상태(프로세스 메모리), 체결은 조회 시점에 확률적으로 진행"""
+
+    def __init__(self, config: SimulatorConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.lock = threading.RLock()
+        self.prices = {
+            symbol: round(self.rng.uniform(10, 500), 2) for symbol in config.symbols
+        }
+        self.accounts: Dict[str, SimulatedAccount] = dict()
+        self._order_no = count(1)
+
+    def get_krw_price(self, code):
+        return self.prices[code] * self.config.exchange_rate
+
+    def get_account(self, account_number) -> SimulatedAccount:
+        with self.lock:
+            account = self.accounts.get(account_number)
+            if account is None:
+                account = SimulatedAccount(account_number, market=self)
+                self.accounts[account_number] = account
+            return account
+
+    def tick_prices(self, symbols):
+        with self.lock:
+            for symbol in symbols:
+                if symbol in self.prices:
+                    self.prices[symbol] = round(
+                        self.prices[symbol]
+                        * (1 + self.rng.gauss(0, self.config.price_volatility)),
+                        2,
+                    )
+
+    def fill_orders(self, account: SimulatedAccount):
+        with self.lock:
+            for order in account.orders.values():
+                remaining = order["ord_qty"] - order["exec_qty"]
+                if remaining <= 0 or self.rng.random() >= self.config.fill_rate:
+                    continue
+
+                fill_ratio = self.rng.uniform(0, self.config.partial_fill_ratio)
+                qty = max(int(remaining * fill_ratio), 1)
+                holding = account.holdings.get(
+                    order["code"], {"qty": 0, "buy_amt": 0.0}
+                )
+                if order["trd_type"] != BID:
+                    # 보유 수량 초과 매도분은 체결하지 않음
+                    qty = min(qty, holding["qty"])
+                    if qty <= 0:
+                        continue
+
+                amount = qty * order["ord_price"] * self.config.exchange_rate
+                account.holdings[order["code"]] = holding
+                if order["trd_type"] == BID:
+                    holding["qty"] += qty
+                    holding["buy_amt"] += amount
+                    account.cash -= amount
+                else:
+                    holding["buy_amt"] -= holding["buy_amt"] * qty / holding["qty"]
+                    holding["qty"] -= qty
+                    account.cash += amount
+                order["exec_qty"] += qty
+                if holding["qty"] <= 0:
+                    account.holdings.pop(order["code"])
+
+    def register_order(self, payload) -> dict:
+        account = self.get_account(payload["account"])
+        with self.lock:
+            order_no = str(next(self._order_no))
+            now = datetime.now()
+            account.orders[order_no] = {
+                "ord_no": order_no,
+                "code": payload["code"],
+                "trd_type": payload["trd_type"],
+                "update_type": None,
+                "ord_qty": int(payload["shares"]),
+                "exec_qty": 0,
+                "ord_price": float(payload["price"]),
+                "org_price": float(payload["price"]),
+                "order_date": now.strftime("%Y%m%d"),
+                "order_time": now.strftime("%H%M%S"),
+            }
+        return {"order_no": order_no}
+
+    def update_order(self, payload) -> Optional[dict]:
+        """정정: 남은 수량으로 새 주문 생성, 취소: 남은 수량 취소"""
+        account = self.get_account(payload["account"])
+        with self.lock:
+            org_order = account.orders.get(str(payload["order_no"]))
+            if org_order is None or org_order["ord_qty"] <= org_order["exec_qty"]:
+                return None
+
+            remaining = org_order["ord_qty"] - org_order["exec_qty"]
+            org_order["ord_qty"] = org_order["exec_qty"]
+            order_no = str(next(self._order_no))
+            now = datetime.now()
+            account.orders[order_no] = {
+                **org_order,
+                "ord_no": order_no,
+                "update_type": int(payload["update_type"]),
+                "ord_qty": remaining
+                if int(payload["update_type"]) == UPDATE_ORDER
+                else 0,
+                "exec_qty": 0,
+                "ord_price": float(payload["price"]),
+                "org_price": org_order["ord_price"],
+                "order_date": now.strftime("%Y%m%d"),
+                "order_time": now.strftime("%H%M%S"),
+            }
+        return {"order_no": order_no}
+
+    def get_trades(self, account_number, exec_sign) -> list:
+        account = self.get_account(account_number)
+        self.fill_orders(account)
+        with self.lock:
+            orders = list(account.orders.values())
+
+        trades = []
+        for order in orders:
+            is_executed = order["exec_qty"] > 0
+            is_unexecuted = order["ord_qty"] > order["exec_qty"]
+            if (exec_sign == EXECUTED_ORDERS and not is_executed) or (
+                exec_sign == UNEXECUTED_ORDERS and not is_unexecuted
+            ):
+                continue
+            trades.append(
+                {
+                    "ord_no": order["ord_no"],
+                    "code": order["code"],
+                    "ord_qty": order["ord_qty"],
+                    "exec_qty": order["exec_qty"],
+                    "ord_price": order["ord_price"],
+                    "org_price": order["org_price"],
+                    "currency_code": "USD",
+                    "order_date": order["order_date"],
+                    "order_time": order["order_time"],
+                    "trade_sec_name": TRADE_SEC_NAMES[
+                        (order["trd_type"], order["update_type"])
+                    ],
+                    "order_tool_name": RA_CHANNEL_NAME,
+                }
+            )
+        return trades
+
+    def get_stocks(self, account_number) -> list:
+        account = self.get_account(account_number)
+        self.fill_orders(account)
+        with self.lock:
+            holdings = {code: dict(h) for code, h in account.holdings.items()}
+
+        stocks = []
+        for code, holding in holdings.items():
+            eval_amt = holding["qty"] * self.get_krw_price(code)
+            stocks.append(
+                {
+                    "stock_code": code,
+                    "holding_qty": holding["qty"],
+                    "poss_ord_qty": holding["qty"],
+                    "buy_amt": round(holding["buy_amt"]),
+                    "eval_amt": round(eval_amt),
+                    "unreliz_pl": round(eval_amt - holding["buy_amt"]),
+                    "unreliz_pl_ratio": round(
+                        (eval_amt / holding["buy_amt"] - 1) * 100, 2
+                    )
+                    if holding["buy_amt"]
+                    else 0,
+                    "last": self.prices[code],
+                    "currency_type_name": "USD",
+                    "basic_exchg_rate": self.config.exchange_rate,
+                }
+            )
+        return stocks
+
+    def get_assets(self, account_number) -> dict:
+        stocks = self.get_stocks(account_number)
+        cash = self.get_account(account_number).cash
+        return {
+            "net_asset_appr_amt": round(cash + sum(s["eval_amt"] for s in stocks)),
+            "stocks": stocks,
+        }
+
+
+class BrokerSimulatorHandler(BaseHTTPRequestHandler):
+    """
+    증권사: /api/v1/{vendor}/accounts/{n}/(assets|evaluate/stocks|balances|execution|amount/base),
+           /api/v1/{vendor}/accounts/order(POST 주문, PUT 정정/취소), /api/v1/{vendor}/exchange/rate/{date}
+    infomax: /api/v1/infomax/(master|quote|close)?symbols=...
+    """
+
+    protocol_version = "HTTP/1.1"
+    market: SimulatedMarket = None
+    routes = [
+        ("GET", rf"{INFOMAX_PATH}/(?P<path>master|quote|bid|close)$", "infomax"),
+        ("GET", rf"{VENDOR_PATH}/exchange/rate/(?P<date>\d{{8}})$", "exchange_rate"),
+        ("POST", rf"{VENDOR_PATH}/accounts/order$", "register_order"),
+        ("PUT", rf"{VENDOR_PATH}/accounts/order$", "update_order"),
+        ("GET", rf"{ACCOUNT_PATH}/assets$", "assets"),
+        ("GET", rf"{ACCOUNT_PATH}/evaluate/stocks$", "stocks"),
+        ("GET", rf"{ACCOUNT_PATH}/balances$", "balances"),
+        ("GET", rf"{ACCOUNT_PATH}/execution$", "execution"),
+        ("GET", rf"{ACCOUNT_PATH}/amount/base$", "base_amount"),
+    ]
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PUT(self):
+        self.dispatch("PUT")
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def dispatch(self, method):
+        # keep-alive 연결에서 다음 요청과 섞이지 않도록 오류 응답 전에도 body 를 모두 읽음
+        length = int(self.headers.get("Content-Length") or 0)
+        self.body = self.rfile.read(length) if length else b""
+        url = urlparse(self.path)
+        config = self.market.config
+        time.sleep(
+            max(
+                config.latency_ms
+                + random.uniform(-config.latency_jitter_ms, config.latency_jitter_ms),
+                0,
+            )
+            / 1000
+        )
+        for route_method, pattern, name in self.routes:
+            matched = re.match(pattern, url.path)
+            if route_method != method or not matched:
+                continue
+            if random.random() < config.error_rate:
+                return self.respond({"msg": "simulated error"}, config.error_status)
+
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                body, status = getattr(self, f"handle_{name}")(
+                    params=params, **matched.groupdict()
+                )
+            except (KeyError, ValueError) as e:
+                body, status = {"msg": f"invalid request: {e}"}, HTTPStatus.BAD_REQUEST
+            return self.respond(body, status)
+        return self.respond({"msg": "not found"}, HTTPStatus.NOT_FOUND)
+
+    def respond(self, body, status=HTTPStatus.OK):
+        content = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def read_json(self) -> dict:
+        return json.loads(self.body or b"{}")
+
+    def handle_infomax(self, params, path):
+        symbols = sorted(set(filter(None, params["symbols"].split(","))))
+        offset = int(params.get("offset", 0))
+        page_size = int(params.get("page_size", self.market.config.page_size))
+        page = symbols[offset : offset + page_size]
+
+        market = self.market
+        if path in ["quote", "bid"]:
+            market.tick_prices(page)
+        date = params.get("date") or datetime.now().strftime("%Y%m%d")
+        data = []
+        for symbol in page:
+            price = market.prices.get(symbol)
+            if price is None:
+                continue
+            if path == "master":
+                data.append(
+                    {
+                        "symbol": symbol,
+                        "nationCode": "US",
+                        "expireDate": None,
+                        "prevClose": price,
+                    }
+                )
+            elif path == "close":
+                data.append(
+                    {"symbol": symbol, "date": date, "open": price, "last": price}
+                )
+            else:
+                data.append({"symbol": symbol, "last": price, "bid": price})
+
+        next_url = None
+        if offset + page_size < len(symbols):
+            next_url = (
+                f"http://{self.headers['Host']}/api/v1/infomax/{path}?"
+                + urlencode({**params, "offset": offset + page_size})
+            )
+        return {"data": data, "next": next_url}, HTTPStatus.OK
+
+    def handle_exchange_rate(self, params, date):
+        rate = self.market.config.exchange_rate
+        return {"currencies": [{"date": date, "transaction": rate}]}, HTTPStatus.OK
+
+    def handle_register_order(self, params):
+        return self.market.register_order(self.read_json()), HTTPStatus.OK
+
+    def handle_update_order(self, params):
+        result = self.market.update_order(self.read_json())
+        if result is None:
+            return {"msg": "no remaining order"}, HTTPStatus.BAD_REQUEST
+        return result, HTTPStatus.OK
+
+    def handle_assets(self, params, n):
+        return self.market.get_assets(n), HTTPStatus.OK
+
+    def handle_stocks(self, params, n):
+        return {"stocks": self.market.get_stocks(n)}, HTTPStatus.OK
+
+    def handle_balances(self, params, n):
+        return {"won_exchange_amt": 0}, HTTPStatus.OK
+
+    def handle_execution(self, params, n):
+        trades = self.market.get_trades(n, params.get("exec_sign", ALL_ORDERS))
+        return {"trades": trades}, HTTPStatus.OK
+
+    def handle_base_amount(self, params, n):
+        return {"baseAmt": self.market.config.initial_cash}, HTTPStatus.OK
+
+
+def create_server(host, port, config: SimulatorConfig) -> ThreadingHTTPServer:
+    handler = type(
+        "BrokerSimulatorHandler",
+        (BrokerSimulatorHandler,),
+        {"market": SimulatedMarket(config)},
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -1,18 +1,35 @@
 from abc import ABC, abstractproperty
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 import logging
 from datetime import datetime, timedelta
 
 import numpy as np
 import pandas as pd
+import pytz
+import requests
 
 from celery import Task, shared_task
 from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
 from django.db.models import Max, F, Q, BooleanField, Case, Value, When
+from django.utils import timezone
 
 from api.bases.accounts.models import Account
+from common.rate_limit import BrokerUnavailable
+from api.bases.core.metrics import (
+    ERROR,
+    STAGE_DB_WRITE,
+    STAGE_EXECUTE_TWAP,
+    STAGE_REGISTER_QUEUE,
+    STAGE_SPLIT_EXECUTION,
+    timed,
+)
 from api.bases.managements.components.data_stagers import (
     CachedTickerStager,
+    PriceSnapshotStager,
     UnsupportedTicker,
 )
 from api.bases.managements.components.exchange.currencies import ForeignCurrency
@@ -20,6 +37,12 @@ from api.bases.managements.components.exchange.exchanger import (
     AbstractCurrencyExchanger,
     CurrencyExchangerForAccountBeingClosed,
     CurrencyExchangerForAccountNormal,
+    WrongTargetError,
+)
+from api.bases.managements.components.exchange.results import (
+    APIResultFailureRetryableError,
+    CurrencyExchangerBatchResult,
+    CurrencyExchangerResultForFailed,
 )
 from api.bases.managements.components.exchange.target_accounts import (
     get_accounts_being_closed_etf,
@@ -31,9 +54,11 @@ from api.bases.managements.models import (
     Queue,
     OrderLog,
     OrderReport,
+    OrderReportSection,
     ErrorSet,
     ErrorOccur,
     ErrorSolved,
+    ErrorMonitorWatermark,
 )
 from api.bases.managements.order_router import OrderManagement, ExecutionManagement
 from api.bases.managements.order_router.order_manager import (
@@ -41,6 +66,10 @@ from api.bases.managements.order_router.order_manager import (
     SHORT_POSITION,
     TIME_SCHEDULE,
 )
+from api.bases.managements.portfolio.batch import (
+    BatchOrderPriceEngine,
+    BatchPortfolioManager,
+)
 from api.bases.orders.models import Event
 from common.mixins import PortfolioMapMixin
 from common.exceptions import PreconditionFailed, StopOrderOperation, MinBaseViolation
@@ -56,6 +85,18 @@ logger = logging.getLogger(__name__)
 TR_BACKEND = settings.TR_BACKEND
 INFOMAX_BACKEND = settings.INFOMAX_BACKEND
 MAX_NOTE_SIZE = 100
+SELL_QUEUE_MAX_WORKERS = 8
+BATCH_REGISTER_MAX_WORKERS = 8
+EXCHANGE_RATE_CACHE_TIMEOUT = 60 * 10
+EXCHANGE_BATCH_MAX_WORKERS = 4
+EXCHANGE_BATCH_WAVE_SIZE = 50
+EXCHANGE_BATCH_MAX_ATTEMPTS = AbstractCurrencyExchanger.RETRY_STOP_AFTER_ATTEMPT
+TWAP_SPREAD_RATIO = 0.8  # 단계 간격 중 큐 분산에 사용하는 비율
+TWAP_STEP_CLAIM_TIMEOUT = 60 * 60 * 24
+ERROR_MONITOR_EXCLUDE_NOTES = [
+    "리밸런싱 조건에 미해당",
+    "해당 국가 휴일로 주문 불가능합니다.",
+]
 
 
 def stop_account_operation(account_alias: Account or str):
@@ -85,6 +126,27 @@ def update_account_being_closed_status(queue: Queue):
         queue.account.save()
 
 
+def get_exchange_rate(vendor_code):
+    """예약 실행(TWAP) 시점 환율, 같은 시간대 실행 task 간 공유"""
+    cache = caches["default"]
+    key = f"exchange_rate:{str(vendor_code).lower()}:{get_us_today().date()}"
+    exchange_rate = cache.get(key)
+    if exchange_rate is None:
+        exchange_rate = ForeignCurrency.get_exchange_rate(
+            api_base=TR_BACKEND[str(vendor_code).upper()].HOST
+        )
+        cache.set(key, exchange_rate, timeout=EXCHANGE_RATE_CACHE_TIMEOUT)
+    return exchange_rate
+
+
+def get_data_stager(price_snapshot_id=None):
+    if price_snapshot_id:
+        return PriceSnapshotStager(
+            api_url=INFOMAX_BACKEND.API_HOST, snapshot_id=price_snapshot_id
+        )
+    return CachedTickerStager(api_url=INFOMAX_BACKEND.API_HOST)
+
+
 class OrderQueueRegisterRunner(Task):
     DAILY_ORDER_QUEUES_MAP = {
         Event.MODES.new_order: [Queue.MODES.bid],
@@ -100,6 +162,7 @@ class OrderQueueRegisterRunner(Task):
         daily_order_mode,
         exchange_rate,
         vendor_code,
+        price_snapshot_id=None,
         *args,
         **kwargs,
     ):
@@ -108,34 +171,84 @@ class OrderQueueRegisterRunner(Task):
         rebalancing_flag = True
 
         try:
-            om = OrderManagement(
+            om = self.get_order_management(
                 account_alias=account_alias,
-                data_stager=CachedTickerStager(api_url=INFOMAX_BACKEND.API_HOST),
-                portfolio=portfolio["port_data"],
+                portfolio=portfolio,
+                daily_order_mode=daily_order_mode,
                 exchange_rate=exchange_rate,
                 vendor_code=vendor_code,
-                mode=daily_order_mode,
+                data_stager=get_data_stager(price_snapshot_id=price_snapshot_id),
             )
-            om.check_min_base()
             rebalancing_flag = om.is_rebalancing_condition_met
             order_basket = om.order_basket
             summary = om.get_summary()
 
-        except UnsupportedTicker as e:
-            note = f"운용 중지(미지원 종목 포함): {str(e)}"
+        except Exception as e:
+            note = self.handle_error(account_alias=account_alias, error=e)
+
+        self.register_queues(
+            account_alias=account_alias,
+            portfolio=portfolio,
+            daily_order_mode=daily_order_mode,
+            vendor_code=vendor_code,
+            order_management=om,
+            order_basket=order_basket,
+            summary=summary,
+            rebalancing_flag=rebalancing_flag,
+            note=note,
+        )
+
+    @staticmethod
+    def get_order_management(
+        account_alias,
+        portfolio,
+        daily_order_mode,
+        exchange_rate,
+        vendor_code,
+        data_stager=None,
+    ):
+        om = OrderManagement(
+            account_alias=account_alias,
+            data_stager=data_stager
+            or CachedTickerStager(api_url=INFOMAX_BACKEND.API_HOST),
+            portfolio=portfolio["port_data"],
+            exchange_rate=exchange_rate,
+            vendor_code=vendor_code,
+            mode=daily_order_mode,
+        )
+        om.check_min_base()
+        return om
+
+    @staticmethod
+    def handle_error(account_alias, error: Exception) -> str:
+        if isinstance(error, UnsupportedTicker):
+            note = f"운용 중지(미지원 종목 포함): {str(error)}"
             stop_account_operation(account_alias=account_alias)
 
-        except MinBaseViolation as e:
-            note = f"운용 중지(최소 원금 위반): {str(e)}"
+        elif isinstance(error, MinBaseViolation):
+            note = f"운용 중지(최소 원금 위반): {str(error)}"
             stop_account_operation(account_alias=account_alias)
 
-        except StopOrderOperation as e:
-            note = str(e)
+        elif isinstance(error, StopOrderOperation):
+            note = str(error)
             stop_account_operation(account_alias=account_alias)
 
-        except Exception as e:
-            note = f"error: {str(e)}"
+        else:
+            note = f"error: {str(error)}"
+        return note
 
+    def register_queues(
+        self,
+        account_alias,
+        portfolio,
+        daily_order_mode,
+        vendor_code,
+        order_management,
+        order_basket,
+        summary,
+        rebalancing_flag,
+        note,
+    ):
         for _queue_mode in self.DAILY_ORDER_QUEUES_MAP[daily_order_mode]:
             try:
                 _order_queue = Queue(
@@ -156,11 +269,14 @@ class OrderQueueRegisterRunner(Task):
                 else:
                     _order_queue.set_order_basket(order_basket=order_basket, note=note)
                 logger.info(f"register {_order_queue}")
-                _order_queue.save(portfolio_id=portfolio["port_seq"])
+                with timed(STAGE_DB_WRITE, name="queue", vendor=vendor_code):
+                    _order_queue.save(portfolio_id=portfolio["port_seq"])
 
                 if not summary.empty:
                     self.write_summary(
-                        order_management=om, queue=_order_queue, summary=summary
+                        order_management=order_management,
+                        queue=_order_queue,
+                        summary=summary,
                     )
             except Exception as e:
                 logger.error(f"{e}")
@@ -176,33 +292,185 @@ class OrderQueueRegisterRunner(Task):
         deposit_info = (1 - summary[weight_columns].sum(axis=0)).round(3)
 
         order_management.reporter.write_body(
-            data=summary[weight_columns], desc="Order Basket Weight"
+            data=summary[weight_columns],
+            desc="Order Basket Weight",
+            section=OrderReportSection.SECTIONS.basket,
         )
         order_management.reporter.write_body(data=deposit_info, desc="Deposit ratio")
         order_management.reporter.write_body(
-            data=summary[non_weight_columns], desc="Order Basket Detail"
+            data=summary[non_weight_columns],
+            desc="Order Basket Detail",
+            section=OrderReportSection.SECTIONS.basket,
         )
         order_management.reporter.save()
 
 
+class BatchOrderQueueRegisterRunner(OrderQueueRegisterRunner):
+    """
+    같은 MP로 운용되는 계좌들의 주문 바스켓을 BatchPortfolioManager 로 한 번에 계산해 등록
+    계좌 정보(잔고, 주문 가능 금액) 조회는 계좌별 병렬 처리, 큐 등록은 계좌별로 처리
+    """
+
+    max_workers = BATCH_REGISTER_MAX_WORKERS
+
+    def process(
+        self,
+        account_aliases,
+        portfolio,
+        daily_order_mode,
+        exchange_rate,
+        vendor_code,
+        price_snapshot_id=None,
+        *args,
+        **kwargs,
+    ):
+        order_managements, notes = self.get_order_managements(
+            account_aliases=account_aliases,
+            portfolio=portfolio,
+            daily_order_mode=daily_order_mode,
+            exchange_rate=exchange_rate,
+            vendor_code=vendor_code,
+            data_stager=get_data_stager(price_snapshot_id=price_snapshot_id),
+        )
+
+        rebalancing_flags = self.calc_batch_rebalancing(
+            order_managements=order_managements,
+            portfolio=portfolio,
+            daily_order_mode=daily_order_mode,
+            notes=notes,
+        )
+
+        for account_alias in account_aliases:
+            om = order_managements.get(account_alias)
+            order_basket, note = None, notes.get(account_alias, "")
+            summary = pd.DataFrame()
+
+            if not note:
+                try:
+                    order_basket = om.order_basket
+                    summary = om.get_summary()
+                except Exception as e:
+                    note = self.handle_error(account_alias=account_alias, error=e)
+
+            self.register_queues(
+                account_alias=account_alias,
+                portfolio=portfolio,
+                daily_order_mode=daily_order_mode,
+                vendor_code=vendor_code,
+                order_management=om,
+                order_basket=order_basket,
+                summary=summary,
+                rebalancing_flag=rebalancing_flags.get(account_alias, True),
+                note=note,
+            )
+
+    def get_order_managements(self, account_aliases, **kwargs):
+        """
+        계좌별 OrderManagement 생성(증권사 잔고, 주문 가능 금액 조회)을 max_workers 만큼 동시 처리
+        증권사 조회는 vendor 단위 rate limit(BrokerTrafficGuard)을 공유하므로 동시 처리 수를 늘려도
+        rate limit 이상으로 빨라지지 않음
+
+        :return: ({account_alias: OrderManagement}, {account_alias: 오류 note})
+        """
+
+        def _get_order_management(account_alias):
+            try:
+                return (
+                    self.get_order_management(account_alias=account_alias, **kwargs),
+                    "",
+                )
+            except Exception as e:
+                return None, self.handle_error(account_alias=account_alias, error=e)
+            finally:
+                # worker thread 의 DB 연결 정리
+                connections.close_all()
+
+        order_managements, notes = dict(), dict()
+        if not account_aliases:
+            return order_managements, notes
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(account_aliases))
+        ) as executor:
+            results = executor.map(_get_order_management, account_aliases)
+            for account_alias, (om, note) in zip(account_aliases, results):
+                if note:
+                    notes[account_alias] = note
+                else:
+                    order_managements[account_alias] = om
+        return order_managements, notes
+
+    def calc_batch_rebalancing(
+        self, order_managements: dict, portfolio, daily_order_mode, notes: dict
+    ) -> dict:
+        rebalancing_flags = dict()
+
+        # emphasis, emphasis_options, slippage_threshold 는 OrderSetting 단위로 같음
+        order_setting_groups = defaultdict(list)
+        for account_alias, om in order_managements.items():
+            if account_alias not in notes:
+                order_setting_groups[om.order_setting.pk].append(om)
+
+        for oms in order_setting_groups.values():
+            account_aliases = [om.account.account_alias for om in oms]
+            asset_prices = pd.concat([om.prices for om in oms])
+            asset_prices = asset_prices[~asset_prices.index.duplicated(keep="first")]
+
+            try:
+                batch_portfolio_manager = BatchPortfolioManager(
+                    price_engine=BatchOrderPriceEngine(),
+                    portfolio=portfolio["port_data"],
+                    asset_prices=asset_prices,
+                )
+                batch_result = batch_portfolio_manager.calc_batch_rebalancing(
+                    bases=pd.Series(
+                        [om.max_ord_base for om in oms], index=account_aliases
+                    ),
+                    current_portfolios={
+                        om.account.account_alias: om.current_portfolio for om in oms
+                    },
+                    emphasis=oms[0].emphasis,
+                    emphasis_options=oms[0].strategies.get("emphasis_options"),
+                    slippage_threshold=oms[0].slippage_threshold,
+                    mode=daily_order_mode,
+                )
+            except Exception as e:
+                for account_alias in account_aliases:
+                    notes[account_alias] = f"error: {str(e)}"
+                continue
+
+            for om in oms:
+                account_alias = om.account.account_alias
+                try:
+                    om.set_batch_result(batch_result=batch_result)
+                    rebalancing_flags[account_alias] = bool(
+                        batch_result.is_rebalancing_condition_met[account_alias]
+                    )
+                except Exception as e:
+                    notes[account_alias] = self.handle_error(
+                        account_alias=account_alias, error=e
+                    )
+        return rebalancing_flags
+
+
 class OrderAccountFetcher(Task, PortfolioMapMixin):
     def __init__(self, *args, **kwargs):
         super(OrderAccountFetcher, self).__init__(*args, **kwargs)
         self.portfolio_map = dict()
         self.exchange_rate = None
 
-    def process(self, vendor_code, *args, **kwargs):
+    def process(self, vendor_code, batch_size=None, *args, **kwargs):
         if not vendor_code:
             logger.warning("vendor_code is must be passed")
             return
 
-        CachedTickerStager.flush_all()
         us_date_as_kst = get_us_today_as_kst()
         kst_today = get_local_today()
 
         self.portfolio_map = self.get_portfolio_map(
             filter_date=kst_today.strftime("%Y-%m-%d")
         )
+        price_snapshot_id = self.create_price_snapshot()
 
         self.exchange_rate = ForeignCurrency.get_exchange_rate(
             api_base=TR_BACKEND[str(vendor_code).upper()].HOST
@@ -216,24 +484,53 @@ class OrderAccountFetcher(Task, PortfolioMapMixin):
             vendor_code=vendor_code, base_date=kst_today.date()
         )
         self.register_sell_order_queues(
-            vendor_code=vendor_code, base_date=kst_today.date()
+            vendor_code=vendor_code,
+            base_date=kst_today.date(),
+            price_snapshot_id=price_snapshot_id,
         )
         self.register_normal_order_queues(
-            queryset=order_account_queryset, vendor_code=vendor_code
+            queryset=order_account_queryset,
+            vendor_code=vendor_code,
+            batch_size=batch_size,
+            price_snapshot_id=price_snapshot_id,
         )
 
+    def create_price_snapshot(self):
+        """
+        MP 유니버스 가격 스냅샷 생성, 실패 시 계좌별 가격 조회(CachedTickerStager)로 처리
+        """
+        universe = set()
+        for portfolios in self.portfolio_map.values():
+            for portfolio in portfolios.values():
+                universe.update(pd.DataFrame(portfolio["port_data"])["code"])
+
+        try:
+            return PriceSnapshotStager.create_snapshot(
+                api_url=INFOMAX_BACKEND.API_HOST, symbols=universe
+            )
+        except Exception as e:
+            logger.warning(
+                f"fail to create price snapshot, fetch prices by account: {e}"
+            )
+            CachedTickerStager.flush_all()
+            return None
+
     def update_event(self, vendor_code, base_date):
         queryset = self.get_order_account_queryset(
             vendor_code=vendor_code, base_date=base_date
         )
-        latest_event_by_account = Event.objects.filter(
-            id__in=(
-                Event.objects.filter(account_alias__vendor_code=vendor_code).values("account_alias_id")
-                .annotate(Max("id"))
-                .order_by("account_alias_id")
-                .values_list("id__max", flat=True)
+        latest_event_by_account = {
+            event.account_alias_id: event
+            for event in Event.objects.filter(
+                id__in=(
+                    Event.objects.filter(account_alias__vendor_code=vendor_code)
+                    .values("account_alias_id")
+                    .annotate(Max("id"))
+                    .order_by("account_alias_id")
+                    .values_list("id__max", flat=True)
+                )
             )
-        )
+        }
         update_needed_events = []
         new_needed_events = []
         for (
@@ -243,32 +540,22 @@ class OrderAccountFetcher(Task, PortfolioMapMixin):
             _order_event_status,
             _order_mode,
         ) in queryset.iterator():
-            account = Account.objects.get(account_alias=_account_alias)
             strategy = str(int(_strategy_code)).zfill(2)
             port_seq = self.portfolio_map[strategy][str(_risk_type)]["port_seq"]
-            event_row = latest_event_by_account.filter(
-                account_alias_id=_account_alias
-            ).first()
-            if (event_row.mode == Event.MODES.new_order) & (
-                event_row.portfolio_id != port_seq
-            ):
+            event_row = latest_event_by_account.get(_account_alias)
+            if event_row is None or event_row.portfolio_id == port_seq:
+                continue
+
+            is_new_event_needed = False
+            if event_row.mode == Event.MODES.new_order:
                 if event_row.status in [Event.STATUS.on_hold, Event.STATUS.processing]:
                     event_row.portfolio_id = port_seq
                     update_needed_events.append(event_row)
 
                 elif event_row.status in [Event.STATUS.completed]:
-                    new_event = Event(
-                        account_alias=account,
-                        mode=Event.MODES.rebalancing,
-                        portfolio_id=port_seq,
-                    )
-                    new_needed_events.append(new_event)
-                else:
-                    pass
+                    is_new_event_needed = True
 
-            elif (event_row.mode == Event.MODES.rebalancing) & (
-                event_row.portfolio_id != port_seq
-            ):
+            elif event_row.mode == Event.MODES.rebalancing:
                 if event_row.status == Event.STATUS.on_hold:
                     event_row.portfolio_id = port_seq
                     update_needed_events.append(event_row)
@@ -276,32 +563,35 @@ class OrderAccountFetcher(Task, PortfolioMapMixin):
                 elif event_row.status == Event.STATUS.processing:
                     event_row.status = Event.STATUS.canceled
                     update_needed_events.append(event_row)
-                    new_event = Event(
-                        account_alias=account,
-                        mode=Event.MODES.rebalancing,
-                        portfolio_id=port_seq,
-                    )
-                    new_needed_events.append(new_event)
+                    is_new_event_needed = True
 
                 elif event_row.status in [Event.STATUS.completed]:
-                    new_event = Event(
-                        account_alias=account,
+                    is_new_event_needed = True
+
+            if is_new_event_needed:
+                new_needed_events.append(
+                    Event(
+                        account_alias_id=_account_alias,
                         mode=Event.MODES.rebalancing,
                         portfolio_id=port_seq,
                     )
-                    new_needed_events.append(new_event)
-                else:
-                    pass
-            else:
-                pass
+                )
 
         Event.objects.bulk_update(update_needed_events, ["status", "portfolio_id"])
         Event.objects.bulk_create(new_needed_events)
 
-    def register_normal_order_queues(self, queryset, vendor_code):
+    def register_normal_order_queues(
+        self, queryset, vendor_code, batch_size=None, price_snapshot_id=None
+    ):
+        """
+        :param batch_size: 지정 시 같은 MP, 주문 모드의 계좌들을 batch_size 단위로 묶어
+                           register_queues_with_batch_basket 로 등록
+        :param price_snapshot_id: 하위 태스크가 사용할 가격 스냅샷(PriceSnapshotStager)
+        """
         exchange_rate = ForeignCurrency.get_exchange_rate(
             api_base=TR_BACKEND[str(vendor_code).upper()].HOST
         )
+        batch_groups = defaultdict(list)
 
         # 정상계약 주문 등록 (최근의 Order.Event의 status 기반으로 판단)
         for (
@@ -323,6 +613,13 @@ class OrderAccountFetcher(Task, PortfolioMapMixin):
                 if _order_event_status == Event.STATUS.completed:
                     daily_order_mode = Event.MODES.rebalancing
                 strategy = str(int(_strategy_code)).zfill(2)
+
+                if batch_size:
+                    batch_groups[(strategy, str(_risk_type), daily_order_mode)].append(
+                        _account_alias
+                    )
+                    continue
+
                 portfolio = self.portfolio_map[strategy].get(str(_risk_type))
                 self.register_queue_with_basket.apply_async(
                     [
@@ -331,7 +628,26 @@ class OrderAccountFetcher(Task, PortfolioMapMixin):
                         daily_order_mode,
                         exchange_rate,
                         vendor_code,
-                    ]
+                    ],
+                    {"price_snapshot_id": price_snapshot_id},
+                )
+
+        for (
+            strategy,
+            risk_type,
+            daily_order_mode,
+        ), account_aliases in batch_groups.items():
+            portfolio = self.portfolio_map[strategy].get(risk_type)
+            for i in range(0, len(account_aliases), batch_size):
+                self.register_queues_with_batch_basket.apply_async(
+                    [
+                        account_aliases[i : i + batch_size],
+                        portfolio,
+                        daily_order_mode,
+                        exchange_rate,
+                        vendor_code,
+                    ],
+                    {"price_snapshot_id": price_snapshot_id},
                 )
 
     @staticmethod
@@ -346,15 +662,46 @@ class OrderAccountFetcher(Task, PortfolioMapMixin):
         *args,
         **kwargs,
     ):
-        return runner.process(
-            account_alias=account_alias,
-            portfolio=portfolio,
-            exchange_rate=exchange_rate,
-            daily_order_mode=daily_order_mode,
-            vendor_code=vendor_code,
-            *args,
-            **kwargs,
-        )
+        with timed(
+            STAGE_REGISTER_QUEUE,
+            name=daily_order_mode,
+            vendor=vendor_code,
+            account=account_alias,
+        ):
+            return runner.process(
+                account_alias=account_alias,
+                portfolio=portfolio,
+                exchange_rate=exchange_rate,
+                daily_order_mode=daily_order_mode,
+                vendor_code=vendor_code,
+                *args,
+                **kwargs,
+            )
+
+    @staticmethod
+    @shared_task(bind=True, base=BatchOrderQueueRegisterRunner)
+    def register_queues_with_batch_basket(
+        runner: BatchOrderQueueRegisterRunner,
+        account_aliases,
+        portfolio,
+        daily_order_mode,
+        exchange_rate,
+        vendor_code,
+        *args,
+        **kwargs,
+    ):
+        with timed(
+            STAGE_REGISTER_QUEUE, name=f"batch_{daily_order_mode}", vendor=vendor_code
+        ):
+            return runner.process(
+                account_aliases=account_aliases,
+                portfolio=portfolio,
+                exchange_rate=exchange_rate,
+                daily_order_mode=daily_order_mode,
+                vendor_code=vendor_code,
+                *args,
+                **kwargs,
+            )
 
     @staticmethod
     def cancel_delayed_queues(base_datetime: datetime, vendor_code):
@@ -406,7 +753,9 @@ class OrderAccountFetcher(Task, PortfolioMapMixin):
 
         return order_account_queryset
 
-    def register_sell_order_queues(self, vendor_code, base_date):
+    def register_sell_order_queues(
+        self, vendor_code, base_date, price_snapshot_id=None
+    ):
         # 해지 매도 대상 계좌 선정 (Account 상태로 판단)
         accounts_having_sell_order = Queue.objects.filter(
             management_at__date=base_date, mode=Queue.MODES.sell,
@@ -421,51 +770,66 @@ class OrderAccountFetcher(Task, PortfolioMapMixin):
         logger.info(
             f"try register sell_order_queues: {account_being_closed_queryset.count()}"
         )
-        # 해지 대기 계약 주문 bulk
-        queues = []
-        for _account in account_being_closed_queryset.iterator():
-            strategy = str(int(_account.strategy_code)).zfill(2)
-            port_data = self.portfolio_map[strategy].get(str(_account.risk_type))[
-                "port_data"
-            ]
-            port_seq = self.portfolio_map[strategy].get(str(_account.risk_type))[
-                "port_seq"
-            ]
-            om, order_basket = None, None
-            note = ""
-
-            try:
-                om = OrderManagement(
-                    account_alias=_account.account_alias,
-                    data_stager=CachedTickerStager(api_url=INFOMAX_BACKEND.API_HOST),
-                    portfolio=port_data,
-                    exchange_rate=self.exchange_rate,
-                    vendor_code=vendor_code,
-                    mode=Event.MODES.sell,
+        # 해지 대기 계약 주문 bulk (계좌별 주문 바스켓 계산은 병렬 처리)
+        data_stager = get_data_stager(price_snapshot_id=price_snapshot_id)
+        with ThreadPoolExecutor(max_workers=SELL_QUEUE_MAX_WORKERS) as executor:
+            queues = list(
+                executor.map(
+                    lambda _account: self.build_sell_order_queue(
+                        account=_account,
+                        vendor_code=vendor_code,
+                        data_stager=data_stager,
+                    ),
+                    account_being_closed_queryset.iterator(),
                 )
-                order_basket = om.order_basket
+            )
 
-            except UnsupportedTicker as e:
-                note = f"운용 중지(미지원 종목 포함): {str(e)}"
-                stop_account_operation(account_alias=_account)
+        for _order_queue in queues:
+            update_account_being_closed_status(queue=_order_queue)
 
-            except Exception as e:
-                note = f"{str(e)}"
+        bulked = Queue.objects.bulk_create_with_baskets(queues)
+        logger.info(f"sell_order_queues have been registered: {len(bulked)}")
 
-            _order_queue = Queue(
-                account_alias=_account.account_alias,
-                portfolio_id=port_seq,
-                mode=Queue.MODES.sell,
-                status=Queue.STATUS.pending,
+    def build_sell_order_queue(self, account: Account, vendor_code, data_stager):
+        strategy = str(int(account.strategy_code)).zfill(2)
+        port_data = self.portfolio_map[strategy].get(str(account.risk_type))[
+            "port_data"
+        ]
+        port_seq = self.portfolio_map[strategy].get(str(account.risk_type))["port_seq"]
+        om, order_basket = None, None
+        note = ""
+
+        try:
+            om = OrderManagement(
+                account_alias=account.account_alias,
+                data_stager=data_stager,
+                portfolio=port_data,
+                exchange_rate=self.exchange_rate,
                 vendor_code=vendor_code,
+                mode=Event.MODES.sell,
             )
+            order_basket = om.order_basket
 
-            _order_queue.set_order_basket(order_basket=order_basket, note=note)
-            update_account_being_closed_status(queue=_order_queue)
-            queues.append(_order_queue)
+        except UnsupportedTicker as e:
+            note = f"운용 중지(미지원 종목 포함): {str(e)}"
+            stop_account_operation(account_alias=account)
 
-        bulked = Queue.objects.bulk_create(queues)
-        logger.info(f"sell_order_queues have been registered: {len(bulked)}")
+        except Exception as e:
+            note = f"{str(e)}"
+
+        finally:
+            # worker thread 의 DB 연결 정리
+            connections.close_all()
+
+        _order_queue = Queue(
+            account_alias=account.account_alias,
+            portfolio_id=port_seq,
+            mode=Queue.MODES.sell,
+            status=Queue.STATUS.pending,
+            vendor_code=vendor_code,
+        )
+        _order_queue.set_order_basket(order_basket=order_basket, note=note)
+        return _order_queue
 
 
 class ExecutionManagementRunner(Task):
@@ -484,69 +848,84 @@ class ExecutionManagementRunner(Task):
         report_type = OrderReport.REPORT_TYPES.monitoring
         order_queue = Queue.objects.get(id=order_queue_id)
 
-        em = None
-        try:
-            em = ExecutionManagement(
-                account_alias=order_queue.account_alias,
-                order_queue_id=order_queue_id,
-                exchange_rate=exchange_rate,
-                data_stager=CachedTickerStager(api_url=infomax_api_base),
-                min_deposit_ratio=0.05,
-                vendor_code=vendor_code,
-            )
-            if em.unexecuted_trd_history.empty and order_type_to_plan["order_type"] in [
-                "Adjust",
-                "Cancel",
-            ]:
-                OrderLog.objects.complete_executed_orders(
-                    order_queue_id=order_queue_id, unexecuted_codes=[]
+        with timed(
+            STAGE_SPLIT_EXECUTION,
+            name=order_type_to_plan["order_type"],
+            vendor=vendor_code,
+            position=order_type_to_plan["position"],
+            account=order_queue.account_alias,
+        ) as labels:
+            em = None
+            try:
+                if exchange_rate is None:
+                    exchange_rate = get_exchange_rate(vendor_code)
+                em = ExecutionManagement(
+                    account_alias=order_queue.account_alias,
+                    order_queue_id=order_queue_id,
+                    exchange_rate=exchange_rate,
+                    data_stager=CachedTickerStager(api_url=infomax_api_base),
+                    min_deposit_ratio=0.05,
+                    vendor_code=vendor_code,
+                )
+                if em.unexecuted_trd_history.empty and order_type_to_plan["order_type"] in [
+                    "Adjust",
+                    "Cancel",
+                ]:
+                    OrderLog.objects.complete_executed_orders(
+                        order_queue_id=order_queue_id, unexecuted_codes=[]
+                    )
+                    self.update_order_account_status(execution_management=em)
+                    return
+                if em.order_position == LONG_POSITION:
+                    canceled_order_logs = em.cancel_orders(position=SHORT_POSITION)
+                else:
+                    canceled_order_logs = em.cancel_orders(position=LONG_POSITION)
+                em.reporter.write_body(
+                    data=em.current_portfolio,
+                    desc="현재 포트폴리오",
+                    section=OrderReportSection.SECTIONS.portfolio,
                 )
+                em.route_orders(order_type_to_plan)
                 self.update_order_account_status(execution_management=em)
-                return
-            if em.order_position == LONG_POSITION:
-                canceled_order_logs = em.cancel_orders(position=SHORT_POSITION)
-            else:
-                canceled_order_logs = em.cancel_orders(position=LONG_POSITION)
-            em.reporter.write_body(data=em.current_portfolio, desc="현재 포트폴리오")
-            em.route_orders(order_type_to_plan)
-            self.update_order_account_status(execution_management=em)
-            em.save_report()
-
-        except StopOrderOperation as e:
-            stop_account_operation(account_alias=order_queue.account_alias)
-            desc, msg = f"운용 중지({str(order_queue.account_alias)})", f"{str(e)}"
-            report_type = OrderReport.REPORT_TYPES.anomaly
-            logger.error(msg)
-
-        except PreconditionFailed as e:
-            desc, msg = f"사전 조건 실패", f"{str(e)}"
-            report_type = OrderReport.REPORT_TYPES.error
-            logger.error(msg)
+                em.save_report()
 
-        except UnsupportedTicker as e:
-            stop_account_operation(account_alias=order_queue.account_alias)
-            desc, msg = f"운용 중지(미지원 종목 포함)", f"{str(e)}"
-            report_type = OrderReport.REPORT_TYPES.error
-            logger.error(msg)
+            except StopOrderOperation as e:
+                stop_account_operation(account_alias=order_queue.account_alias)
+                desc, msg = f"운용 중지({str(order_queue.account_alias)})", f"{str(e)}"
+                report_type = OrderReport.REPORT_TYPES.anomaly
+                logger.error(msg)
 
-        except Exception as e:
-            desc, msg = f"unexpected error", f"{str(e)}"
-            report_type = OrderReport.REPORT_TYPES.error
-            logger.error(msg)
-        finally:
-            if report_type in [
-                OrderReport.REPORT_TYPES.anomaly,
-                OrderReport.REPORT_TYPES.error,
-            ]:
-                queue_context = QueueStatusContext(order_queue=order_queue)
-                queue_context.transition(status=Queue.STATUS.failed)
+            except PreconditionFailed as e:
+                desc, msg = f"사전 조건 실패", f"{str(e)}"
+                report_type = OrderReport.REPORT_TYPES.error
+                logger.error(msg)
 
-                order_report, is_created = OrderReport.objects.get_or_create(
-                    order=order_queue
-                )
-                order_report.write_body(data=msg, desc=desc)
-                order_report.report_type = report_type
-                logger.info(f"Fail processing orders: {order_queue}")
+            except UnsupportedTicker as e:
+                stop_account_operation(account_alias=order_queue.account_alias)
+                desc, msg = f"운용 중지(미지원 종목 포함)", f"{str(e)}"
+                report_type = OrderReport.REPORT_TYPES.error
+                logger.error(msg)
+
+            except Exception as e:
+                desc, msg = f"unexpected error", f"{str(e)}"
+                report_type = OrderReport.REPORT_TYPES.error
+                logger.error(msg)
+            finally:
+                if report_type in [
+                    OrderReport.REPORT_TYPES.anomaly,
+                    OrderReport.REPORT_TYPES.error,
+                ]:
+                    labels["outcome"] = ERROR
+                    queue_context = QueueStatusContext(order_queue=order_queue)
+                    queue_context.transition(status=Queue.STATUS.failed)
+
+                    order_report, is_created = OrderReport.objects.get_or_create(
+                        order=order_queue
+                    )
+                    order_report.write_body(data=msg, desc=desc)
+                    order_report.report_type = report_type
+                    order_report.save()
+                    logger.info(f"Fail processing orders: {order_queue}")
 
     @staticmethod
     def update_order_account_status(execution_management: ExecutionManagement):
@@ -665,6 +1044,8 @@ class ExecutionManagementRegister(Task, PortfolioMapMixin):
         _remaining_number_of_order = order_type_to_plan["remaining_number_of_order"]
         order_queue = Queue.objects.get(id=_queue_id)
         try:
+            if exchange_rate is None:
+                exchange_rate = get_exchange_rate(vendor_code)
             em = ExecutionManagement(
                 account_alias=order_queue.account_alias,
                 order_queue_id=_queue_id,
@@ -829,134 +1210,218 @@ class ExecutionManagementRegister(Task, PortfolioMapMixin):
 
 
 class ErrorAccountMonitor(Task, PortfolioMapMixin):
-    def process(self, monitor_dates, *args, **kwargs):
+    """
+    일자별 에러 계좌 발생/해결 기록
+
+    - 일자 조회는 created, updated_at 범위 조건(인덱스 사용)
+    - 일자별 watermark(마지막으로 처리한 Queue, OrderLog id, 계좌 updated_at)를
+      ErrorMonitorWatermark 에 저장, 재실행 시 Queue/OrderLog/계좌에서 판단하는 에러는
+      이후 생성/변경분만 처리(watermark 가 없거나 full_scan 이면 해당 일자 전체 처리)
+    - 포트폴리오(비중 합, 가격 조회)에서 판단하는 에러(2001, 2002)는 매 실행 일자 전체 처리
+    - 에러 발생/해결이 기록되면 이후 일자 watermark 삭제(이후 일자 재실행 시 전체 처리)
+    - 기존 에러 여부, 해결 대상은 집계/서브쿼리로 조회
+    """
+
+    def process(self, monitor_dates, full_scan=False, *args, **kwargs):
         monitor_dates = (
             monitor_dates
             if monitor_dates is not None
             else [(datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")]
         )
-        exclude_notes = ["리밸런싱 조건에 미해당", "해당 국가 휴일로 주문 불가능합니다."]
 
         for s_date in monitor_dates:
-            s_date_utc = datetime.strptime(s_date, "%Y-%m-%d")
-            # 01. 날짜에 해당하는 Queue, 로그, 리포트  찾기.
-            daily_account = Account.objects.filter(
-                updated_at__gte=s_date_utc,
-                updated_at__lte=s_date_utc + timedelta(days=1),
+            self.monitor(
+                s_date=s_date,
+                exclude_notes=ERROR_MONITOR_EXCLUDE_NOTES,
+                full_scan=full_scan,
             )
-            daily_queue = Queue.objects.filter(created__startswith=s_date)
-            daily_orderlog = OrderLog.objects.filter(
-                created__startswith=s_date
-            ).exclude(error_msg__in=exclude_notes)
-            if len(daily_orderlog) == 0:
-                continue
+        self.check_sell_fail_account()
 
-            # 02. 에러 계좌 현황
-            error_solved_queryset = ErrorOccur.objects.filter(
-                Q(errorsolved__solved_at__isnull=False)
-            )
-            error_live_queryset = ErrorOccur.objects.filter(
-                Q(errorsolved__solved_at__isnull=True), Q(occured_at__lte=s_date_utc)
+    @staticmethod
+    def get_watermark(s_date, full_scan=False) -> dict:
+        watermark = None
+        if not full_scan:
+            watermark = (
+                ErrorMonitorWatermark.objects.filter(monitor_date=s_date)
+                .values("queue_id", "orderlog_id", "account_updated_at")
+                .first()
             )
-            error_live_accnts = error_live_queryset.values_list(
-                "account_alias", flat=True
-            ).distinct()
+        return watermark or {
+            "queue_id": 0,
+            "orderlog_id": 0,
+            "account_updated_at": None,
+        }
+
+    @staticmethod
+    def set_watermark(s_date, watermark: dict):
+        ErrorMonitorWatermark.objects.update_or_create(
+            monitor_date=s_date, defaults=watermark
+        )
+
+    def monitor(self, s_date, exclude_notes, full_scan=False):
+        s_date_utc = datetime.strptime(s_date, "%Y-%m-%d")
+        e_date_utc = s_date_utc + timedelta(days=1)
+
+        # created__startswith(UTC 문자열 비교)와 같은 범위
+        created_from = timezone.make_aware(s_date_utc, pytz.utc)
+        created_to = created_from + timedelta(days=1)
+
+        # 01. 날짜에 해당하는 Queue, 로그, 계좌 찾기(watermark 이후)
+        day_orderlog = OrderLog.objects.filter(
+            created__gte=created_from, created__lt=created_to
+        ).exclude(error_msg__in=exclude_notes)
+        if not day_orderlog.exists():
+            return
+
+        watermark = self.get_watermark(s_date, full_scan=full_scan)
+        day_queue = Queue.objects.filter(
+            created__gte=created_from, created__lt=created_to
+        )
+        day_account = Account.objects.filter(
+            updated_at__gte=s_date_utc, updated_at__lte=e_date_utc
+        )
+        new_watermark = {
+            "queue_id": day_queue.aggregate(max_id=Max("id"))["max_id"] or 0,
+            "orderlog_id": day_orderlog.aggregate(max_id=Max("id"))["max_id"] or 0,
+            "account_updated_at": day_account.aggregate(
+                max_updated_at=Max("updated_at")
+            )["max_updated_at"],
+        }
 
-            # 03. 오늘자 에러 계좌 찾기.
-            type_to_error_account_alias = self.get_type_to_error_account_alias(
-                s_date, exclude_notes, daily_orderlog, daily_queue, daily_account
+        daily_queue = day_queue.filter(
+            id__gt=watermark["queue_id"], id__lte=new_watermark["queue_id"]
+        )
+        daily_orderlog = day_orderlog.filter(
+            id__gt=watermark["orderlog_id"], id__lte=new_watermark["orderlog_id"]
+        )
+        daily_account = day_account
+        if new_watermark["account_updated_at"] is not None:
+            daily_account = daily_account.filter(
+                updated_at__lte=new_watermark["account_updated_at"]
+            )
+        if watermark["account_updated_at"] is not None:
+            daily_account = daily_account.filter(
+                updated_at__gt=watermark["account_updated_at"]
             )
 
-            # 04. 에러 해결된 계좌 업데이트.
-            daily_queue_excluded = daily_queue.exclude(note__in=exclude_notes)
-            solved_ids = self.get_error_solved_accnts(
-                error_live_queryset,
-                daily_queue_excluded,
-                daily_account,
-                type_to_error_account_alias,
-                s_date_utc,
+        # 02. 오늘자 에러 계좌 찾기.
+        type_to_error_account_alias = self.get_type_to_error_account_alias(
+            s_date,
+            exclude_notes,
+            daily_orderlog,
+            daily_queue,
+            daily_account,
+            portfolio_queue=day_queue,
+        )
+
+        # 03. 에러 해결된 계좌 업데이트.
+        solved_ids = list(
+            self.get_error_solved_accnts(
+                daily_queue_excluded=daily_queue.exclude(note__in=exclude_notes),
+                daily_account=daily_account,
+                pwd_error_orderlog=self.get_pwd_error_orderlog(day_orderlog),
+                s_date_utc=s_date_utc,
             )
-            solved_errors = []
-            for sovled_id in solved_ids:
-                solve_error_object = ErrorSolved(
-                    error_occur_id=sovled_id,
-                    solved_at=s_date,
-                )
-                solved_errors.append(solve_error_object)
-            ErrorSolved.objects.bulk_create(solved_errors)
-
-            # 05. 신규 에러 계좌 업데이트.
-            new_errors = []
-            for error_id in type_to_error_account_alias:
-                error_accnts = list(type_to_error_account_alias[error_id].keys())
-
-                already_error_solved_accnts = (
-                    error_solved_queryset.filter(
-                        occured_at__lte=s_date_utc,
-                        errorsolved__solved_at__gte=s_date_utc,
-                        error_id=error_id,
-                    )
-                    .values_list("account_alias", flat=True)
-                    .distinct()
-                )
+        )
+        ErrorSolved.objects.bulk_create(
+            [
+                ErrorSolved(error_occur_id=solved_id, solved_at=s_date)
+                for solved_id in solved_ids
+            ]
+        )
 
-                already_error_live_accnts = (
-                    error_live_queryset.filter(error_id=error_id)
-                    .values_list("account_alias", flat=True)
-                    .distinct()
+        # 04. 신규 에러 계좌 업데이트.
+        existing_errors = self.get_existing_errors(
+            s_date_utc=s_date_utc,
+            error_ids=list(type_to_error_account_alias.keys()),
+            account_aliases={
+                account_alias
+                for error_accounts in type_to_error_account_alias.values()
+                for account_alias in error_accounts
+            },
+        )
+        new_errors = ErrorOccur.objects.bulk_create(
+            [
+                ErrorOccur(
+                    error_id=error_id,
+                    order_id=order_id,
+                    account_alias=account_alias,
+                    occured_at=s_date,
                 )
+                for error_id, error_accounts in type_to_error_account_alias.items()
+                for account_alias, order_id in error_accounts.items()
+                if (error_id, account_alias) not in existing_errors
+            ]
+        )
+        if solved_ids or new_errors:
+            # 이후 일자의 기존 에러/해결 대상이 바뀌므로 이후 일자는 다음 실행 시 전체 처리
+            ErrorMonitorWatermark.objects.filter(monitor_date__gt=s_date).delete()
+        self.set_watermark(s_date, new_watermark)
 
-                new_error_accounts = list(
-                    set(error_accnts)
-                    - set(already_error_live_accnts)
-                    - set(already_error_solved_accnts)
-                )
-                for account_alias in new_error_accounts:
-                    new_error_object = ErrorOccur(
-                        error_id=error_id,
-                        order_id=type_to_error_account_alias[error_id][account_alias],
-                        account_alias=account_alias,
-                        occured_at=s_date,
-                    )
-                    new_errors.append(new_error_object)
+    @staticmethod
+    def get_existing_errors(s_date_utc, error_ids, account_aliases) -> set:
+        """
+        s_date_utc 기준 미해결 에러, s_date_utc 이후 해결된 에러
+        :return: {(error_id, account_alias)}
+        """
+        if not account_aliases:
+            return set()
+        return set(
+            ErrorOccur.objects.filter(
+                error_id__in=error_ids,
+                account_alias__in=account_aliases,
+                occured_at__lte=s_date_utc,
+            )
+            .filter(
+                Q(errorsolved__solved_at__isnull=True)
+                | Q(errorsolved__solved_at__gte=s_date_utc)
+            )
+            .values_list("error_id", "account_alias")
+            .distinct()
+        )
 
-            ErrorOccur.objects.bulk_create(new_errors)
-        self.check_sell_fail_account()
+    @staticmethod
+    def get_pwd_error_orderlog(orderlog_queryset):
+        return orderlog_queryset.filter(
+            error_msg__isnull=False, error_msg__contains="사고"
+        )
 
     def get_error_solved_accnts(
         self,
-        error_live_queryset,
         daily_queue_excluded,
         daily_account,
-        type_to_error_account_alias,
+        pwd_error_orderlog,
         s_date_utc,
     ):
-        error_live_accnts = error_live_queryset.values_list(
-            "account_alias", flat=True
-        ).distinct()
-        canceled_accnts = daily_account.filter(status=0).values_list(
-            "account_alias", flat=True
-        )
-
-        queue_order_ok = daily_queue_excluded.filter(note__isnull=True).exclude(
-            account_alias__in=list(type_to_error_account_alias[1005].keys())
-        )
-        queue_order_ok_accnts = list(
-            queue_order_ok.values_list("account_alias", flat=True)
+        queue_order_ok_accnts = (
+            daily_queue_excluded.filter(note__isnull=True)
+            .exclude(
+                account_alias__in=pwd_error_orderlog.values("order__account_alias")
+            )
+            .values("account_alias")
         )
+        canceled_accnts = daily_account.filter(status=0).values("account_alias")
 
-        solved_accnts = list(
-            (set(error_live_accnts) & set(queue_order_ok_accnts)) | set(canceled_accnts)
-        )
-        solved_ids = error_live_queryset.filter(
-            account_alias__in=solved_accnts
+        return ErrorOccur.objects.filter(
+            Q(account_alias__in=queue_order_ok_accnts)
+            | Q(account_alias__in=canceled_accnts),
+            errorsolved__solved_at__isnull=True,
+            occured_at__lte=s_date_utc,
         ).values_list("error_occur_id", flat=True)
-        return solved_ids
 
     def get_type_to_error_account_alias(
-        self, s_date, exclude_notes, daily_orderlog, daily_queue, daily_account
+        self,
+        s_date,
+        exclude_notes,
+        daily_orderlog,
+        daily_queue,
+        daily_account,
+        portfolio_queue=None,
     ):
-
+        """
+        :param portfolio_queue: 포트폴리오 에러(2001, 2002) 판단 대상 Queue(기본값 daily_queue)
+        """
+        portfolio_queue = daily_queue if portfolio_queue is None else portfolio_queue
         daily_queue_excluded = daily_queue.exclude(note__in=exclude_notes)
         type_to_error_account_alias = {}
         portfolio_map = self.get_portfolio_map(filter_date=s_date)
@@ -973,31 +1438,30 @@ class ErrorAccountMonitor(Task, PortfolioMapMixin):
                 if df_port_data["weight"].sum().round(6) != 1:
                     wgt_error_port_seqs.append(port_seq)
 
-        port_seq_to_error_tickers = {}
-        for port_seq in port_seq_to_mp_tickers.keys():
-            port_seq_to_error_tickers[port_seq] = []
-            mps = port_seq_to_mp_tickers[port_seq]
-            for ticker in mps:
-                try:
-                    data_stager.get_prices([ticker])
-                except:
-                    port_seq_to_error_tickers[port_seq].append(ticker)
+        # 포트폴리오 간 중복 종목은 1회만 조회
+        mp_tickers = {t for tickers in port_seq_to_mp_tickers.values() for t in tickers}
+        error_tickers = set()
+        for ticker in mp_tickers:
+            try:
+                data_stager.get_prices([ticker])
+            except:
+                error_tickers.add(ticker)
 
         px_error_port_seqs = [
             port_seq
-            for port_seq in port_seq_to_error_tickers
-            if len(port_seq_to_error_tickers[port_seq]) > 0
+            for port_seq, tickers in port_seq_to_mp_tickers.items()
+            if error_tickers.intersection(tickers)
         ]
 
         type_to_error_account_alias[2001] = dict(
-            daily_queue.filter(portfolio_id__in=wgt_error_port_seqs)
+            portfolio_queue.filter(portfolio_id__in=wgt_error_port_seqs)
             .values("account_alias")
             .annotate(max_id=Max("id"))
             .values_list("account_alias", "max_id")
         )
 
         type_to_error_account_alias[2002] = dict(
-            daily_queue.filter(portfolio_id__in=px_error_port_seqs)
+            portfolio_queue.filter(portfolio_id__in=px_error_port_seqs)
             .values("account_alias")
             .annotate(max_id=Max("id"))
             .values_list("account_alias", "max_id")
@@ -1030,11 +1494,8 @@ class ErrorAccountMonitor(Task, PortfolioMapMixin):
             accnt: None for accnt in type_to_error_account_alias[1004]
         }
         # 비밀번호 사고 계좌
-        type_to_error_account_alias[1005] = daily_orderlog.filter(
-            error_msg__isnull=False, error_msg__contains="사고"
-        )
         type_to_error_account_alias[1005] = list(
-            type_to_error_account_alias[1005]
+            self.get_pwd_error_orderlog(daily_orderlog)
             .values_list("order__account_alias", flat=True)
             .distinct()
         )
@@ -1046,22 +1507,16 @@ class ErrorAccountMonitor(Task, PortfolioMapMixin):
 
     def check_sell_fail_account(self):
         # 시장상황 때문에 해지매도 실패 한 경우, 계좌 상태값 해지매도 진행 중으로 원상복구
-        account_sell_failed = Account.objects.filter(
+        # (수동 처리 필요 에러(1001, 1002, 1003)가 모두 해결된 계좌)
+        unsolved_manual_needed_accnts = ErrorOccur.objects.filter(
+            error_id__in=[1001, 1002, 1003], errorsolved__solved_at__isnull=True
+        ).values("account_alias")
+        Account.objects.filter(
             risk_type__isnull=False,
             status__in=[Account.STATUS.account_sell_f1],
-        ).values_list("account_alias", flat=True)
-        for account_alias in account_sell_failed:
-            manual_needed_error_history = ErrorOccur.objects.filter(
-                error_id__in=[1001, 1002, 1003], account_alias__in=[account_alias]
-            )
-            closed_manual_needed_error_history = manual_needed_error_history.filter(
-                errorsolved__solved_at__isnull=False
-            )
-            if len(manual_needed_error_history) == len(
-                closed_manual_needed_error_history
-            ):
-                account_object = Account.objects.filter(account_alias=account_alias)
-                account_object.update(status=Account.STATUS.account_sell_reg)
+        ).exclude(account_alias__in=unsolved_manual_needed_accnts).update(
+            status=Account.STATUS.account_sell_reg
+        )
 
 
 class SplitOrderController(Task, PortfolioMapMixin):
@@ -1131,6 +1586,143 @@ class SplitOrderController(Task, PortfolioMapMixin):
         )
         return order_type_to_plan
 
+    def get_order_steps(self, us_datetime, time_schedule, min_qty):
+        """
+        TIME_SCHEDULE 의 남은 단계(New/Adjust/Cancel) 전체를 시간 순으로 반환
+
+        :return: [(단계 시작 시각, order_type_to_plan)], 단계 간격(초)
+        """
+        now_adjust = us_datetime.strftime("%H:%M")[:-1] + "0"
+        df_schedule = pd.DataFrame(TIME_SCHEDULE[time_schedule])
+        n_row, n_col = df_schedule.shape
+
+        schedule_times = sorted(
+            datetime.strptime(t, "%H:%M") for t in df_schedule.values.flatten()
+        )
+        step_interval = min(
+            (b - a).total_seconds() for a, b in zip(schedule_times, schedule_times[1:])
+        )
+
+        steps = []
+        for idx, step_time in enumerate(df_schedule.values.flatten()):
+            if step_time < now_adjust:
+                continue
+            position, order_type = df_schedule.columns[idx % n_col].split("_")
+            current_number_of_order = int(df_schedule.index[idx // n_col])
+            hour, minute = map(int, step_time.split(":"))
+            steps.append(
+                (
+                    us_datetime.replace(
+                        hour=hour, minute=minute, second=0, microsecond=0
+                    ),
+                    {
+                        "min_qty": int(min_qty),
+                        "now_strftime": step_time,
+                        "now_adjust": step_time,
+                        "position": position[0],
+                        "order_type": order_type,
+                        "current_number_of_order": current_number_of_order,
+                        "total_number_of_order": int(n_row),
+                        "remaining_number_of_order": int(
+                            n_row - current_number_of_order
+                        ),
+                    },
+                )
+            )
+        return sorted(steps, key=lambda step: step[0]), step_interval
+
+    def scheduler(
+        self, vendor_code, time_schedule, min_qty, spread_ratio=TWAP_SPREAD_RATIO
+    ):
+        """
+        TWAP 단계 시각마다 beat 로 실행, 현재 단계의 큐별 실행 task 를 분산 예약
+        (execute_order_fount 의 시간대별 폴링 대체)
+
+        - 큐 목록은 단계마다 조회(장중 등록된 큐 포함)
+        - 단계 내 큐 실행 시점을 단계 간격 * spread_ratio 범위에 균등 분산,
+          countdown/expires 모두 단계 간격 이내(broker visibility_timeout 재전달 방지)
+        - 환율은 단계 실행 시점에 조회(get_exchange_rate)
+        - 잔여 수량은 실행 시점 체결 내역 기준으로 calc_order_basket 에서 재계산
+        - 완료/실패/취소된 큐, 이미 실행된 큐별 단계(claim_step)는 실행하지 않음
+        - 포트폴리오 조회 실패 큐는 건너뛰고 나머지 큐는 예약
+
+        :return: {"steps": 단계 수, "tasks": 예약 task 수, "skipped": 건너뛴 큐 수}
+        """
+        us_datetime = get_us_today()
+        steps, step_interval = self.get_order_steps(us_datetime, time_schedule, min_qty)
+        summary = {"steps": 0, "tasks": 0, "skipped": 0}
+        if not steps:
+            return summary
+
+        step_datetime = steps[0][0]
+        step_countdown = max((step_datetime - us_datetime).total_seconds(), 0)
+        if step_countdown >= step_interval:
+            return summary
+        steps = [(dt, plan) for dt, plan in steps if dt == step_datetime]
+
+        portfolio_map = self.get_portfolio_map(
+            filter_date=us_datetime.date().strftime("%Y-%m-%d")
+        )
+        for _, order_type_to_plan in steps:
+            queues = list(
+                self.get_order_queues(
+                    vendor_code, us_datetime.date(), order_type_to_plan["position"]
+                ).values_list("id", "portfolio_id")
+            )
+            spread = step_interval * spread_ratio / max(len(queues), 1)
+            expires = step_countdown + step_interval
+
+            for rank, (queue_id, portfolio_id) in enumerate(queues):
+                countdown = step_countdown + rank * spread
+                if order_type_to_plan["order_type"] in ["Cancel"]:
+                    self.run_split_cancel.apply_async(
+                        [vendor_code, queue_id, None, order_type_to_plan],
+                        retry=False,
+                        countdown=countdown,
+                        expires=expires,
+                    )
+                else:
+                    strategy = str(portfolio_id)[-5:-3]
+                    risk_type = str(portfolio_id)[-3]
+                    try:
+                        port = portfolio_map[strategy][str(risk_type)]["port_data"]
+                    except (KeyError, TypeError):
+                        logger.error(
+                            f"TWAP schedule skipped({queue_id}): "
+                            f"no portfolio for {portfolio_id}"
+                        )
+                        summary["skipped"] += 1
+                        continue
+                    self.run_split_execution.apply_async(
+                        [queue_id, port, None, vendor_code, order_type_to_plan],
+                        retry=False,
+                        countdown=countdown,
+                        expires=expires,
+                    )
+                summary["tasks"] += 1
+            summary["steps"] += 1
+
+        logger.info(
+            f"TWAP scheduled({vendor_code}, {time_schedule}, "
+            f"{step_datetime.strftime('%H:%M')}): {summary}"
+        )
+        return summary
+
+    @staticmethod
+    def is_active_queue(queue_id) -> bool:
+        return Queue.objects.filter(
+            id=queue_id, status__in=[Queue.STATUS.on_hold, Queue.STATUS.processing]
+        ).exists()
+
+    @staticmethod
+    def claim_step(queue_id, order_type_to_plan) -> bool:
+        """큐별 TWAP 단계 최초 실행 여부(task 재전달, 중복 예약 시 재주문 방지)"""
+        return caches["default"].add(
+            f"twap:{queue_id}:{order_type_to_plan['now_adjust']}",
+            order_type_to_plan["order_type"],
+            timeout=TWAP_STEP_CLAIM_TIMEOUT,
+        )
+
     def get_order_queues(self, vendor_code, search_date, position):
         if position.upper() == "S":
             cancel_accounts = Account.objects.filter(
@@ -1192,16 +1784,22 @@ class SplitOrderController(Task, PortfolioMapMixin):
         sub_task_expires=1,
     ):
         results = []
-        for _queue in order_queues.iterator():
-            strategy = str(_queue.portfolio_id)[-5:-3]
-            risk_type = str(_queue.portfolio_id)[-3]
-            port = portfolio_map[strategy].get(str(risk_type))["port_data"]
-            res = self.run_split_execution.apply_async(
-                [_queue.id, port, exchange_rate, vendor_code, order_type_to_plan],
-                retry=False,
-                expires=sub_task_expires,
-            )
-            results.append(res)
+        with timed(
+            STAGE_EXECUTE_TWAP,
+            name=order_type_to_plan["order_type"],
+            vendor=vendor_code,
+            position=order_type_to_plan["position"],
+        ):
+            for _queue in order_queues.iterator():
+                strategy = str(_queue.portfolio_id)[-5:-3]
+                risk_type = str(_queue.portfolio_id)[-3]
+                port = portfolio_map[strategy].get(str(risk_type))["port_data"]
+                res = self.run_split_execution.apply_async(
+                    [_queue.id, port, exchange_rate, vendor_code, order_type_to_plan],
+                    retry=False,
+                    expires=sub_task_expires,
+                )
+                results.append(res)
         return results
 
     def execute_cancel(
@@ -1232,6 +1830,10 @@ class SplitOrderController(Task, PortfolioMapMixin):
         *args,
         **kwargs,
     ):
+        if not SplitOrderController.is_active_queue(
+            order_queue_id
+        ) or not SplitOrderController.claim_step(order_queue_id, order_type_to_plan):
+            return
         return runner.process(
             order_queue_id=order_queue_id,
             portfolio=portfolio,
@@ -1253,16 +1855,26 @@ class SplitOrderController(Task, PortfolioMapMixin):
         *args,
         **kwargs,
     ):
+        if not SplitOrderController.is_active_queue(
+            _queue_id
+        ) or not SplitOrderController.claim_step(_queue_id, order_type_to_plan):
+            return
         data_stager = CachedTickerStager(api_url=INFOMAX_BACKEND.API_HOST)
-        return runner.cancel_twap_orders(
-            vendor_code,
-            _queue_id,
-            exchange_rate,
-            data_stager,
-            order_type_to_plan=order_type_to_plan,
-            *args,
-            **kwargs,
-        )
+        with timed(
+            STAGE_SPLIT_EXECUTION,
+            name=order_type_to_plan["order_type"],
+            vendor=vendor_code,
+            position=order_type_to_plan["position"],
+        ):
+            return runner.cancel_twap_orders(
+                vendor_code,
+                _queue_id,
+                exchange_rate,
+                data_stager,
+                order_type_to_plan=order_type_to_plan,
+                *args,
+                **kwargs,
+            )
 
 
 # 환전
@@ -1359,6 +1971,165 @@ class CurrencyExchangerRunnerForAllAccountsNormalWithVendor(
         return exchange_account_normal
 
 
+class AbstractCurrencyExchangerBatchRunner(ABC, Task):
+    """
+    환전 실행 - 특정 증권사 전체 계좌 일괄 처리
+
+    - 환전 가능 금액 조회: 계좌 전체를 EXCHANGE_BATCH_MAX_WORKERS 로 동시 조회
+    - 환전 신청: wave_size 계좌 단위로 동시 신청
+    - 증권사별 요청량은 BrokerTrafficGuard(EXCHANGE) 로 제한
+    - 재시도 가능한 오류(환율 변경, 통신 오류, rate limit)는 worker 에서 대기하지 않고
+      해당 계좌만 모아 countdown 후 재실행(최대 EXCHANGE_BATCH_MAX_ATTEMPTS 회)
+    """
+
+    exchanger = AbstractCurrencyExchanger
+    retryable_errors = (
+        APIResultFailureRetryableError,
+        BrokerUnavailable,
+        requests.RequestException,
+    )
+
+    @abstractproperty
+    def get_accounts(self):
+        pass
+
+    def process(
+        self,
+        vendor_code: str,
+        account_aliases: list = None,
+        attempt: int = 1,
+        wave_size: int = EXCHANGE_BATCH_WAVE_SIZE,
+        *args,
+        **kwargs,
+    ) -> dict:
+        if account_aliases is None:
+            account_aliases = get_account_aliases_from_accounts_with_test_account_aliases(
+                self.get_accounts(vendor_code), kwargs.get("test_account_aliases")
+            )
+        if kwargs.get("is_dry_run", False):
+            return CurrencyExchangerRunnerForAllAccountsWithVendorResult(
+                account_aliases
+            ).data
+
+        batch_result = CurrencyExchangerBatchResult(
+            vendor_code=vendor_code, attempt=attempt
+        )
+        exchangers = []
+        for account in Account.objects.filter(account_alias__in=account_aliases):
+            exchanger = self.exchanger(account)
+            try:
+                exchanger.validate()
+            except WrongTargetError as e:
+                batch_result.add(CurrencyExchangerResultForFailed(account, e))
+                continue
+            exchangers.append(exchanger)
+
+        # 1. 환전 가능 금액 조회
+        with ThreadPoolExecutor(max_workers=EXCHANGE_BATCH_MAX_WORKERS) as executor:
+            currencies = list(executor.map(self.get_exchangeable, exchangers))
+
+        # 2. 환전 신청(wave 단위)
+        targets = []
+        for exchanger, currency in zip(exchangers, currencies):
+            if isinstance(currency, CurrencyExchangerResultForFailed):
+                batch_result.add(currency)
+            else:
+                targets.append((exchanger, currency))
+
+        for i in range(0, len(targets), wave_size):
+            with ThreadPoolExecutor(max_workers=EXCHANGE_BATCH_MAX_WORKERS) as executor:
+                for result in executor.map(
+                    lambda target: self.exchange(*target), targets[i : i + wave_size]
+                ):
+                    batch_result.add(result)
+
+        self.reschedule(vendor_code, batch_result, wave_size)
+        result = batch_result.data
+        logger.info(
+            f"[환전][일괄] 증권사 {vendor_code}, attempt {attempt}: {result['count']}"
+        )
+        return result
+
+    def get_exchangeable(self, exchanger: AbstractCurrencyExchanger):
+        try:
+            return exchanger.get_exchangeable(exchanger.account)
+        except Exception as e:
+            return self.fail(exchanger.account, e)
+        finally:
+            connections.close_all()
+
+    def exchange(self, exchanger: AbstractCurrencyExchanger, usd_currency):
+        try:
+            return exchanger.process_without_retry(usd_currency=usd_currency)
+        except Exception as e:
+            return self.fail(exchanger.account, e)
+        finally:
+            connections.close_all()
+
+    def fail(self, account: Account, error: Exception):
+        is_retryable = isinstance(error, self.retryable_errors)
+        logger.info(
+            f"[환전][일괄][오류] Account {account.account_alias} - {error}"
+            f"{'(재시도)' if is_retryable else ''}"
+        )
+        return CurrencyExchangerResultForFailed(account, error, is_retryable)
+
+    def reschedule(
+        self, vendor_code, batch_result: CurrencyExchangerBatchResult, wave_size
+    ):
+        if not batch_result.retry_account_aliases:
+            return
+        if batch_result.attempt >= EXCHANGE_BATCH_MAX_ATTEMPTS:
+            logger.warning(
+                f"[환전][일괄] 증권사 {vendor_code} 재시도 횟수 초과: "
+                f"{batch_result.retry_account_aliases}"
+            )
+            return
+
+        exchanger = self.exchanger
+        countdown = min(
+            max(
+                exchanger.RETRY_WAIT_EXPONENTIAL_MULTIPLIER
+                * 2 ** batch_result.attempt,
+                exchanger.RETRY_WAIT_EXPONENTIAL_MIN,
+            ),
+            exchanger.RETRY_WAIT_EXPONENTIAL_MAX,
+        )
+        self.apply_async(
+            kwargs=dict(
+                vendor_code=vendor_code,
+                account_aliases=batch_result.retry_account_aliases,
+                attempt=batch_result.attempt + 1,
+                wave_size=wave_size,
+            ),
+            countdown=countdown,
+        )
+
+
+class CurrencyExchangerBatchRunnerForAccountsBeingClosed(
+    AbstractCurrencyExchangerBatchRunner
+):
+    """환전 실행 - 특정 증권사 전체 계좌 일괄 처리(해지 매도 계좌)"""
+
+    exchanger = CurrencyExchangerForAccountBeingClosed
+
+    @property
+    def get_accounts(self):
+        return get_accounts_being_closed_etf
+
+
+class CurrencyExchangerBatchRunnerForAccountsNormal(
+    AbstractCurrencyExchangerBatchRunner
+):
+    """환전 실행 - 특정 증권사 전체 계좌 일괄 처리(정상 계좌)"""
+
+    exchanger = CurrencyExchangerForAccountNormal
+
+    @property
+    def get_accounts(self):
+        return get_accounts_normal_etf
+
+
 @shared_task(bind=True, base=CurrencyExchangerRunnerForAccountBeingClosed)
 def exchange_account_being_closed(
     self: CurrencyExchangerRunnerForAccountBeingClosed, account_alias: str
@@ -2,6 +2,7 @@ import logging
 from celery import shared_task
 from django.conf import settings
 
+from api.bases.core.metrics import STAGE_EXECUTE_TWAP, STAGE_FETCH_ACCOUNTS, timed
 from api.bases.managements.task_runners import (
     OrderAccountFetcher,
     ExecutionManagementRegister,
@@ -9,6 +10,8 @@ from api.bases.managements.task_runners import (
     SplitOrderController,
     CurrencyExchangerRunnerForAllAccountsBeingClosedWithVendor,
     CurrencyExchangerRunnerForAllAccountsNormalWithVendor,
+    CurrencyExchangerBatchRunnerForAccountsBeingClosed,
+    CurrencyExchangerBatchRunnerForAccountsNormal,
 )
 from common.utils import cast_str_to_int
 
@@ -19,7 +22,8 @@ TR_BACKEND = settings.TR_BACKEND
 @shared_task(bind=True, base=OrderAccountFetcher)
 def order_account_selection(self, vendor_code=None, *args, **kwargs):
     try:
-        return self.process(vendor_code=vendor_code, *args, **kwargs)
+        with timed(STAGE_FETCH_ACCOUNTS, vendor=vendor_code):
+            return self.process(vendor_code=vendor_code, *args, **kwargs)
     except Exception as e:
         logger.error(str(e))
 
@@ -78,6 +82,17 @@ def execute_order_fount(
         logger.error(str(e))
 
 
+@shared_task(bind=True, base=SplitOrderController)
+def schedule_order_fount(
+    self, vendor_code=None, time_schedule="full", min_qty=20, *args, **kwargs
+):
+    try:
+        with timed(STAGE_EXECUTE_TWAP, name="schedule", vendor=vendor_code):
+            return self.scheduler(vendor_code, time_schedule, min_qty, *args, **kwargs)
+    except Exception as e:
+        logger.error(str(e))
+
+
 # 환전
 @shared_task(bind=True, base=CurrencyExchangerRunnerForAllAccountsBeingClosedWithVendor)
 def exchange_accounts_being_closed(self, vendor_code=None, *args, **kwargs):
@@ -99,6 +114,26 @@ def exchange_accounts_normal(self, vendor_code=None, *args, **kwargs):
         raise e
 
 
+@shared_task(bind=True, base=CurrencyExchangerBatchRunnerForAccountsBeingClosed)
+def exchange_accounts_being_closed_batch(self, vendor_code=None, *args, **kwargs):
+    """환전 실행 - 특정 증권사 전체 계좌 일괄 처리(해지 매도 계좌)"""
+    try:
+        return self.process(vendor_code=vendor_code, *args, **kwargs)
+    except Exception as e:
+        logger.info(f"[환전][일괄 해지 매도 계좌][오류] 증권사 {vendor_code} - {e}")
+        raise e
+
+
+@shared_task(bind=True, base=CurrencyExchangerBatchRunnerForAccountsNormal)
+def exchange_accounts_normal_batch(self, vendor_code=None, *args, **kwargs):
+    """환전 실행 - 특정 증권사 전체 계좌 일괄 처리(정상 계좌)"""
+    try:
+        return self.process(vendor_code=vendor_code, *args, **kwargs)
+    except Exception as e:
+        logger.info(f"[환전][일괄 정상 계좌][오류] 증권사 {vendor_code} - {e}")
+        raise e
+
+
 # Testing
 @shared_task
 def test_error():
@@ -0,0 +1,13 @@
+import os
+
+import pytest
+
+# 실행 시간이 길어(50k 계좌 기준 수십 초) RUN_BENCHMARKS=1(혹은 UPDATE_GOLDEN=1) 인 경우에만 실행
+RUN_BENCHMARKS = "1" in (
+    os.environ.get("RUN_BENCHMARKS"),
+    os.environ.get("UPDATE_GOLDEN"),
+)
+
+benchmark_only = pytest.mark.skipif(
+    not RUN_BENCHMARKS, reason="benchmark, run with RUN_BENCHMARKS=1"
+)
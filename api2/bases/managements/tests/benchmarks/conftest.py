@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+import time
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+try:
+    import pytest_benchmark
+except ImportError:
+    pytest_benchmark = None
+
+logger = logging.getLogger(__name__)
+
+GOLDEN_PATH = Path(__file__).parent / "golden.json"
+BENCHMARK_ROUNDS = 3
+
+
+@pytest.fixture(scope="session")
+def golden():
+    """
+    벤치마크 결과 hash 비교, UPDATE_GOLDEN=1 인 경우 golden.json 갱신
+    (계산 로직 최적화 시 결과가 같음을 확인)
+    """
+    is_update = os.environ.get("UPDATE_GOLDEN") == "1"
+    golden_set = json.loads(GOLDEN_PATH.read_text()) if GOLDEN_PATH.exists() else {}
+    results = dict()
+
+    def check(case_id, result_digest):
+        results[case_id] = result_digest
+        if is_update:
+            return
+        if case_id not in golden_set:
+            pytest.skip(f"{case_id} is not in golden set, run with UPDATE_GOLDEN=1")
+        assert golden_set[case_id] == result_digest, f"{case_id} differs from golden"
+
+    yield check
+
+    if is_update:
+        golden_set.update(results)
+        GOLDEN_PATH.write_text(json.dumps(golden_set, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.fixture
+def measure(request):
+    """
+    func 실행 시간(pytest-benchmark 가 없으면 perf_counter), 최대 메모리(tracemalloc) 측정
+    :return: func 결과
+    """
+
+    def run(func, *args, **kwargs):
+        tracemalloc.start()
+        try:
+            result = func(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        if pytest_benchmark is not None:
+            benchmark = request.getfixturevalue("benchmark")
+            benchmark.extra_info["peak_memory_kb"] = round(peak / 1024, 1)
+            benchmark.pedantic(
+                func, args=args, kwargs=kwargs, rounds=BENCHMARK_ROUNDS, iterations=1
+            )
+            return result
+
+        elapsed = []
+        for _ in range(BENCHMARK_ROUNDS):
+            started = time.perf_counter()
+            func(*args, **kwargs)
+            elapsed.append(time.perf_counter() - started)
+        logger.info(
+            f"{request.node.name}: min {min(elapsed) * 1000:.2f}ms, "
+            f"peak memory {peak / 1024:.1f}KiB"
+        )
+        return result
+
+    return run
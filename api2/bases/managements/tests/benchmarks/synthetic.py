@@ -0,0 +1,87 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+MIN_PRICE, MAX_PRICE = 5_000, 500_000  # krw
+MIN_BASE, MAX_BASE = 1_000_000, 50_000_000  # krw
+EXCHANGE_RATE = 1_300.0
+
+
+def create_portfolio(n_assets: int, seed: int = 0):
+    """
+    :return: MP([{"code", "weight"}]), asset_prices(index: code, krw_price, usd_price)
+    """
+    rng = np.random.default_rng(seed)
+    codes = [f"T{i:03d}" for i in range(n_assets)]
+    weights = rng.uniform(0.5, 1.5, size=n_assets)
+    weights = np.round(weights / weights.sum(), 6)
+    weights[-1] = round(1 - weights[:-1].sum(), 6)
+
+    # MP 외 보유 종목 가격 포함
+    n_universe = n_assets + max(n_assets // 5, 1)
+    universe = codes + [f"H{i:03d}" for i in range(n_universe - n_assets)]
+    krw_price = np.round(rng.uniform(MIN_PRICE, MAX_PRICE, size=n_universe), 0)
+    asset_prices = pd.DataFrame(
+        {"krw_price": krw_price, "usd_price": krw_price / EXCHANGE_RATE},
+        index=pd.Index(universe, name="code"),
+    )
+    portfolio = [{"code": c, "weight": float(w)} for c, w in zip(codes, weights)]
+    return portfolio, asset_prices
+
+
+def create_account_book(
+    n_accounts: int, asset_prices: pd.DataFrame, held_ratio=0.5, seed: int = 0
+):
+    """
+    :return: bases(index: account_alias), {account_alias: current_portfolio}
+    보유 계좌(held_ratio)는 universe 중 1~5 종목 보유
+    """
+    rng = np.random.default_rng(seed)
+    account_aliases = [f"{seed:02d}{i:08d}" for i in range(n_accounts)]
+    bases = pd.Series(
+        np.round(rng.uniform(MIN_BASE, MAX_BASE, size=n_accounts), 0),
+        index=pd.Index(account_aliases, name="account_alias"),
+    )
+
+    current_portfolios = dict()
+    for account_alias in account_aliases:
+        if rng.random() >= held_ratio:
+            continue
+        n_held = int(rng.integers(1, min(5, len(asset_prices)) + 1))
+        codes = rng.choice(asset_prices.index, size=n_held, replace=False)
+        shares = rng.integers(1, 30, size=n_held).astype(float)
+        buy_price = shares * asset_prices.krw_price[codes].to_numpy()
+        current_portfolios[account_alias] = pd.DataFrame(
+            {"buy_price": buy_price, "shares": shares, "evaluate_amount": buy_price},
+            index=pd.Index(codes, name="code"),
+        )
+    return bases, current_portfolios
+
+
+def create_traded_info(order_basket: pd.DataFrame, fill_ratio=0.3, seed: int = 0):
+    """order_basket 목표 수량의 일부가 체결된 체결 내역"""
+    rng = np.random.default_rng(seed)
+    traded = order_basket.loc[order_basket.new_shares != 0]
+    exec_qty = np.floor(traded.new_shares.abs() * rng.uniform(0, fill_ratio, len(traded)))
+    return pd.DataFrame(
+        {
+            "code": traded.index,
+            "exec_qty": exec_qty,
+            "trade_sec_name": np.where(traded.new_shares > 0, "매수", "매도"),
+            "order_tool_name": "RA(일임사)",
+        }
+    )
+
+
+def digest(data) -> str:
+    """결과 비교용 hash(소수점 6자리)"""
+    if isinstance(data, pd.Series):
+        data = data.to_frame()
+    if isinstance(data, pd.DataFrame):
+        data = data.astype(float).round(6).to_csv()
+    elif isinstance(data, np.ndarray):
+        data = np.round(data.astype(float), 6).tobytes()
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
@@ -0,0 +1,158 @@
+from functools import lru_cache
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from api.bases.managements.components.twap import calc_twap_order_basket
+from api.bases.managements.portfolio.batch import (
+    BatchOrderPriceEngine,
+    BatchPortfolioManager,
+)
+from api.bases.managements.portfolio.manager import PortfolioManager
+from api.bases.managements.portfolio.price_engine import OrderPriceEngine
+from api.bases.managements.tests.benchmarks import benchmark_only
+from api.bases.managements.tests.benchmarks.synthetic import (
+    create_account_book,
+    create_portfolio,
+    create_traded_info,
+    digest,
+)
+
+pytestmark = benchmark_only
+
+EMPHASES = ["optimized_deposit", "weight_first", "strict_ratio", "min_deposit"]
+# 탐색 시간 제한(time_limit)이 있으면 결과가 실행 환경에 따라 달라지므로 노드 수로만 제한
+DETERMINISTIC_OPTIONS = {"max_nodes": 5_000, "time_limit": None}
+OPTIMIZED_DEPOSIT_MAX_ACCOUNTS = 100
+
+
+@lru_cache(maxsize=None)
+def get_account_book(n_accounts):
+    """계좌 장부 생성 비용(50k 계좌 기준 수 초)을 emphasis 간 공유"""
+    portfolio, asset_prices = create_portfolio(20, seed=20)
+    bases, current_portfolios = create_account_book(n_accounts, asset_prices)
+    return portfolio, asset_prices, bases, current_portfolios
+
+
+def get_emphasis_options(emphasis):
+    return DETERMINISTIC_OPTIONS if emphasis == "optimized_deposit" else None
+
+
+class TestPortfolioManagerBenchmark:
+    @pytest.mark.parametrize("emphasis", EMPHASES)
+    @pytest.mark.parametrize("n_assets", [5, 20, 60])
+    def test_calc_rebalancing_portfolio(self, measure, golden, n_assets, emphasis):
+        """계좌 1개 리밸런싱 포트폴리오 계산(OrderPriceEngine)"""
+        portfolio, asset_prices = create_portfolio(n_assets, seed=n_assets)
+        bases, current_portfolios = create_account_book(1, asset_prices, held_ratio=1)
+        current_portfolio = next(iter(current_portfolios.values()))
+        current_portfolio["weight"] = current_portfolio.evaluate_amount / bases.iloc[0]
+
+        pm = PortfolioManager(price_engine=OrderPriceEngine(), portfolio=portfolio)
+        result = measure(
+            pm.calc_rebalancing_portfolio,
+            max_ord_base=bases.iloc[0],
+            asset_prices=asset_prices,
+            emphasis=emphasis,
+            emphasis_options=get_emphasis_options(emphasis),
+            current_portfolio=current_portfolio,
+        )
+        golden(f"rebalancing_portfolio[{n_assets}-{emphasis}]", digest(result))
+
+    @pytest.mark.parametrize("emphasis", EMPHASES)
+    @pytest.mark.parametrize("n_accounts", [1, 100, 1_000, 50_000])
+    def test_calc_batch_rebalancing(self, measure, golden, n_accounts, emphasis):
+        """MP 종목 20개, 계좌 n 개 일괄 리밸런싱(BatchOrderPriceEngine)"""
+        if emphasis == "optimized_deposit" and n_accounts > OPTIMIZED_DEPOSIT_MAX_ACCOUNTS:
+            pytest.skip("optimized_deposit 은 계좌별 탐색으로 계좌 100 개까지만 측정")
+
+        portfolio, asset_prices, bases, current_portfolios = get_account_book(n_accounts)
+        bpm = BatchPortfolioManager(
+            price_engine=BatchOrderPriceEngine(),
+            portfolio=portfolio,
+            asset_prices=asset_prices,
+        )
+        result = measure(
+            bpm.calc_batch_rebalancing,
+            bases=bases,
+            current_portfolios=current_portfolios,
+            emphasis=emphasis,
+            emphasis_options=get_emphasis_options(emphasis),
+        )
+        golden(
+            f"batch_rebalancing[{n_accounts}-{emphasis}]",
+            digest(
+                pd.concat(
+                    [
+                        result.order_baskets,
+                        result.is_rebalancing_condition_met.to_frame("is_met")
+                        .reindex(result.order_baskets.index, level="account_alias"),
+                    ],
+                    axis=1,
+                )
+            ),
+        )
+
+
+class TestExecutionManagementBenchmark:
+    @pytest.mark.parametrize("n_assets", [5, 20, 60])
+    def test_create_order_basket(self, measure, golden, n_assets):
+        """OrderManagement.create_order_basket(MP + 보유 종목 주문 바스켓)"""
+        order_manager = pytest.importorskip(
+            "api.bases.managements.order_router.order_manager"
+        )
+        portfolio, asset_prices = create_portfolio(n_assets, seed=n_assets)
+        bases, current_portfolios = create_account_book(1, asset_prices, held_ratio=1)
+        current_portfolio = next(iter(current_portfolios.values()))
+
+        pm = PortfolioManager(price_engine=OrderPriceEngine(), portfolio=portfolio)
+        rebalancing_portfolio = pm.calc_rebalancing_portfolio(
+            max_ord_base=bases.iloc[0], asset_prices=asset_prices, emphasis="min_deposit"
+        )
+        management = SimpleNamespace(portfolio_manager=pm, mode="rebalancing")
+
+        result = measure(
+            order_manager.OrderManagement.create_order_basket,
+            management,
+            current_portfolio=current_portfolio,
+            rebalancing_portfolio=rebalancing_portfolio,
+            asset_prices=asset_prices,
+            testbed_krx_tickers=[],
+        )
+        golden(f"order_basket[{n_assets}]", digest(result.sort_index()))
+
+    @pytest.mark.parametrize("remaining_number_of_order", [0, 5])
+    @pytest.mark.parametrize("n_assets", [5, 20, 60])
+    def test_calc_twap_order_basket(
+        self, measure, golden, n_assets, remaining_number_of_order
+    ):
+        """TWAP 회차별 주문 수량(체결 수량 차감)"""
+        portfolio, asset_prices = create_portfolio(n_assets, seed=n_assets)
+        bases, _ = create_account_book(1, asset_prices, seed=n_assets)
+        bpm = BatchPortfolioManager(
+            price_engine=BatchOrderPriceEngine(),
+            portfolio=portfolio,
+            asset_prices=asset_prices,
+        )
+        order_basket = bpm.calc_batch_rebalancing(
+            bases=bases * 100, current_portfolios={}, emphasis="min_deposit"
+        ).order_baskets.droplevel("account_alias")
+        order_basket = order_basket.loc[order_basket.new_shares > 0]
+        traded_info = create_traded_info(order_basket, seed=n_assets)
+        order_type_to_plan = {
+            "position": "L",
+            "remaining_number_of_order": remaining_number_of_order,
+            "total_number_of_order": 10,
+            "min_qty": 1,
+        }
+
+        result = measure(
+            lambda: calc_twap_order_basket(
+                order_basket.copy(), traded_info.copy(), order_type_to_plan
+            )
+        )
+        golden(
+            f"twap_order_basket[{n_assets}-{remaining_number_of_order}]",
+            digest(result),
+        )
@@ -0,0 +1,112 @@
+import threading
+
+import pytest
+from django.core.cache import caches
+from pytest_mock import MockerFixture
+
+from api.bases.managements.components.data_stagers import (
+    CachedTickerStager,
+    PriceSnapshotStager,
+    TickerStager,
+)
+from api.bases.managements.simulators.broker import SimulatorConfig, create_server
+from api.bases.managements.task_runners import OrderAccountFetcher, get_data_stager
+
+SYMBOLS = ["SPY", "QQQ", "TLT", "IWM", "GLD", "VTI", "EFA"]
+
+
+@pytest.fixture
+def api_url():
+    server = create_server(
+        "127.0.0.1",
+        0,
+        SimulatorConfig(latency_ms=0, latency_jitter_ms=0, symbols=SYMBOLS),
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    caches["default"].clear()
+    caches["price"].clear()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestTickerStager:
+    def test_get_pages(self, api_url, mocker: MockerFixture) -> None:
+        """응답에 next 가 있으면 이어서 조회"""
+        stager = TickerStager(api_url=api_url)
+        stager.page_size = 2
+        get = mocker.spy(stager.session, "get")
+
+        data = stager.get_pages("master", SYMBOLS[:5])
+        assert sorted(item["symbol"] for item in data) == sorted(SYMBOLS[:5])
+        assert get.call_count == 3
+
+    def test_get_data(self, api_url, mocker: MockerFixture) -> None:
+        """symbols 를 page_size 단위로 나눠 조회"""
+        stager = TickerStager(api_url=api_url)
+        stager.page_size = 3
+        get_pages = mocker.spy(stager, "get_pages")
+
+        data = stager.get_data("quote", SYMBOLS)
+        assert sorted(item["symbol"] for item in data) == sorted(SYMBOLS)
+        assert sorted(c.args[1] for c in get_pages.call_args_list) == [
+            ["EFA", "GLD", "IWM"],
+            ["QQQ", "SPY", "TLT"],
+            ["VTI"],
+        ]
+
+    def test_get_master_cache(self, api_url, mocker: MockerFixture) -> None:
+        """master 는 당일 캐시, 가격 캐시 초기화(flush_all) 후에도 재조회하지 않음"""
+        stager = CachedTickerStager(api_url=api_url)
+        get_pages = mocker.spy(stager, "get_pages")
+
+        stager.get_master(SYMBOLS[:3])
+        CachedTickerStager.flush_all()
+        master = stager.get_master(SYMBOLS[:4])
+
+        assert sorted(item["symbol"] for item in master) == sorted(SYMBOLS[:4])
+        assert [c.args[1] for c in get_pages.call_args_list] == [
+            sorted(SYMBOLS[:3]),
+            ["IWM"],
+        ]
+
+
+class TestPriceSnapshotStager:
+    def test_get_prices(self, api_url, mocker: MockerFixture) -> None:
+        """스냅샷 가격 재사용(flush_all 이후 포함), MP 외 종목은 최초 조회 가격을 스냅샷에 추가"""
+        snapshot_id = PriceSnapshotStager.create_snapshot(
+            api_url=api_url, symbols=SYMBOLS[:3]
+        )
+        get_prices = mocker.spy(TickerStager, "get_prices")
+
+        stager = PriceSnapshotStager(api_url=api_url, snapshot_id=snapshot_id)
+        prices = stager.get_prices(SYMBOLS[:3])
+        CachedTickerStager.flush_all()
+        assert stager.get_prices(SYMBOLS[:3]).equals(prices)
+        get_prices.assert_not_called()
+
+        added = stager.get_prices(["SPY", "IWM"])
+        assert get_prices.call_count == 1
+        other_stager = PriceSnapshotStager(api_url=api_url, snapshot_id=snapshot_id)
+        assert other_stager.get_prices(["IWM"]).equals(added.loc[["IWM"]])
+        assert get_prices.call_count == 1
+
+    def test_create_price_snapshot(self, mocker: MockerFixture) -> None:
+        """스냅샷 생성 실패 시 가격 캐시 초기화 후 계좌별 가격 조회(CachedTickerStager)"""
+        fetcher = OrderAccountFetcher()
+        fetcher.portfolio_map = {"01": {"1": {"port_data": [{"code": "SPY"}]}}}
+        create_snapshot = mocker.patch.object(
+            PriceSnapshotStager, "create_snapshot", return_value="snapshot"
+        )
+        flush_all = mocker.patch.object(CachedTickerStager, "flush_all")
+
+        snapshot_id = fetcher.create_price_snapshot()
+        assert create_snapshot.call_args.kwargs["symbols"] == {"SPY"}
+        assert get_data_stager(snapshot_id).snapshot_id == "snapshot"
+        flush_all.assert_not_called()
+
+        create_snapshot.side_effect = RuntimeError
+        snapshot_id = fetcher.create_price_snapshot()
+        assert snapshot_id is None
+        assert type(get_data_stager(snapshot_id)) is CachedTickerStager
+        flush_all.assert_called_once()
@@ -0,0 +1,297 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+import requests
+from django.core.cache import caches
+from pytest_mock import MockerFixture
+
+from api.bases.managements.components.order_account import (
+    ORDER_REQUEST_MAX_WORKERS,
+    ORDER_REQUEST_TIMEOUT,
+    AccountSnapshot,
+    OrderAccountProxy,
+    OrderRequester,
+    RA_CHANNEL_NAME,
+    get_vendor_session,
+)
+from api.bases.managements.models import ASK, BID, OrderLog, Queue
+from api.bases.managements.simulators.broker import SimulatorConfig, create_server
+from common.exceptions import StopOrderOperation
+
+pytestmark = pytest.mark.django_db(databases=["default", "accounts"])
+
+ACCOUNT_NUMBER = "00100000001"
+SYMBOLS = ["SPY", "QQQ", "TLT", "IWM", "GLD"]
+
+
+@pytest.fixture
+def api_url():
+    server = create_server(
+        "127.0.0.1",
+        0,
+        SimulatorConfig(
+            latency_ms=0, latency_jitter_ms=0, fill_rate=0.0, symbols=SYMBOLS
+        ),
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    caches["default"].clear()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def queue() -> Queue:
+    queue = Queue(account_alias="1001", vendor_code="kb", mode=Queue.MODES.bid)
+    queue.save(portfolio_id="2021051712300")
+    return queue
+
+
+def get_response(status_code, json_data=None) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp._content = json.dumps(json_data or {}).encode()
+    return resp
+
+
+def get_order_book_table(codes, trd_type=BID) -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {
+                "account": ACCOUNT_NUMBER,
+                "code": code,
+                "order_price": 100.0,
+                "market_price": 100.0,
+                "ex_code": "US",
+                "exchange_rate": 1300.0,
+                "trd_type": trd_type,
+                "ord_qty": 1,
+            }
+            for code in codes
+        ]
+    )
+
+
+def get_updatable_orders_df(order_logs, update_type) -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {
+                "order_no": order_log.order_no,
+                "trd_type": order_log.type,
+                "account": ACCOUNT_NUMBER,
+                "update_type": update_type,
+                "code": order_log.code,
+                "exchange_rate": 1300.0,
+                "market_price": 101.0,
+                "price": 101.0,
+                "org_price": 100.0,
+                "ord_qty": 1,
+                "req_date": None,
+                "is_old": True,
+                "change_by_gap": False,
+            }
+            for order_log in order_logs
+        ]
+    )
+
+
+def is_cached(snapshot: AccountSnapshot, kind) -> bool:
+    return snapshot.cache.get(snapshot.get_key(kind)) is not None
+
+
+class TestAccountSnapshot:
+    def test_get_or_fetch(self, mocker: MockerFixture) -> None:
+        """TTL 내 재사용, 조회 실패(None)는 캐시하지 않음, ttl=0 이면 캐시 미사용"""
+        caches["default"].clear()
+        snapshot = AccountSnapshot(vendor_code="kb", account_number=ACCOUNT_NUMBER)
+        fetch = mocker.Mock(return_value={"won_exchange_amt": 0})
+
+        assert snapshot.get_or_fetch("balances", fetch) == {"won_exchange_amt": 0}
+        assert snapshot.get_or_fetch("balances", fetch) == {"won_exchange_amt": 0}
+        assert fetch.call_count == 1
+
+        failed_fetch = mocker.Mock(return_value=None)
+        assert snapshot.get_or_fetch("trades", failed_fetch) is None
+        assert snapshot.get_or_fetch("trades", failed_fetch) is None
+        assert failed_fetch.call_count == 2
+        assert not is_cached(snapshot, "trades")
+
+        no_cache_snapshot = AccountSnapshot(
+            vendor_code="kb", account_number=ACCOUNT_NUMBER, ttl=0
+        )
+        no_cache_snapshot.get_or_fetch("balances", fetch)
+        assert fetch.call_count == 2
+
+    def test_invalidate(self) -> None:
+        """계좌의 모든 조회 결과 삭제, 다른 계좌는 유지"""
+        caches["default"].clear()
+        snapshot = AccountSnapshot(vendor_code="kb", account_number=ACCOUNT_NUMBER)
+        other_snapshot = AccountSnapshot(vendor_code="kb", account_number="2")
+        for kind in AccountSnapshot.KINDS:
+            snapshot.get_or_fetch(kind, lambda: {"kind": kind})
+        other_snapshot.get_or_fetch("assets", lambda: {})
+
+        snapshot.invalidate()
+        assert not any(is_cached(snapshot, kind) for kind in AccountSnapshot.KINDS)
+        assert is_cached(other_snapshot, "assets")
+
+
+class TestOrderAccountProxy:
+    def test_checksum_trade_history(self, api_url, mocker: MockerFixture) -> None:
+        """거래내역 조회 실패는 캐시하지 않고 다음 확인 시 다시 조회"""
+        request_trade_history = mocker.patch.object(
+            OrderRequester,
+            "request_trade_history",
+            return_value=get_response(503),
+        )
+        manager = SimpleNamespace(
+            api_base=api_url, vendor_code="kb", account_number=ACCOUNT_NUMBER
+        )
+        proxy = OrderAccountProxy(manager)
+
+        request_trade_history.return_value = get_response(
+            200, {"trades": [{"order_tool_name": "HTS"}]}
+        )
+        with pytest.raises(StopOrderOperation):
+            proxy.checksum_trade_history()
+        assert request_trade_history.call_count == 2
+
+        request_trade_history.return_value = get_response(
+            200, {"trades": [{"order_tool_name": RA_CHANNEL_NAME}]}
+        )
+        proxy.requester.get_snapshot(ACCOUNT_NUMBER).invalidate()
+        assert proxy.checksum_trade_history()
+
+
+class TestOrderRequester:
+    def test_get_vendor_session(self) -> None:
+        """vendor 별 세션 공유, 연결 풀은 동시 전송 수만큼"""
+        session = get_vendor_session("kb")
+        assert get_vendor_session("kb") is session
+        assert get_vendor_session("ebest") is not session
+        assert (
+            session.get_adapter("https://").poolmanager.connection_pool_kw["maxsize"]
+            == ORDER_REQUEST_MAX_WORKERS
+        )
+
+    def test_send_orders(self, mocker: MockerFixture) -> None:
+        """동시 전송해도 응답은 payloads 순서, 요청별 timeout 사용"""
+        caches["default"].clear()
+        requester = OrderRequester(api_base="http://broker.test", vendor_code="kb")
+        lock = threading.Lock()
+        running = [0, 0]  # 현재, 최대 동시 요청 수
+
+        def request(method, url, json, timeout):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            # 앞 요청일수록 늦게 응답
+            time.sleep(0.01 * (8 - json["n"]))
+            with lock:
+                running[0] -= 1
+            return get_response(200, {"order_no": json["n"]})
+
+        session_request = mocker.patch.object(
+            requester.session, "request", side_effect=request
+        )
+        responses = requester._send_orders("post", [{"n": n} for n in range(8)])
+
+        assert [resp.json()["order_no"] for resp in responses] == list(range(8))
+        assert running[1] > 1
+        assert {c.kwargs["timeout"] for c in session_request.call_args_list} == {
+            ORDER_REQUEST_TIMEOUT
+        }
+
+        requester.max_workers = 1
+        running[1] = 0
+        responses = requester._send_orders("post", [{"n": n} for n in range(3)])
+        assert [resp.json()["order_no"] for resp in responses] == list(range(3))
+        assert running[1] == 1
+
+    def test_request_orders_partial_failure(self, queue, mocker: MockerFixture) -> None:
+        """일부 주문 실패(오류 응답, 통신 오류)는 해당 OrderLog 만 실패 처리"""
+        caches["default"].clear()
+        requester = OrderRequester(api_base="http://broker.test", vendor_code="kb")
+        responses = {
+            "SPY": get_response(200, {"order_no": 1}),
+            "QQQ": get_response(400, {"msg": "주문가능수량 초과"}),
+            "TLT": requests.ConnectionError("connection reset"),
+            "IWM": get_response(200, {"order_no": 2}),
+        }
+
+        def request(method, url, json, timeout):
+            resp = responses[json["code"]]
+            if isinstance(resp, Exception):
+                raise resp
+            return resp
+
+        mocker.patch.object(requester.session, "request", side_effect=request)
+        order_logs = requester.request_orders(
+            queue.id, get_order_book_table(list(responses))
+        )
+
+        assert [o.code for o in order_logs] == list(responses)
+        assert list(
+            OrderLog.objects.filter(order=queue)
+            .order_by("id")
+            .values_list("code", "status", "order_no", "error_msg")
+        ) == [
+            ("SPY", OrderLog.STATUS.processing, 1, None),
+            ("QQQ", OrderLog.STATUS.failed, None, "주문가능수량 초과"),
+            ("TLT", OrderLog.STATUS.failed, None, "connection reset"),
+            ("IWM", OrderLog.STATUS.processing, 2, None),
+        ]
+
+    def test_request_orders_timeout(self, queue) -> None:
+        """응답 지연이 read timeout 을 넘으면 주문 실패 처리, 나머지 요청은 계속 진행"""
+        server = create_server(
+            "127.0.0.1",
+            0,
+            SimulatorConfig(latency_ms=300, latency_jitter_ms=0, symbols=SYMBOLS),
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        caches["default"].clear()
+        try:
+            requester = OrderRequester(
+                api_base=f"http://127.0.0.1:{server.server_address[1]}",
+                vendor_code="kb",
+                timeout=(ORDER_REQUEST_TIMEOUT[0], 0.1),
+            )
+            started = time.monotonic()
+            order_logs = requester.request_orders(
+                queue.id, get_order_book_table(SYMBOLS)
+            )
+            elapsed = time.monotonic() - started
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert [o.status for o in order_logs] == [OrderLog.STATUS.failed] * len(SYMBOLS)
+        assert all("timed out" in o.error_msg for o in order_logs)
+        # 동시 전송이므로 전체 소요 시간은 요청 1건의 timeout 수준
+        assert elapsed < 0.1 * len(SYMBOLS)
+
+    @pytest.mark.parametrize("method", ["request", "update", "cancel"])
+    def test_invalidate_snapshots(self, api_url, queue, method) -> None:
+        """주문, 정정, 취소 요청 후 계좌 스냅샷 삭제"""
+        requester = OrderRequester(api_base=api_url, vendor_code="kb")
+        order_logs = requester.request_orders(
+            queue.id, get_order_book_table(SYMBOLS[:2])
+        )
+        snapshot = requester.get_snapshot(ACCOUNT_NUMBER)
+        requester.get_account_assets(ACCOUNT_NUMBER)
+        requester.get_account_balances(ACCOUNT_NUMBER)
+        assert is_cached(snapshot, "assets")
+
+        if method == "request":
+            requester.request_orders(queue.id, get_order_book_table(SYMBOLS[2:3], ASK))
+        elif method == "update":
+            requester.update_orders(queue.id, get_updatable_orders_df(order_logs, 1))
+        else:
+            requester.cancel_orders(queue.id, get_updatable_orders_df(order_logs, 2))
+        assert not is_cached(snapshot, "assets")
+        assert not is_cached(snapshot, "balances")
@@ -0,0 +1,126 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from api.bases.managements.components.order_log_writer import (
+    BULK_BATCH_SIZE,
+    OrderLogWriter,
+)
+from api.bases.managements.models import OrderLog, Queue
+
+pytestmark = pytest.mark.django_db(databases=["default", "accounts"])
+
+
+@pytest.fixture
+def queue() -> Queue:
+    queue = Queue(account_alias="1001", vendor_code="kb", mode=Queue.MODES.bid)
+    queue.save(portfolio_id="2021051712300")
+    return queue
+
+
+def get_lookup(code, shares=1) -> dict:
+    return dict(
+        code=code,
+        type=OrderLog.TYPE.BID_REGISTER,
+        order_price=100.0,
+        market_price=100.0,
+        currency_code="US",
+        shares=shares,
+    )
+
+
+def create_order_log(queue, code, status=OrderLog.STATUS.on_hold, **kwargs):
+    return OrderLog.objects.create(
+        order=queue, status=status, **{**get_lookup(code), **kwargs}
+    )
+
+
+class TestOrderLogWriter:
+    def test_get_or_build(self, queue) -> None:
+        """같은 조회 조건의 대기중 로그는 한 번만 재사용, 나머지는 신규 생성"""
+        on_hold_log = create_order_log(queue, "SPY")
+        create_order_log(queue, "QQQ", status=OrderLog.STATUS.processing)
+
+        writer = OrderLogWriter(order_queue_id=queue.id)
+        order_logs = writer.get_or_build(
+            lookups=[
+                get_lookup("SPY"),
+                get_lookup("SPY"),
+                get_lookup("SPY", shares=2),
+                get_lookup("QQQ"),
+            ]
+        )
+
+        assert order_logs[0].pk == on_hold_log.pk
+        assert [OrderLogWriter.is_created(o) for o in order_logs] == [
+            False,
+            True,
+            True,
+            True,
+        ]
+        assert all(o.status == OrderLog.STATUS.on_hold for o in order_logs[1:])
+
+    def test_mark_ordered(self, queue) -> None:
+        """주문 시각은 신규 로그만 기록"""
+        create_order_log(queue, "SPY")
+        writer = OrderLogWriter(order_queue_id=queue.id)
+        old_log, new_log = writer.get_or_build(
+            lookups=[get_lookup("SPY"), get_lookup("QQQ")]
+        )
+
+        writer.mark_ordered(old_log)
+        writer.mark_ordered(new_log)
+        assert old_log.ordered_at is None
+        assert new_log.ordered_at is not None
+
+    def test_skip_processing(self, queue) -> None:
+        """flush 시 정정된 종목의 진행중 로그만 건너뜀 처리"""
+        processing_log = create_order_log(
+            queue, "SPY", status=OrderLog.STATUS.processing
+        )
+        completed_log = create_order_log(queue, "SPY", status=OrderLog.STATUS.completed)
+        other_log = create_order_log(queue, "QQQ", status=OrderLog.STATUS.processing)
+
+        writer = OrderLogWriter(order_queue_id=queue.id)
+        writer.skip_processing(["SPY"])
+        assert writer.flush() == 1
+
+        statuses = dict(
+            OrderLog.objects.filter(order=queue).values_list("id", "status")
+        )
+        assert statuses == {
+            processing_log.id: OrderLog.STATUS.skipped,
+            completed_log.id: OrderLog.STATUS.completed,
+            other_log.id: OrderLog.STATUS.processing,
+        }
+
+    def test_flush(self, queue, mocker: MockerFixture) -> None:
+        """신규 로그는 bulk_create, 기존 로그는 bulk_update(batch_size 단위)"""
+        old_logs = [create_order_log(queue, "SPY"), create_order_log(queue, "QQQ")]
+        bulk_create = mocker.spy(OrderLog.objects, "bulk_create")
+        bulk_update = mocker.spy(OrderLog.objects, "bulk_update")
+
+        writer = OrderLogWriter(order_queue_id=queue.id)
+        order_logs = writer.get_or_build(
+            lookups=[get_lookup("SPY"), get_lookup("QQQ")]
+            + [get_lookup("TLT", shares=i) for i in range(BULK_BATCH_SIZE + 1)]
+        )
+        for order_log in order_logs:
+            writer.mark_ordered(order_log)
+            order_log.status = OrderLog.STATUS.processing
+
+        # 조회 1 + 생성 2 batch + 수정 1 batch
+        assert writer.flush() == 4
+        assert writer.saved_statements == 3 * len(order_logs) - 4
+        assert len(bulk_create.call_args.args[0]) == BULK_BATCH_SIZE + 1
+        assert bulk_create.call_args.kwargs["batch_size"] == BULK_BATCH_SIZE
+        assert bulk_update.call_args.args[0] == old_logs
+        assert bulk_update.call_args.kwargs["batch_size"] == BULK_BATCH_SIZE
+
+        assert OrderLog.objects.filter(
+            order=queue, status=OrderLog.STATUS.processing
+        ).count() == len(order_logs)
+
+        # flush 후 buffer 초기화
+        assert writer.flush() == 0
+        assert bulk_create.call_count == 1
+        assert bulk_update.call_count == 1
@@ -0,0 +1,109 @@
+import logging
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+import pytz
+from dateutil.relativedelta import relativedelta
+
+from api.bases.managements.components.trade_history import normalize_trade_history
+from api.bases.managements.tests.benchmarks import benchmark_only
+
+logger = logging.getLogger(__name__)
+
+UPDATE_TYPE_MAP = {
+    "매수": 1,
+    "매수정정": 2,
+    "매수취소": 3,
+    "매도": 4,
+    "매도정정": 5,
+    "매도취소": 6,
+}
+FROM_DATE = datetime(2026, 10, 16, 10, 0, tzinfo=pytz.UTC).astimezone(
+    pytz.timezone("America/New_York")
+)
+OLD_DELTA = datetime(2026, 10, 16, 14, 0, tzinfo=pytz.UTC)
+
+
+def create_trades(n_trades: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    seconds = rng.integers(0, 24 * 60 * 60, size=n_trades)
+    return [
+        {
+            "code": f"T{i % 60:02d}",
+            "currency_code": "USD" if i % 5 else "KRW",
+            "order_date": "20261016",
+            "order_time": (datetime(2026, 10, 16) + timedelta(seconds=int(s))).strftime(
+                "%H%M%S"
+            ),
+            "trade_sec_name": list(UPDATE_TYPE_MAP)[i % 6] if i % 7 else "기타",
+        }
+        for i, s in enumerate(seconds)
+    ]
+
+
+def legacy_normalize_trade_history(trades, from_date, old_delta, update_type_map):
+    """종목별 반복 처리(기존 OrderRequester.get_trade_history)"""
+    tz = pytz.timezone("America/New_York")
+    for item in trades:
+        req_date = pd.to_datetime(
+            item.get("order_date") + item.get("order_time"), format="%Y%m%d%H%M%S"
+        )
+        if item.get("currency_code") == "USD" and req_date.hour <= 14:
+            req_date += relativedelta(days=1)
+        req_date = req_date.tz_localize(pytz.timezone("Asia/Seoul"))
+        item.update({"req_date": req_date.tz_convert(pytz.UTC)})
+
+    trades_df = pd.DataFrame(trades)
+    trades_df["order_time_tz"] = trades_df["order_time"].apply(
+        lambda x: datetime.strptime(from_date.strftime("%Y%m%d") + x, "%Y%m%d%H%M%S")
+        .astimezone(tz)
+        .strftime("%H%M%S")
+    )
+    trades_df["is_old"] = trades_df["req_date"] <= old_delta
+    trades_df["trd_type"] = trades_df["trade_sec_name"].apply(
+        lambda x: update_type_map.get(x)
+    )
+    trades_df["max_gap_pct"] = trades_df["trade_sec_name"].apply(
+        lambda x: 3 if "매수" in x else 5
+    )
+    return trades_df
+
+
+class TestNormalizeTradeHistory:
+    def test_same_result_as_legacy(self) -> None:
+        """종목별 반복 처리 결과와 같음"""
+        expected = legacy_normalize_trade_history(
+            create_trades(200), FROM_DATE, OLD_DELTA, UPDATE_TYPE_MAP
+        )
+        result = normalize_trade_history(
+            create_trades(200), FROM_DATE, OLD_DELTA, UPDATE_TYPE_MAP
+        )
+
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_empty_trades(self) -> None:
+        assert normalize_trade_history([], FROM_DATE, OLD_DELTA, UPDATE_TYPE_MAP).empty
+
+    @benchmark_only
+    @pytest.mark.parametrize("n_trades", [1_000])
+    def test_benchmark(self, n_trades) -> None:
+        """1k 건 기준 처리 시간 비교(실행 환경에 따라 달라지므로 기록만 함)"""
+        trades = create_trades(n_trades)
+
+        started = time.perf_counter()
+        legacy_normalize_trade_history(
+            [dict(t) for t in trades], FROM_DATE, OLD_DELTA, UPDATE_TYPE_MAP
+        )
+        legacy_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        normalize_trade_history(trades, FROM_DATE, OLD_DELTA, UPDATE_TYPE_MAP)
+        elapsed = time.perf_counter() - started
+
+        logger.info(
+            f"trades({n_trades}): legacy {legacy_elapsed * 1000:.1f}ms, "
+            f"vectorized {elapsed * 1000:.1f}ms, x{legacy_elapsed / elapsed:.1f}"
+        )
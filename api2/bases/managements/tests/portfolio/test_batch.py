@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+from api.bases.managements.portfolio.batch import (
+    BatchOrderPriceEngine,
+    BatchPortfolioManager,
+)
+from api.bases.managements.portfolio.manager import PortfolioManager
+from api.bases.managements.portfolio.price_engine import OrderPriceEngine
+
+
+class TestBatchPortfolioManager:
+    portfolio = [
+        {"code": "A", "weight": 0.5},
+        {"code": "B", "weight": 0.3},
+        {"code": "C", "weight": 0.2},
+    ]
+    asset_prices = pd.DataFrame(
+        {"krw_price": [30_000.0, 12_000.0, 7_000.0, 50_000.0]},
+        index=pd.Index(["A", "B", "C", "D"], name="code"),
+    )
+    asset_prices["usd_price"] = asset_prices.krw_price / 1_000
+    bases = pd.Series({"acc1": 1_000_000.0, "acc2": 2_500_000.0, "acc3": 300_000.0})
+    current_portfolios = {
+        "acc1": pd.DataFrame(
+            {"buy_price": [120_000.0], "shares": [4.0], "evaluate_amount": [120_000.0]},
+            index=pd.Index(["A"], name="code"),
+        ),
+        "acc2": pd.DataFrame(
+            {
+                "buy_price": [24_000.0, 100_000.0],
+                "shares": [2.0, 2.0],
+                "evaluate_amount": [24_000.0, 100_000.0],
+            },
+            index=pd.Index(["B", "D"], name="code"),
+        ),
+    }
+
+    @pytest.mark.parametrize(
+        "emphasis", ["optimized_deposit", "weight_first", "strict_ratio", "min_deposit"]
+    )
+    def test_same_result_as_single_account(self, emphasis) -> None:
+        """계좌별 PortfolioManager 계산 결과와 같음"""
+        batch_manager = BatchPortfolioManager(
+            price_engine=BatchOrderPriceEngine(),
+            portfolio=self.portfolio,
+            asset_prices=self.asset_prices,
+        )
+        result = batch_manager.calc_batch_rebalancing(
+            bases=self.bases,
+            current_portfolios=self.current_portfolios,
+            emphasis=emphasis,
+        )
+        manager = PortfolioManager(
+            price_engine=OrderPriceEngine(), portfolio=self.portfolio
+        )
+
+        for account_alias, base in self.bases.items():
+            current_portfolio = self.current_portfolios.get(account_alias)
+            expected = manager.calc_rebalancing_portfolio(
+                max_ord_base=base,
+                asset_prices=self.asset_prices,
+                emphasis=emphasis,
+                current_portfolio=current_portfolio,
+            )
+            rebalancing_portfolio = result.get_rebalancing_portfolio(account_alias)
+            expected_shares = expected.shares.loc[rebalancing_portfolio.index]
+
+            assert not result.errors
+            assert (rebalancing_portfolio.shares == expected_shares).all()
+
+    def test_order_basket_includes_held_assets(self) -> None:
+        """MP 외 보유 종목은 전량 매도"""
+        batch_manager = BatchPortfolioManager(
+            price_engine=BatchOrderPriceEngine(),
+            portfolio=self.portfolio,
+            asset_prices=self.asset_prices,
+        )
+        result = batch_manager.calc_batch_rebalancing(
+            bases=self.bases,
+            current_portfolios=self.current_portfolios,
+            emphasis="strict_ratio",
+        )
+
+        assert result.get_order_basket("acc1").index.tolist() == ["A", "B", "C"]
+        order_basket = result.get_order_basket("acc2")
+        assert order_basket.loc["D", "shares"] == 0
+        assert order_basket.loc["D", "new_shares"] == -2
@@ -0,0 +1,137 @@
+import math
+from itertools import product
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from api.bases.managements.portfolio.price_engine import (
+    OPTIMIZED_DEPOSIT_AMOUNT_SCALE,
+    OrderPriceEngine,
+)
+
+
+def create_optimal_shares(n_assets: int, base: float, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    index = [f"T{i:02d}" for i in range(n_assets)]
+    prices = pd.Series(rng.uniform(5_000, 500_000, size=n_assets), index=index)
+    weights = pd.Series(rng.dirichlet(np.ones(n_assets)), index=index)
+    optimal_shares = OrderPriceEngine.calc_optimal_shares(
+        base=base, optimal_weight=weights, universe_asset_price=prices
+    )
+    return prices, optimal_shares
+
+
+def brute_force_optimized_deposit(prices, optimal_shares, input_amount):
+    """올림 조합 전체를 사전순으로 탐색, 남은 금액 미만 최대 금액 중 첫 조합"""
+    floor_shares = optimal_shares.astype(int)
+    units = [round(p * OPTIMIZED_DEPOSIT_AMOUNT_SCALE) for p in prices.tolist()]
+    budget = math.ceil(
+        (input_amount - (floor_shares * prices).sum()) * OPTIMIZED_DEPOSIT_AMOUNT_SCALE
+    )
+    best_spent, best_shares = 0, floor_shares
+    for picks in product([0, 1], repeat=len(floor_shares)):
+        spent = sum(unit * pick for unit, pick in zip(units, picks))
+        if best_spent < spent < budget:
+            best_spent = spent
+            best_shares = floor_shares + pd.Series(picks, index=floor_shares.index)
+    return best_shares
+
+
+class TestEmphasisOptimizedDeposit:
+    @pytest.mark.parametrize("n_assets, seed", [(1, 0), (3, 1), (8, 2), (12, 3)])
+    def test_same_result_as_exhaustive_search(self, n_assets, seed) -> None:
+        """전체 조합 탐색과 같은 결과"""
+        base = 10_000_000
+        prices, optimal_shares = create_optimal_shares(n_assets, base, seed)
+
+        result = OrderPriceEngine.emphasis_optimized_deposit(
+            universe_asset_price=prices,
+            optimal_shares=optimal_shares,
+            input_amount=base,
+        )
+        expected = brute_force_optimized_deposit(prices, optimal_shares, base)
+
+        assert result.index.equals(optimal_shares.index)
+        assert (result == expected).all()
+        assert (result * prices).sum() < base
+
+    @pytest.mark.parametrize("seed", range(50))
+    def test_tie_break(self, seed) -> None:
+        """합계가 같은 조합이 여럿이면 앞 종목부터 내림을 우선한 조합"""
+        rng = np.random.default_rng(seed)
+        n_assets = int(rng.integers(2, 9))
+        index = [f"T{i:02d}" for i in range(n_assets)]
+        # 같은 가격, 가격 합이 같은 조합이 많도록 작은 정수 배수 가격 사용
+        prices = pd.Series(rng.integers(1, 5, size=n_assets) * 10_000.1, index=index)
+        optimal_shares = pd.Series(rng.uniform(1, 3, size=n_assets), index=index)
+        input_amount = float(
+            (optimal_shares.astype(int) * prices).sum() + rng.integers(1, 8) * 10_000.1
+        )
+
+        result = OrderPriceEngine.emphasis_optimized_deposit(
+            universe_asset_price=prices,
+            optimal_shares=optimal_shares,
+            input_amount=input_amount,
+        )
+        expected = brute_force_optimized_deposit(prices, optimal_shares, input_amount)
+
+        assert result.to_dict() == expected.to_dict()
+
+    def test_tie_break_ignores_float_error(self) -> None:
+        """0.1 + 0.2 와 0.3 처럼 부동소수점 합만 다른 조합은 동점"""
+        picks, is_exhausted = OrderPriceEngine._search_max_spend(
+            prices=np.array([0.1, 0.2, 0.3]), budget=0.31, max_nodes=0, time_limit=0
+        )
+
+        assert picks == [0, 0, 1]
+        assert not is_exhausted
+
+    def test_large_portfolio_within_node_budget(self) -> None:
+        """탐색 예산 초과 시 예산 내 최선의 조합 반환"""
+        base = 30_000_000
+        prices, optimal_shares = create_optimal_shares(60, base, seed=4)
+        floor_shares = optimal_shares.astype(int)
+
+        result = OrderPriceEngine.emphasis_optimized_deposit(
+            universe_asset_price=prices,
+            optimal_shares=optimal_shares,
+            input_amount=base,
+            max_nodes=1_000,
+        )
+
+        assert ((result - floor_shares).isin([0, 1])).all()
+        assert (floor_shares * prices).sum() <= (result * prices).sum() < base
+
+
+class TestEmphasisMinDepositAndStrictRatio:
+    model_portfolio = pd.DataFrame(
+        {"weight": [0.5, 0.5, 0.0]}, index=pd.Index(["A", "B", "C"], name="code")
+    )
+    universe_asset_price = pd.Series({"A": 300.0, "B": 100.0})
+    current_portfolio = pd.DataFrame(
+        {"buy_price": [0.0, 200.0], "shares": [0.0, 3.0]},
+        index=pd.Index(["A", "C"], name="code"),
+    )
+
+    def test_min_deposit_carries_rest_to_next_asset(self) -> None:
+        """앞 종목 주문 후 남은 금액을 다음 종목 주문에 사용"""
+        shares = OrderPriceEngine.emphasis_min_deposit(
+            model_portfolio=self.model_portfolio,
+            current_portfolio=self.current_portfolio,
+            input_amount=1000,
+            universe_asset_price=self.universe_asset_price,
+        )
+
+        assert shares.to_dict() == {"A": 1, "B": 7, "C": 0}
+
+    def test_strict_ratio_without_carry(self) -> None:
+        """종목별 목표 금액 내에서만 주문"""
+        shares = OrderPriceEngine.emphasis_strict_ratio(
+            model_portfolio=self.model_portfolio,
+            current_portfolio=self.current_portfolio,
+            input_amount=1000,
+            universe_asset_price=self.universe_asset_price,
+        )
+
+        assert shares.to_dict() == {"A": 1, "B": 5, "C": 0}
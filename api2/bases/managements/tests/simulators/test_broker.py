@@ -0,0 +1,154 @@
+import threading
+
+import pytest
+import requests
+
+from api.bases.managements.simulators.broker import (
+    ASK,
+    BID,
+    EXECUTED_ORDERS,
+    UNEXECUTED_ORDERS,
+    UPDATE_ORDER,
+    SimulatedMarket,
+    SimulatorConfig,
+    create_server,
+)
+
+
+@pytest.fixture
+def simulator():
+    config = SimulatorConfig(latency_ms=0, latency_jitter_ms=0, page_size=10)
+    server = create_server("127.0.0.1", 0, config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", config
+    server.shutdown()
+    server.server_close()
+
+
+class TestBrokerSimulator:
+    def test_order_fill(self, simulator) -> None:
+        """주문 -> 체결 조회 시 체결 -> 보유 종목 반영"""
+        api_base, config = simulator
+        config.fill_rate = 1.0
+
+        resp = requests.post(
+            f"{api_base}/api/v1/kb/accounts/order",
+            json={
+                "account": "1001",
+                "code": "SPY",
+                "price": 100,
+                "exchange_rate": config.exchange_rate,
+                "trd_type": BID,
+                "shares": 10,
+            },
+        )
+        order_no = resp.json()["order_no"]
+
+        trades = requests.get(
+            f"{api_base}/api/v1/kb/accounts/1001/execution",
+            params={"exec_sign": EXECUTED_ORDERS},
+        ).json()["trades"]
+        assert [t["ord_no"] for t in trades] == [order_no]
+        assert trades[0]["exec_qty"] > 0
+
+        stocks = requests.get(
+            f"{api_base}/api/v1/kb/accounts/1001/evaluate/stocks"
+        ).json()["stocks"]
+        assert "SPY" in {s["stock_code"] for s in stocks}
+
+    def test_sell_over_holding(self) -> None:
+        """보유 수량 초과 매도는 보유 수량까지만 체결, 미보유 종목 매도는 체결/입금 없음"""
+        market = SimulatedMarket(
+            SimulatorConfig(fill_rate=1.0, partial_fill_ratio=1.0, initial_holdings=1)
+        )
+        account = market.get_account("1004")
+        ((code, holding),) = account.holdings.items()
+        held_qty, cash = holding["qty"], account.cash
+        missing_code = next(s for s in market.config.symbols if s != code)
+
+        for order_code in (code, missing_code):
+            market.register_order(
+                {
+                    "account": "1004",
+                    "code": order_code,
+                    "trd_type": ASK,
+                    "shares": held_qty + 100,
+                    "price": 100,
+                }
+            )
+        for _ in range(3):
+            market.fill_orders(account)
+
+        assert [o["exec_qty"] for o in account.orders.values()] == [held_qty, 0]
+        assert account.holdings == {}
+        assert account.cash == cash + held_qty * 100 * market.config.exchange_rate
+
+    def test_update_order(self, simulator) -> None:
+        """정정 시 남은 수량으로 새 주문 생성"""
+        api_base, config = simulator
+        config.fill_rate = 0
+
+        order_no = requests.post(
+            f"{api_base}/api/v1/kb/accounts/order",
+            json={
+                "account": "1002",
+                "code": "QQQ",
+                "price": 100,
+                "trd_type": BID,
+                "shares": 5,
+            },
+        ).json()["order_no"]
+        resp = requests.put(
+            f"{api_base}/api/v1/kb/accounts/order",
+            json={
+                "account": "1002",
+                "price": 101,
+                "update_type": UPDATE_ORDER,
+                "order_no": order_no,
+            },
+        )
+
+        trades = requests.get(
+            f"{api_base}/api/v1/kb/accounts/1002/execution",
+            params={"exec_sign": UNEXECUTED_ORDERS},
+        ).json()["trades"]
+        assert [(t["ord_no"], t["ord_qty"], t["trade_sec_name"]) for t in trades] == [
+            (resp.json()["order_no"], 5, "매수정정")
+        ]
+
+    def test_infomax_pages(self, simulator) -> None:
+        """page_size 단위 next 조회"""
+        api_base, config = simulator
+
+        data, url = [], f"{api_base}/api/v1/infomax/master"
+        params = {"symbols": ",".join(config.symbols), "page_size": config.page_size}
+        while url:
+            body = requests.get(url, params=params).json()
+            data.extend(body["data"])
+            url, params = body["next"], None
+        assert sorted(item["symbol"] for item in data) == sorted(config.symbols)
+
+    def test_error_rate(self, simulator) -> None:
+        api_base, config = simulator
+        config.error_rate = 1.0
+
+        resp = requests.get(f"{api_base}/api/v1/kb/accounts/1003/balances")
+        assert resp.status_code == config.error_status
+
+    def test_error_response_keep_alive(self, simulator) -> None:
+        """오류 응답 후에도 같은 세션(keep-alive)의 다음 요청 정상 처리"""
+        api_base, config = simulator
+        session = requests.Session()
+
+        config.error_rate = 1.0
+        resp = session.post(
+            f"{api_base}/api/v1/kb/accounts/order",
+            json={"account": "1005", "code": "SPY", "trd_type": BID, "shares": 1},
+        )
+        assert resp.status_code == config.error_status
+        resp = session.post(f"{api_base}/api/v1/kb/unknown", json={"account": "1005"})
+        assert resp.status_code == 404
+
+        config.error_rate = 0
+        resp = session.get(f"{api_base}/api/v1/kb/accounts/1005/balances")
+        assert resp.status_code == 200
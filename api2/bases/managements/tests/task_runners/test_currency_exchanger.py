@@ -17,6 +17,7 @@ from api.bases.managements.components.exchange.exchanger import (
     CurrencyExchangerForAccountBeingClosed,
     CurrencyExchangerForAccountNormal,
 )
+from api.bases.managements.tasks import exchange_accounts_normal_batch
 from common.exceptions import PreconditionFailed
 
 pytestmark = pytest.mark.django_db(databases=["default", "accounts"])
@@ -646,3 +647,54 @@ class TestCurrencyExchangerForAccountNormalWithKB:
         ).convert_usd_to_krw.assert_has_calls([call(account, usd_currency)] * 2)
 
         assert account.status == Account.STATUS.normal
+
+
+class TestCurrencyExchangerBatchRunnerForAccountsNormalWithKB:
+    VENDOR_CODE = "kb"
+
+    def test_process_reschedule_retryable_error(self, mocker: MockerFixture) -> None:
+        """재시도 가능한 오류 발생 시 worker 에서 대기하지 않고 해당 계좌만 재예약"""
+
+        mocker.patch.object(
+            KBExchangeAPI,
+            f"get_exchangeable_currencies",
+            return_value=KBExchangeAPIResultFromGetExchangeableCurrencies(
+                {
+                    "apply_exchange_rate": 1200.0,
+                    "currencies": [
+                        {
+                            "currency_code": "USD",
+                            "exchange_possible_amt": 1000.0,
+                        },
+                    ],
+                }
+            ),
+        )
+        mocker.patch.object(
+            KBExchangeAPI,
+            "convert_usd_to_krw",
+            return_value=KBExchangeAPIResultFromConvertUSDToKRW(
+                {
+                    "status": "TRANSMIT_ERROR",
+                    "msg_code": "I698",
+                    "msg": "조회시점과 환전처리시점 환율이 다릅니다.다시 처리하시기 바랍니다.",
+                }
+            ),
+        )
+        apply_async = mocker.patch.object(exchange_accounts_normal_batch, "apply_async")
+
+        account = create_account_etf_normal(self.VENDOR_CODE)
+        result = exchange_accounts_normal_batch.process(
+            vendor_code=self.VENDOR_CODE, account_aliases=[account.account_alias]
+        )
+
+        assert result["count"] == {"failed": 1}
+        assert result["retry_account_aliases"] == [account.account_alias]
+        KBExchangeAPI.convert_usd_to_krw.assert_called_once()
+        apply_async.assert_called_once()
+        assert apply_async.call_args.kwargs["kwargs"] == {
+            "vendor_code": self.VENDOR_CODE,
+            "account_aliases": [account.account_alias],
+            "attempt": 2,
+            "wave_size": 50,
+        }
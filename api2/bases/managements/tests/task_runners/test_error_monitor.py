@@ -0,0 +1,386 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from pytest_mock import MockerFixture
+
+from api.bases.accounts.models import Account
+from api.bases.accounts.tests.factories import AccountFactory
+from api.bases.managements.components.data_stagers import CachedTickerStager
+from api.bases.managements.models import (
+    ErrorMonitorWatermark,
+    ErrorOccur,
+    ErrorSet,
+    ErrorSolved,
+    OrderLog,
+    Queue,
+)
+from api.bases.managements.task_runners import (
+    ERROR_MONITOR_EXCLUDE_NOTES,
+    ErrorAccountMonitor,
+)
+
+pytestmark = pytest.mark.django_db(databases=["default", "accounts"])
+
+D0, D1, D2 = "2021-05-16", "2021-05-17", "2021-05-18"
+WGT_ERROR_PORT_SEQ, PX_ERROR_PORT_SEQ, NORMAL_PORT_SEQ = "101", "102", "103"
+
+
+def get_portfolio_map(weight_sum=0.9):
+    return {
+        "01": {
+            "1": {
+                "port_seq": WGT_ERROR_PORT_SEQ,
+                "port_data": [{"code": "SPY", "weight": weight_sum}],
+            },
+            "2": {
+                "port_seq": PX_ERROR_PORT_SEQ,
+                "port_data": [{"code": "BAD", "weight": 1.0}],
+            },
+            "3": {
+                "port_seq": NORMAL_PORT_SEQ,
+                "port_data": [{"code": "SPY", "weight": 1.0}],
+            },
+        }
+    }
+
+
+def get_prices(symbols):
+    if "BAD" in symbols:
+        raise ValueError("BAD")
+
+
+def at(s_date, hour=12) -> datetime:
+    return timezone.make_aware(
+        datetime.strptime(s_date, "%Y-%m-%d") + timedelta(hours=hour), pytz.utc
+    )
+
+
+def create_account(account_alias, status=Account.STATUS.normal, updated_at=None):
+    account = AccountFactory(
+        account_alias=account_alias,
+        vendor_code="kb",
+        account_number=account_alias,
+        account_type=Account.ACCOUNT_TYPE.etf,
+        risk_type=Account.RISK_TYPE.MID,
+        status=status,
+    )
+    Account.objects.filter(account_alias=account_alias).update(
+        updated_at=updated_at or at(D0)
+    )
+    return account
+
+
+def create_queue(s_date, account_alias, note=None, portfolio_id=NORMAL_PORT_SEQ):
+    queue = Queue(account_alias=account_alias, vendor_code="kb", note=note)
+    queue.save(portfolio_id=portfolio_id)
+    Queue.objects.filter(id=queue.id).update(created=at(s_date))
+    return queue
+
+
+def create_order_log(s_date, queue, error_msg=None):
+    order_log = OrderLog.objects.create(order=queue, error_msg=error_msg)
+    OrderLog.objects.filter(id=order_log.id).update(created=at(s_date))
+    return order_log
+
+
+def create_error(error_id, account_alias, occured_at, solved_at=None):
+    error = ErrorOccur.objects.create(
+        error_id=error_id, account_alias=account_alias, occured_at=occured_at
+    )
+    if solved_at:
+        ErrorSolved.objects.create(error_occur=error, solved_at=solved_at)
+    return error
+
+
+@pytest.fixture
+def monitor(mocker: MockerFixture) -> ErrorAccountMonitor:
+    mocker.patch.object(CachedTickerStager, "get_prices", side_effect=get_prices)
+    monitor = ErrorAccountMonitor()
+    mocker.patch.object(
+        monitor, "get_portfolio_map", side_effect=lambda **_: get_portfolio_map()
+    )
+    return monitor
+
+
+@pytest.fixture
+def daily_rows():
+    """
+    D1: 1001(A1), 비밀번호 사고(A1), 2001(A2), 2002(A3), 정상 주문(A4, 기존 1003 해결),
+        해지매도 실패(A6), 해지 계좌(A7, 기존 1001 해결), 제외 사유(A5)
+    D2: 정상 주문(A1)
+    """
+    ErrorSet.objects.bulk_create(
+        [
+            ErrorSet(error_id=error_id, error_msg=msg)
+            for error_id, msg in ErrorSet.ERROR_CODE
+        ]
+    )
+    for account_alias in ["A1", "A2", "A3", "A4", "A5"]:
+        create_account(account_alias)
+    create_account("A6", status=Account.STATUS.account_sell_f1, updated_at=at(D1))
+    create_account("A7", status=Account.STATUS.canceled, updated_at=at(D1))
+    create_account("A8", status=Account.STATUS.account_sell_f1)
+    create_account("A9", status=Account.STATUS.account_sell_f1)
+
+    create_error(1003, "A4", at(D0))
+    create_error(1001, "A7", at(D0))
+    create_error(1002, "A8", at(D0))
+    create_error(1002, "A9", at(D0), solved_at=at(D0))
+    create_error(2004, "A2", at(D0), solved_at=at(D2))
+
+    q1 = create_queue(D1, "A1", note="base must be larger than min_base")
+    create_order_log(D1, q1, error_msg="비밀번호 사고 계좌")
+    create_order_log(D1, create_queue(D1, "A2", portfolio_id=WGT_ERROR_PORT_SEQ))
+    create_order_log(D1, create_queue(D1, "A2", note="url: timeout"))
+    create_order_log(D1, create_queue(D1, "A3", portfolio_id=PX_ERROR_PORT_SEQ))
+    create_order_log(D1, create_queue(D1, "A4"))
+    create_queue(D1, "A5", note=ERROR_MONITOR_EXCLUDE_NOTES[0])
+
+    create_order_log(D2, create_queue(D2, "A1"))
+
+
+def collect_errors() -> set:
+    return set(
+        ErrorOccur.objects.values_list(
+            "error_id",
+            "account_alias",
+            "order_id",
+            "occured_at__date",
+            "errorsolved__solved_at__date",
+        )
+    )
+
+
+def run_and_rollback(func) -> set:
+    with transaction.atomic():
+        func()
+        errors = collect_errors()
+        transaction.set_rollback(True)
+    return errors
+
+
+def legacy_process(monitor: ErrorAccountMonitor, monitor_dates):
+    """watermark 도입 이전 일자 전체 재조회 처리"""
+    exclude_notes = ERROR_MONITOR_EXCLUDE_NOTES
+    for s_date in monitor_dates:
+        s_date_utc = datetime.strptime(s_date, "%Y-%m-%d")
+        daily_account = Account.objects.filter(
+            updated_at__gte=s_date_utc,
+            updated_at__lte=s_date_utc + timedelta(days=1),
+        )
+        daily_queue = Queue.objects.filter(created__startswith=s_date)
+        daily_orderlog = OrderLog.objects.filter(created__startswith=s_date).exclude(
+            error_msg__in=exclude_notes
+        )
+        if len(daily_orderlog) == 0:
+            continue
+
+        error_solved_queryset = ErrorOccur.objects.filter(
+            Q(errorsolved__solved_at__isnull=False)
+        )
+        error_live_queryset = ErrorOccur.objects.filter(
+            Q(errorsolved__solved_at__isnull=True), Q(occured_at__lte=s_date_utc)
+        )
+        type_to_error_account_alias = monitor.get_type_to_error_account_alias(
+            s_date, exclude_notes, daily_orderlog, daily_queue, daily_account
+        )
+
+        error_live_accnts = error_live_queryset.values_list(
+            "account_alias", flat=True
+        ).distinct()
+        canceled_accnts = daily_account.filter(status=0).values_list(
+            "account_alias", flat=True
+        )
+        queue_order_ok_accnts = list(
+            daily_queue.exclude(note__in=exclude_notes)
+            .filter(note__isnull=True)
+            .exclude(account_alias__in=list(type_to_error_account_alias[1005].keys()))
+            .values_list("account_alias", flat=True)
+        )
+        solved_accnts = (set(error_live_accnts) & set(queue_order_ok_accnts)) | set(
+            canceled_accnts
+        )
+        ErrorSolved.objects.bulk_create(
+            [
+                ErrorSolved(error_occur_id=solved_id, solved_at=s_date)
+                for solved_id in error_live_queryset.filter(
+                    account_alias__in=solved_accnts
+                ).values_list("error_occur_id", flat=True)
+            ]
+        )
+
+        new_errors = []
+        for error_id, error_accounts in type_to_error_account_alias.items():
+            existing_accnts = set(
+                legacy_existing_errors(
+                    error_solved_queryset, error_live_queryset, s_date_utc, error_id
+                )
+            )
+            for account_alias in set(error_accounts) - existing_accnts:
+                new_errors.append(
+                    ErrorOccur(
+                        error_id=error_id,
+                        order_id=error_accounts[account_alias],
+                        account_alias=account_alias,
+                        occured_at=s_date,
+                    )
+                )
+        ErrorOccur.objects.bulk_create(new_errors)
+    legacy_check_sell_fail_account()
+
+
+def legacy_existing_errors(
+    error_solved_queryset, error_live_queryset, s_date_utc, error_id
+):
+    return set(
+        error_solved_queryset.filter(
+            occured_at__lte=s_date_utc,
+            errorsolved__solved_at__gte=s_date_utc,
+            error_id=error_id,
+        ).values_list("account_alias", flat=True)
+    ) | set(
+        error_live_queryset.filter(error_id=error_id).values_list(
+            "account_alias", flat=True
+        )
+    )
+
+
+def legacy_check_sell_fail_account():
+    for account_alias in Account.objects.filter(
+        risk_type__isnull=False, status__in=[Account.STATUS.account_sell_f1]
+    ).values_list("account_alias", flat=True):
+        manual_needed = ErrorOccur.objects.filter(
+            error_id__in=[1001, 1002, 1003], account_alias__in=[account_alias]
+        )
+        if len(manual_needed) == len(
+            manual_needed.filter(errorsolved__solved_at__isnull=False)
+        ):
+            Account.objects.filter(account_alias=account_alias).update(
+                status=Account.STATUS.account_sell_reg
+            )
+
+
+@pytest.mark.usefixtures("daily_rows")
+class TestErrorAccountMonitor:
+    def test_process(self, monitor) -> None:
+        """일자 전체 재조회 처리와 같은 에러 발생/해결 기록"""
+        expected = run_and_rollback(lambda: legacy_process(monitor, [D1, D2]))
+
+        monitor.process([D1, D2])
+        assert collect_errors() == expected
+        assert {
+            (error_id, account_alias, solved_at)
+            for error_id, account_alias, _, _, solved_at in expected
+        } >= {
+            (1001, "A1", datetime(2021, 5, 18).date()),
+            (1005, "A1", datetime(2021, 5, 18).date()),
+            (2001, "A2", None),
+            (2002, "A3", None),
+            (1003, "A4", datetime(2021, 5, 17).date()),
+            (1001, "A7", datetime(2021, 5, 17).date()),
+            (1004, "A6", None),
+        }
+
+    def test_rerun(self, monitor, mocker: MockerFixture) -> None:
+        """재실행 시 이후 생성분만 처리, 포트폴리오 에러는 일자 전체 재확인"""
+
+        def set_weight_sum(weight_sum):
+            mocker.patch.object(
+                monitor,
+                "get_portfolio_map",
+                side_effect=lambda **_: get_portfolio_map(weight_sum=weight_sum),
+            )
+
+        def legacy_rerun():
+            create_order_log(D1, create_queue(D1, "A5", note="emphasis error"))
+            legacy_process(monitor, [D1])
+
+        expected = run_and_rollback(legacy_rerun)
+
+        set_weight_sum(1.0)
+        monitor.process([D1])
+        assert not ErrorOccur.objects.filter(error_id=2001).exists()
+
+        set_weight_sum(0.9)
+        monitor.process([D1])
+        assert ErrorOccur.objects.filter(error_id=2001, account_alias="A2").exists()
+
+        create_order_log(D1, create_queue(D1, "A5", note="emphasis error"))
+        monitor.process([D1])
+
+        def without_order_id(errors):
+            return {error[:2] + error[3:] for error in errors}
+
+        assert without_order_id(collect_errors()) == without_order_id(expected)
+
+    def test_backfill(self, monitor) -> None:
+        """이전 일자 소급 처리 시 이후 일자 watermark 삭제, 이후 일자 재실행으로 해결 기록"""
+        expected = run_and_rollback(
+            lambda: [legacy_process(monitor, [s_date]) for s_date in [D2, D1, D2]]
+        )
+
+        monitor.process([D2])
+        monitor.process([D1])
+        assert not ErrorMonitorWatermark.objects.filter(monitor_date=D2).exists()
+        monitor.process([D2])
+        assert collect_errors() == expected
+
+    def test_full_scan(self, monitor) -> None:
+        ErrorMonitorWatermark.objects.create(
+            monitor_date=D1,
+            queue_id=10**9,
+            orderlog_id=10**9,
+            account_updated_at=at(D2),
+        )
+        monitor.process([D1])
+        assert not ErrorOccur.objects.filter(error_id=1001, account_alias="A1").exists()
+
+        monitor.process([D1], full_scan=True)
+        assert ErrorOccur.objects.filter(error_id=1001, account_alias="A1").exists()
+
+    def test_get_existing_errors(self) -> None:
+        for s_date in [D0, D1, D2]:
+            s_date_utc = datetime.strptime(s_date, "%Y-%m-%d")
+            error_ids = [1001, 1002, 1003, 2004]
+            account_aliases = ["A2", "A4", "A7", "A8", "A9"]
+            existing_errors = ErrorAccountMonitor.get_existing_errors(
+                s_date_utc=s_date_utc,
+                error_ids=error_ids,
+                account_aliases=account_aliases,
+            )
+
+            error_solved_queryset = ErrorOccur.objects.filter(
+                errorsolved__solved_at__isnull=False
+            )
+            error_live_queryset = ErrorOccur.objects.filter(
+                errorsolved__solved_at__isnull=True, occured_at__lte=s_date_utc
+            )
+            assert existing_errors == {
+                (error_id, account_alias)
+                for error_id in error_ids
+                for account_alias in legacy_existing_errors(
+                    error_solved_queryset, error_live_queryset, s_date_utc, error_id
+                )
+                if account_alias in account_aliases
+            }
+
+    def test_check_sell_fail_account(self, django_assert_num_queries) -> None:
+        """수동 처리 필요 에러가 모두 해결된 해지매도 실패 계좌만 해지 매도 진행 중으로 복구"""
+
+        def get_statuses():
+            return dict(Account.objects.values_list("account_alias", "status"))
+
+        with transaction.atomic():
+            legacy_check_sell_fail_account()
+            expected = get_statuses()
+            transaction.set_rollback(True)
+
+        with django_assert_num_queries(1):
+            ErrorAccountMonitor().check_sell_fail_account()
+        assert get_statuses() == expected
+        assert expected["A9"] == Account.STATUS.account_sell_reg
+        assert expected["A8"] == Account.STATUS.account_sell_f1
@@ -0,0 +1,284 @@
+import threading
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+import pytz
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from pytest_mock import MockerFixture
+
+from api.bases.accounts.models import Account
+from api.bases.accounts.tests.factories import AccountFactory
+from api.bases.managements.components.data_stagers import UnsupportedTicker
+from api.bases.managements import task_runners
+from api.bases.managements.models import Queue
+from api.bases.managements.task_runners import (
+    SELL_QUEUE_MAX_WORKERS,
+    OrderAccountFetcher,
+)
+from api.bases.orders.models import Event
+
+pytestmark = pytest.mark.django_db(databases=["default", "accounts"])
+
+BASE_DATE = date(2021, 5, 17)
+OLD_PORT_SEQ, NEW_PORT_SEQ = 101, 102
+PORTFOLIO_MAP = {
+    "01": {
+        "1": {"port_seq": OLD_PORT_SEQ, "port_data": []},
+        "2": {"port_seq": NEW_PORT_SEQ, "port_data": []},
+    }
+}
+
+
+def create_account(
+    account_alias, vendor_code="kb", status=Account.STATUS.normal
+) -> Account:
+    return AccountFactory(
+        account_alias=account_alias,
+        vendor_code=vendor_code,
+        account_number=account_alias,
+        account_type=Account.ACCOUNT_TYPE.etf,
+        risk_type=2,
+        strategy_code=1,
+        status=status,
+    )
+
+
+def create_event(account, mode, status, portfolio_id=OLD_PORT_SEQ, days=0) -> Event:
+    event = Event.objects.create(
+        account_alias=account, mode=mode, status=status, portfolio_id=portfolio_id
+    )
+    Event.objects.filter(id=event.id).update(
+        created_at=timezone.make_aware(datetime(2021, 5, 1), pytz.utc)
+        + timedelta(days=days)
+    )
+    return event
+
+
+@pytest.fixture
+def fetcher() -> OrderAccountFetcher:
+    fetcher = OrderAccountFetcher()
+    fetcher.portfolio_map = PORTFOLIO_MAP
+    return fetcher
+
+
+@pytest.fixture
+def events():
+    """최신 Event 의 모드, 상태, 포트폴리오 조합별 계좌"""
+    modes, statuses = Event.MODES, Event.STATUS
+    for account_alias, mode, status in [
+        ("A1", modes.new_order, statuses.on_hold),
+        ("A2", modes.new_order, statuses.processing),
+        ("A3", modes.new_order, statuses.completed),
+        ("A4", modes.new_order, statuses.failed),
+        ("A5", modes.rebalancing, statuses.on_hold),
+        ("A6", modes.rebalancing, statuses.processing),
+        ("A7", modes.rebalancing, statuses.completed),
+        ("A8", modes.rebalancing, statuses.canceled),
+        ("A9", modes.sell, statuses.on_hold),
+    ]:
+        create_event(create_account(account_alias), mode, status)
+
+    # 이미 새 포트폴리오로 주문한 계좌
+    create_event(
+        create_account("B1"),
+        Event.MODES.rebalancing,
+        Event.STATUS.completed,
+        portfolio_id=NEW_PORT_SEQ,
+    )
+    # 이전 Event 는 대상 아님
+    account = create_account("B2")
+    create_event(account, Event.MODES.rebalancing, Event.STATUS.processing)
+    create_event(account, Event.MODES.new_order, Event.STATUS.completed, days=1)
+    # 당일 주문 등록된 계좌, 다른 증권사 계좌
+    create_event(create_account("B3"), Event.MODES.new_order, Event.STATUS.on_hold)
+    queue = Queue(account_alias="B3", vendor_code="kb")
+    queue.save(portfolio_id=OLD_PORT_SEQ)
+    Queue.objects.filter(id=queue.id).update(
+        management_at=timezone.make_aware(datetime(2021, 5, 17, 12), pytz.utc)
+    )
+    create_event(
+        create_account("B4", vendor_code="ebest"),
+        Event.MODES.new_order,
+        Event.STATUS.on_hold,
+    )
+
+
+def legacy_update_event(fetcher: OrderAccountFetcher, vendor_code, base_date):
+    """계좌별 Account, 최신 Event 조회 방식(일괄 조회 이전)"""
+    queryset = fetcher.get_order_account_queryset(
+        vendor_code=vendor_code, base_date=base_date
+    )
+    latest_event_by_account = Event.objects.filter(
+        id__in=(
+            Event.objects.filter(account_alias__vendor_code=vendor_code)
+            .values("account_alias_id")
+            .annotate(Max("id"))
+            .order_by("account_alias_id")
+            .values_list("id__max", flat=True)
+        )
+    )
+    update_needed_events = []
+    new_needed_events = []
+    for _account_alias, _risk_type, _strategy_code, _, _ in queryset.iterator():
+        account = Account.objects.get(account_alias=_account_alias)
+        strategy = str(int(_strategy_code)).zfill(2)
+        port_seq = fetcher.portfolio_map[strategy][str(_risk_type)]["port_seq"]
+        event_row = latest_event_by_account.filter(
+            account_alias_id=_account_alias
+        ).first()
+        if event_row.portfolio_id == port_seq:
+            continue
+
+        if event_row.mode == Event.MODES.new_order:
+            if event_row.status in [Event.STATUS.on_hold, Event.STATUS.processing]:
+                event_row.portfolio_id = port_seq
+                update_needed_events.append(event_row)
+            elif event_row.status in [Event.STATUS.completed]:
+                new_needed_events.append(
+                    Event(
+                        account_alias=account,
+                        mode=Event.MODES.rebalancing,
+                        portfolio_id=port_seq,
+                    )
+                )
+
+        elif event_row.mode == Event.MODES.rebalancing:
+            if event_row.status == Event.STATUS.on_hold:
+                event_row.portfolio_id = port_seq
+                update_needed_events.append(event_row)
+            elif event_row.status == Event.STATUS.processing:
+                event_row.status = Event.STATUS.canceled
+                update_needed_events.append(event_row)
+                new_needed_events.append(
+                    Event(
+                        account_alias=account,
+                        mode=Event.MODES.rebalancing,
+                        portfolio_id=port_seq,
+                    )
+                )
+            elif event_row.status in [Event.STATUS.completed]:
+                new_needed_events.append(
+                    Event(
+                        account_alias=account,
+                        mode=Event.MODES.rebalancing,
+                        portfolio_id=port_seq,
+                    )
+                )
+
+    Event.objects.bulk_update(update_needed_events, ["status", "portfolio_id"])
+    Event.objects.bulk_create(new_needed_events)
+
+
+def collect_events() -> list:
+    return sorted(
+        Event.objects.values_list("account_alias_id", "mode", "status", "portfolio_id")
+    )
+
+
+class TestOrderAccountFetcher:
+    def test_update_event(self, fetcher, events, django_assert_max_num_queries) -> None:
+        """계좌별 조회 방식과 같은 Event 수정, 생성 결과를 계좌 수와 무관한 쿼리 수로 처리"""
+        with transaction.atomic():
+            legacy_update_event(fetcher, "kb", BASE_DATE)
+            expected = collect_events()
+            transaction.set_rollback(True)
+
+        assert collect_events() != expected
+        # 계좌별 Account, Event 조회 없음(조회 로그 2 + 계좌, 최신 Event 조회 2 + 일괄 저장)
+        with django_assert_max_num_queries(7):
+            fetcher.update_event(vendor_code="kb", base_date=BASE_DATE)
+        assert collect_events() == expected
+
+        assert {
+            (account_alias, mode, status)
+            for account_alias, mode, status, portfolio_id in expected
+            if portfolio_id == NEW_PORT_SEQ
+        } == {
+            ("A1", Event.MODES.new_order, Event.STATUS.on_hold),
+            ("A2", Event.MODES.new_order, Event.STATUS.processing),
+            ("A3", Event.MODES.rebalancing, Event.STATUS.on_hold),
+            ("A5", Event.MODES.rebalancing, Event.STATUS.on_hold),
+            ("A6", Event.MODES.rebalancing, Event.STATUS.on_hold),
+            ("A7", Event.MODES.rebalancing, Event.STATUS.on_hold),
+            ("B1", Event.MODES.rebalancing, Event.STATUS.completed),
+            ("B2", Event.MODES.rebalancing, Event.STATUS.on_hold),
+        }
+
+    def test_register_sell_order_queues(self, fetcher, mocker: MockerFixture) -> None:
+        """계좌별 주문 바스켓은 worker thread 에서 계산, 계좌별 오류는 해당 Queue 에만 기록"""
+        for account_alias in ["S1", "S2", "S3", "S4", "S5"]:
+            create_account(account_alias, status=Account.STATUS.account_sell_reg)
+        queue = Queue(account_alias="S5", vendor_code="kb", mode=Queue.MODES.sell)
+        queue.save(portfolio_id=NEW_PORT_SEQ)
+        Queue.objects.filter(id=queue.id).update(
+            management_at=timezone.make_aware(datetime(2021, 5, 17, 12), pytz.utc)
+        )
+
+        thread_ids = set()
+        baskets = {
+            "S1": pd.DataFrame(
+                {"shares": [3], "new_shares": [-3]}, index=pd.Index(["SPY"])
+            ),
+            "S2": pd.DataFrame(
+                {"shares": [0], "new_shares": [1]}, index=pd.Index(["SPY"])
+            ),
+            "S3": UnsupportedTicker("BAD"),
+            "S4": RuntimeError("broker down"),
+        }
+
+        def order_management(account_alias, **kwargs):
+            thread_ids.add(threading.get_ident())
+            basket = baskets[account_alias]
+            if isinstance(basket, Exception):
+                raise basket
+            return SimpleNamespace(order_basket=basket)
+
+        mocker.patch(
+            "api.bases.managements.task_runners.OrderManagement",
+            side_effect=order_management,
+        )
+        stop_account_operation = mocker.patch(
+            "api.bases.managements.task_runners.stop_account_operation"
+        )
+        connections = mocker.patch("api.bases.managements.task_runners.connections")
+        executor = mocker.spy(task_runners, "ThreadPoolExecutor")
+
+        fetcher.register_sell_order_queues(vendor_code="kb", base_date=BASE_DATE)
+
+        assert executor.call_args.kwargs == {"max_workers": SELL_QUEUE_MAX_WORKERS}
+        assert threading.get_ident() not in thread_ids
+        assert connections.close_all.call_count == 4
+        assert (
+            stop_account_operation.call_args.kwargs["account_alias"].account_alias
+            == "S3"
+        )
+
+        queues = {
+            q.account_alias: q
+            for q in Queue.objects.filter(mode=Queue.MODES.sell).exclude(id=queue.id)
+        }
+        assert {
+            account_alias: (q.status, q.note, q.basket_lines.count())
+            for account_alias, q in queues.items()
+        } == {
+            "S1": (Queue.STATUS.on_hold, None, 1),
+            "S2": (Queue.STATUS.skipped, "기청산된 주문", 0),
+            "S3": (Queue.STATUS.canceled, "운용 중지(미지원 종목 포함): BAD", 0),
+            "S4": (Queue.STATUS.canceled, "broker down", 0),
+        }
+        assert {q.portfolio_id for q in queues.values()} == {str(NEW_PORT_SEQ)}
+        assert dict(
+            Account.objects.filter(account_alias__startswith="S").values_list(
+                "account_alias", "status"
+            )
+        ) == {
+            "S1": Account.STATUS.account_sell_reg,
+            "S2": Account.STATUS.account_sell_s,
+            "S3": Account.STATUS.account_sell_reg,
+            "S4": Account.STATUS.account_sell_reg,
+            "S5": Account.STATUS.account_sell_reg,
+        }
@@ -0,0 +1,84 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from pytest_mock import MockerFixture
+
+from api.bases.managements.models import Queue
+from api.bases.managements.task_runners import BatchOrderQueueRegisterRunner
+from api.bases.orders.models import Event
+from common.exceptions import StopOrderOperation
+
+pytestmark = pytest.mark.django_db(databases=["default", "accounts"])
+
+PORTFOLIO = {"port_seq": "2021051712300", "port_data": [{"code": "SPY"}]}
+
+
+@pytest.fixture
+def runner(mocker: MockerFixture) -> BatchOrderQueueRegisterRunner:
+    mocker.patch("api.bases.managements.task_runners.connections")
+    mocker.patch("api.bases.managements.task_runners.stop_account_operation")
+    return BatchOrderQueueRegisterRunner()
+
+
+class TestBatchOrderQueueRegisterRunner:
+    def test_get_order_managements(self, runner, mocker: MockerFixture) -> None:
+        """계좌별 조회는 max_workers 만큼 동시 처리, 계좌별 오류는 note 로 분리"""
+        lock = threading.Lock()
+        running = [0, 0]  # 현재, 최대 동시 처리 수
+
+        def get_order_management(account_alias, **kwargs):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            if account_alias == "1003":
+                raise StopOrderOperation("Has invalid transaction history")
+            if account_alias == "1004":
+                raise ValueError("broker down")
+            return SimpleNamespace(account_alias=account_alias, **kwargs)
+
+        mocker.patch.object(
+            runner, "get_order_management", side_effect=get_order_management
+        )
+        runner.max_workers = 3
+        account_aliases = [str(1000 + i) for i in range(1, 7)]
+
+        order_managements, notes = runner.get_order_managements(
+            account_aliases=account_aliases,
+            portfolio=PORTFOLIO,
+            vendor_code="kb",
+        )
+
+        assert running[1] == 3
+        assert list(order_managements) == ["1001", "1002", "1005", "1006"]
+        assert {om.vendor_code for om in order_managements.values()} == {"kb"}
+        assert notes == {
+            "1003": "Has invalid transaction history",
+            "1004": "error: broker down",
+        }
+        assert runner.get_order_managements(account_aliases=[]) == ({}, {})
+
+    def test_process(self, runner, mocker: MockerFixture) -> None:
+        """조회 실패 계좌도 오류 note 로 큐 등록"""
+        mocker.patch.object(
+            runner, "get_order_management", side_effect=ValueError("broker down")
+        )
+
+        runner.process(
+            account_aliases=["1001", "1002"],
+            portfolio=PORTFOLIO,
+            daily_order_mode=Event.MODES.new_order,
+            exchange_rate=1300.0,
+            vendor_code="kb",
+        )
+
+        assert sorted(
+            Queue.objects.values_list("account_alias", "mode", "status", "note")
+        ) == [
+            ("1001", Queue.MODES.bid, Queue.STATUS.canceled, "error: broker down"),
+            ("1002", Queue.MODES.bid, Queue.STATUS.canceled, "error: broker down"),
+        ]
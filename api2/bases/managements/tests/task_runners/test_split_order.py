@@ -0,0 +1,161 @@
+from datetime import datetime
+
+import pytest
+import pytz
+from django.core.cache import caches
+from pytest_mock import MockerFixture
+
+from api.bases.managements.models import Queue
+from api.bases.managements.task_runners import (
+    TWAP_SPREAD_RATIO,
+    ExecutionManagementRunner,
+    SplitOrderController,
+)
+
+pytestmark = pytest.mark.django_db(databases=["default", "accounts"])
+
+US_TZ = pytz.timezone("America/New_York")
+PORTFOLIO_ID = "2021051712300"
+PORTFOLIO_MAP = {"12": {"3": {"port_seq": 1, "port_data": [{"code": "SPY"}]}}}
+
+
+def get_us_datetime(hour, minute, second=0) -> datetime:
+    return US_TZ.localize(datetime(2021, 5, 17, hour, minute, second))
+
+
+def create_queue(
+    account_alias, mode=Queue.MODES.sell, portfolio_id=PORTFOLIO_ID, status=None
+) -> Queue:
+    queue = Queue(
+        account_alias=account_alias,
+        vendor_code="kb",
+        mode=mode,
+        status=status or Queue.STATUS.on_hold,
+    )
+    queue.save(portfolio_id=portfolio_id)
+    Queue.objects.filter(id=queue.id).update(created=get_us_datetime(9, 0))
+    return queue
+
+
+@pytest.fixture
+def controller(mocker: MockerFixture) -> SplitOrderController:
+    controller = SplitOrderController()
+    mocker.patch.object(controller, "get_portfolio_map", return_value=PORTFOLIO_MAP)
+    return controller
+
+
+@pytest.fixture
+def apply_async(mocker: MockerFixture):
+    return {
+        "execution": mocker.patch.object(
+            SplitOrderController.run_split_execution, "apply_async"
+        ),
+        "cancel": mocker.patch.object(
+            SplitOrderController.run_split_cancel, "apply_async"
+        ),
+    }
+
+
+def set_us_today(mocker: MockerFixture, us_datetime: datetime) -> None:
+    mocker.patch(
+        "api.bases.managements.task_runners.get_us_today", return_value=us_datetime
+    )
+
+
+class TestSplitOrderController:
+    def test_get_order_steps(self) -> None:
+        """현재 10분 구간 이후 단계를 시간 순으로, 단계 간격은 최소 시각 차"""
+        steps, step_interval = SplitOrderController().get_order_steps(
+            get_us_datetime(15, 25, 30), "full", 20
+        )
+
+        assert step_interval == 600
+        assert [(dt.strftime("%H:%M"), plan["position"]) for dt, plan in steps] == [
+            ("15:20", "S"),
+            ("15:30", "L"),
+            ("15:40", "L"),
+            ("15:50", "L"),
+        ]
+        assert steps[1][1] == {
+            "min_qty": 20,
+            "now_strftime": "15:30",
+            "now_adjust": "15:30",
+            "position": "L",
+            "order_type": "New",
+            "current_number_of_order": 6,
+            "total_number_of_order": 6,
+            "remaining_number_of_order": 0,
+        }
+
+    def test_scheduler(self, controller, apply_async, mocker: MockerFixture) -> None:
+        """현재 단계의 활성 큐만 단계 간격 내 countdown 으로 분산 예약, 포트폴리오 없는 큐는 건너뜀"""
+        queues = [create_queue("1001"), create_queue("1002")]
+        create_queue("1003", portfolio_id="2021051799900")
+        create_queue("1004", status=Queue.STATUS.completed)
+
+        set_us_today(mocker, get_us_datetime(10, 5, 30))
+        assert controller.scheduler("kb", "full", 20) == {
+            "steps": 1,
+            "tasks": 2,
+            "skipped": 1,
+        }
+
+        calls = apply_async["execution"].call_args_list
+        assert [c.args[0][0] for c in calls] == [q.id for q in queues]
+        assert {c.args[0][4]["now_adjust"] for c in calls} == {"10:00"}
+        assert [c.kwargs["countdown"] for c in calls] == [
+            0,
+            600 * TWAP_SPREAD_RATIO / 3,
+        ]
+        assert {c.kwargs["expires"] for c in calls} == {600}
+        apply_async["cancel"].assert_not_called()
+
+    def test_scheduler_per_step(
+        self, controller, apply_async, mocker: MockerFixture
+    ) -> None:
+        """단계마다 큐를 다시 조회(장중 등록 큐 포함), 단계 간격 밖 단계는 예약하지 않음"""
+        create_queue("1001")
+
+        set_us_today(mocker, get_us_datetime(9, 0))
+        assert controller.scheduler("kb", "full", 20)["steps"] == 0
+
+        set_us_today(mocker, get_us_datetime(10, 20, 30))
+        assert controller.scheduler("kb", "full", 20)["tasks"] == 1
+        assert apply_async["cancel"].call_args.kwargs == {
+            "retry": False,
+            "countdown": 0,
+            "expires": 600,
+        }
+
+        create_queue("1002")
+        set_us_today(mocker, get_us_datetime(11, 0))
+        assert controller.scheduler("kb", "full", 20)["tasks"] == 2
+        assert apply_async["execution"].call_count == 2
+
+        set_us_today(mocker, get_us_datetime(16, 0))
+        assert controller.scheduler("kb", "full", 20)["steps"] == 0
+
+    def test_run_split_execution(self, mocker: MockerFixture) -> None:
+        """비활성 큐, 재전달된 단계는 실행하지 않음"""
+        caches["default"].clear()
+        process = mocker.patch.object(
+            ExecutionManagementRunner, "process", return_value="executed"
+        )
+        active_queue = create_queue("1001")
+        completed_queue = create_queue("1002", status=Queue.STATUS.completed)
+        plan = {"order_type": "New", "now_adjust": "10:00"}
+
+        args = [None, "kb", plan]
+        assert SplitOrderController.run_split_execution(active_queue.id, [], *args)
+        assert (
+            SplitOrderController.run_split_execution(active_queue.id, [], *args) is None
+        )
+        assert (
+            SplitOrderController.run_split_execution(completed_queue.id, [], *args)
+            is None
+        )
+        assert process.call_count == 1
+
+        plan = {"order_type": "Adjust", "now_adjust": "10:10"}
+        SplitOrderController.run_split_execution(active_queue.id, [], None, "kb", plan)
+        assert process.call_count == 2
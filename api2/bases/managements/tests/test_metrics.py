@@ -0,0 +1,71 @@
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+
+from api.bases.core.metrics import (
+    STAGE_BROKER,
+    STAGE_INDEX,
+    STAGE_SPLIT_EXECUTION,
+    MetricsCollector,
+)
+
+
+class TestMetricsCollector:
+    def test_concurrent_flush(self) -> None:
+        """worker 별 collector 가 동시에 flush 해도 series 누락 없음, 계좌 series 는 상한까지만 등록"""
+        cache = LocMemCache("metrics-test", {})
+        workers = [
+            MetricsCollector(cache=cache, prefix="test", max_account_series=2)
+            for _ in range(2)
+        ]
+        workers[0].observe(STAGE_BROKER, 0.1, name="orders", vendor="kb")
+        workers[1].observe(STAGE_BROKER, 0.1, name="inquiries", vendor="kb")
+        for i in range(4):
+            workers[i % 2].observe(STAGE_SPLIT_EXECUTION, 0.1, account=f"acc{i}")
+        for worker in workers:
+            worker.flush()
+
+        samples = workers[0].collect()
+        assert {
+            sample["labels"]["name"]: sample["count"]
+            for sample in samples
+            if sample["labels"]["stage"] == STAGE_BROKER
+        } == {"orders": 1, "inquiries": 1}
+        assert sorted(
+            (sample["labels"]["account"], sample["count"])
+            for sample in samples
+            if sample["labels"]["stage"] == STAGE_SPLIT_EXECUTION
+        ) == [("", 4), ("acc0", 1), ("acc2", 1)]
+
+    def test_register_after_expiry(self) -> None:
+        """index, 등록 키 만료 후 flush 시 재등록(장기 실행 worker)"""
+        cache = LocMemCache("metrics-expiry-test", {})
+        collector = MetricsCollector(cache=cache, prefix="test", timeout=1)
+
+        collector.observe(STAGE_BROKER, 0.1, name="orders", vendor="kb")
+        collector.flush()
+        time.sleep(1.5)
+        assert collector.collect() == []
+
+        collector.observe(STAGE_BROKER, 0.1, name="orders", vendor="kb")
+        collector.flush()
+        assert [sample["count"] for sample in collector.collect()] == [1]
+
+    def test_register_overwritten_slot(self) -> None:
+        """index size 만료 후 다른 series 가 같은 slot 에 등록된 경우 재등록"""
+        cache = LocMemCache("metrics-slot-test", {})
+        workers = [MetricsCollector(cache=cache, prefix="test") for _ in range(2)]
+        workers[0].observe(STAGE_BROKER, 0.1, name="orders", vendor="kb")
+        workers[0].flush()
+
+        cache.delete(workers[0].get_index_key(STAGE_INDEX, "size"))
+        workers[1].observe(STAGE_BROKER, 0.1, name="inquiries", vendor="kb")
+        workers[1].flush()
+        workers[0]._registered.clear()  # 재확인 주기 경과
+        workers[0].observe(STAGE_BROKER, 0.1, name="orders", vendor="kb")
+        workers[0].flush()
+
+        assert sorted(
+            (sample["labels"]["name"], sample["count"])
+            for sample in workers[0].collect()
+        ) == [("inquiries", 1), ("orders", 2)]
@@ -0,0 +1,107 @@
+import json
+from importlib import import_module
+
+import pandas as pd
+import pytest
+from django.apps import apps
+from pytest_mock import MockerFixture
+
+from api.bases.managements.models import Queue, QueueBasketLine
+
+pytestmark = pytest.mark.django_db
+
+PORTFOLIO_ID = "2021051600203"
+
+
+def create_order_basket(new_shares) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "shares": [10, 5, 3],
+            "new_shares": new_shares,
+            "krw_price": [130_000.0, 65_000.0, 26_000.0],
+            "usd_price": [100.0, 50.0, 20.0],
+            "buy_price": [130_000.0, 65_000.0, 26_000.0],
+        },
+        index=pd.Index(["SPY", "QQQ", "TLT"], name="code"),
+    )
+
+
+def create_queue(account_alias, order_basket, mode=Queue.MODES.bid) -> Queue:
+    queue = Queue(account_alias=account_alias, vendor_code="kb", mode=mode)
+    queue.set_order_basket(order_basket)
+    return queue
+
+
+class TestQueueBasket:
+    def test_save(self) -> None:
+        """save 시 매수 종목만 바스켓 라인으로 저장, 재설정 시 기존 라인 교체"""
+        queue = create_queue("1001", create_order_basket([10, 5, -3]))
+        queue.save(portfolio_id=PORTFOLIO_ID)
+
+        order_basket = Queue.objects.get(id=queue.id).get_order_basket()
+        pd.testing.assert_frame_equal(
+            order_basket, create_order_basket([10, 5, -3]).iloc[:2]
+        )
+
+        queue.set_order_basket(create_order_basket([0, 0, 3]))
+        queue.save()
+        assert list(queue.get_order_basket().index) == ["TLT"]
+        assert QueueBasketLine.objects.filter(queue=queue).count() == 1
+
+    def test_save_rollback(self, mocker: MockerFixture) -> None:
+        """라인 저장 실패 시 기존 바스켓 유지"""
+        queue = create_queue("1001", create_order_basket([10, 5, 3]))
+        queue.save(portfolio_id=PORTFOLIO_ID)
+
+        mocker.patch.object(
+            QueueBasketLine.objects, "bulk_create", side_effect=RuntimeError
+        )
+        queue.set_order_basket(create_order_basket([0, 0, 3]))
+        with pytest.raises(RuntimeError):
+            queue.save()
+        assert QueueBasketLine.objects.filter(queue=queue).count() == 3
+
+    def test_bulk_create_with_baskets(self) -> None:
+        queues = Queue.objects.bulk_create_with_baskets(
+            [
+                create_queue(
+                    account_alias, create_order_basket([-10, -5, -3]), Queue.MODES.sell
+                )
+                for account_alias in ["1001", "1002"]
+            ]
+        )
+
+        order_baskets = Queue.objects.get_order_baskets([q.id for q in queues])
+        assert sorted(order_baskets) == sorted(q.id for q in queues)
+        for order_basket in order_baskets.values():
+            pd.testing.assert_frame_equal(
+                order_basket, create_order_basket([-10, -5, -3])
+            )
+
+    def test_holding_ticker(self) -> None:
+        bid_queue = create_queue("1001", create_order_basket([10, 5, 0]))
+        bid_queue.save(portfolio_id=PORTFOLIO_ID)
+        ask_queue = create_queue("1002", create_order_basket([0, -5, -3]), "ask")
+        ask_queue.save(portfolio_id=PORTFOLIO_ID)
+
+        assert list(Queue.objects.holding_ticker("SPY")) == [bid_queue]
+        assert set(Queue.objects.holding_ticker("QQQ")) == {bid_queue, ask_queue}
+        assert not Queue.objects.holding_ticker("IWM").exists()
+
+    def test_legacy_order_basket(self) -> None:
+        """QueueBasketLine 도입 이전 주문(JSON 문자열) 조회, migration 으로 라인 생성"""
+        records = create_order_basket([10, 5, 3]).reset_index().to_dict("records")
+        queue = Queue(account_alias="1001", order_basket=json.dumps(records))
+        queue.save(portfolio_id=PORTFOLIO_ID)
+
+        expected = create_order_basket([10, 5, 3])
+        pd.testing.assert_frame_equal(queue.get_order_basket(), expected)
+
+        migration = import_module(
+            "api.bases.managements.migrations.0009_queuebasketline"
+        )
+        migration.migrate_order_baskets(apps, None)
+        assert QueueBasketLine.objects.filter(queue=queue).count() == len(records)
+        pd.testing.assert_frame_equal(
+            Queue.objects.get(id=queue.id).get_order_basket(), expected
+        )
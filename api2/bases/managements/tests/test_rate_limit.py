@@ -0,0 +1,78 @@
+import pytest
+import requests
+from django.core.cache.backends.locmem import LocMemCache
+from pytest_mock import MockerFixture
+
+from api.bases.core.rate_limit import BrokerTrafficGuard
+from common.rate_limit import (
+    ORDERS,
+    CircuitBreaker,
+    CircuitOpen,
+    RateLimitExceeded,
+    TokenBucket,
+)
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+@pytest.fixture
+def cache():
+    cache = LocMemCache("rate-limit-test", {})
+    yield cache
+    cache.clear()
+
+
+class TestTokenBucket:
+    def test_fixed_window(self, cache, mocker: MockerFixture) -> None:
+        """redis 가 아닌 cache 는 초 단위 윈도우에서 rate 개까지 획득"""
+        mocker.patch("common.rate_limit.time.time", return_value=1000.25)
+        bucket = TokenBucket(key="test:bucket", capacity=3, rate=3, cache=cache)
+
+        assert [bucket.try_acquire() for _ in range(4)] == [0, 0, 0, 0.75]
+        with pytest.raises(RateLimitExceeded):
+            bucket.acquire(timeout=0.5)
+
+
+class TestCircuitBreaker:
+    def test_open_and_half_open(self, cache) -> None:
+        breaker = CircuitBreaker(key="test:circuit", failure_threshold=3, cache=cache)
+        for _ in range(2):
+            breaker.record_failure()
+        breaker.check()
+
+        breaker.record_failure()
+        with pytest.raises(CircuitOpen):
+            breaker.check()
+
+        # reset_timeout 경과(half-open): 첫 요청 실패 시 다시 차단
+        cache.delete(breaker.open_key)
+        breaker.check()
+        breaker.record_failure()
+        assert breaker.is_open
+
+        # half-open 상태 첫 요청 성공 시 실패 횟수 초기화
+        cache.delete(breaker.open_key)
+        breaker.record_success()
+        breaker.record_failure()
+        assert not breaker.is_open
+
+
+class TestBrokerTrafficGuard:
+    def test_call(self, cache) -> None:
+        """5xx, timeout 은 실패로 집계, 차단 중에는 요청하지 않음"""
+        guard = BrokerTrafficGuard(vendor_code="KB", endpoint_class=ORDERS, cache=cache)
+        guard.breaker.failure_threshold = 2
+
+        assert guard.call(Response, 200).status_code == 200
+        assert guard.call(Response, 503).status_code == 503
+
+        def timeout():
+            raise requests.Timeout
+
+        with pytest.raises(requests.Timeout):
+            guard.call(timeout)
+        with pytest.raises(CircuitOpen):
+            guard.call(Response, 200)
@@ -86,7 +86,10 @@ class QueueSerializer(serializers.ModelSerializer):
         model = Queue
         fields = "__all__"
 
-    order_basket = serializers.JSONField(help_text="OrderBasket")
+    order_basket = serializers.SerializerMethodField(help_text="OrderBasket")
+
+    def get_order_basket(self, instance):
+        return instance.get_order_basket().reset_index().to_dict(orient="records")
 
     def to_representation(self, instance):
         representation = super(QueueSerializer, self).to_representation(instance)
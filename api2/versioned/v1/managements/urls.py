@@ -1,4 +1,7 @@
+from django.conf.urls import url
+
 from .views import (
+    MetricsView,
     OrderQueueViewSet,
     OrderBasketViewSet,
     OrderLogViewSet,
@@ -15,4 +18,4 @@ router.register(r"log", OrderLogViewSet)
 router.register(r"abnormal", SuspensionAccountViewSet)
 router.register(r"error_account", ErrorOccurViewSet)
 
-urlpatterns = [] + router.urls
+urlpatterns = [url(r"^metrics/$", MetricsView.as_view())] + router.urls
@@ -1,9 +1,12 @@
+from django.http import HttpResponse
 from rest_framework import mixins
 from rest_framework import viewsets, response
 from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
 
 
 from api.bases.accounts.models import Account
+from api.bases.core.metrics import collector
 from api.bases.managements.models import Queue, OrderLog, ErrorOccur
 
 from .filters import OrderQueueFilter, OrderLogFilter, ErrorOccurFilter
@@ -104,7 +107,7 @@ class OrderQueueViewSet(viewsets.ReadOnlyModelViewSet):
       - 7: 건너뜀
     """
 
-    queryset = Queue.objects.all()
+    queryset = Queue.objects.prefetch_related("basket_lines")
     serializer_class = QueueSerializer
     lookup_field = "account_alias"
     lookup_url_kwarg = lookup_field
@@ -203,3 +206,22 @@ class SuspensionAccountViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_serializer_class(self):
         return self.serializer_class_dic.get(self.action, SuspensionAccountSerializer)
+
+
+class MetricsView(APIView):
+    """
+    get: 주문 파이프라인 단계별 처리 시간
+
+    단계(stage), vendor, position, 계좌별 처리 시간/결과 집계를 Prometheus text 형식으로 조회합니다.
+    ---
+
+    - stage: order_account_fetcher, register_queue, execute_twap, split_execution,
+      broker_http, infomax_http, db_write
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(
+            collector.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
@@ -1,5 +1,7 @@
 import logging
+from collections import defaultdict
 
+import numpy as np
 import pandas as pd
 import requests as req
 from django.apps import apps
@@ -25,6 +27,25 @@ def str_to_number(str_num: str, type_cls=float):
         return 0
 
 
+def str_to_numbers(str_nums: pd.Series, type_cls=float) -> pd.Series:
+    """str_to_number 의 컬럼 단위 버전
+
+    - 콤마 제거 후 한 번에 float 변환, 빈 값은 0
+    - 변환 실패 값이 있으면 해당 컬럼만 str_to_number 로 처리(경고 로그 동일)
+    - int 는 str_to_number 와 같이 float 변환 후 소수점 이하 버림, NaN 은 0
+    """
+    str_nums = pd.Series(str_nums.values)
+    strings = str_nums.astype(str).str.replace(',', '', regex=False)
+    try:
+        numbers = strings.where(strings != '', '0').astype(float)
+    except ValueError:
+        return str_nums.map(lambda x: str_to_number(x, type_cls)).astype(type_cls)
+
+    if type_cls != float:
+        numbers = np.trunc(numbers.fillna(0))
+    return numbers.astype(type_cls)
+
+
 class BaseAmountCalculator(AccountBaseCalculateMixin):
     def __init__(self, trade_df, acct=None):
         self.acct = acct
@@ -40,7 +61,21 @@ class BaseAmountCalculator(AccountBaseCalculateMixin):
             'OVERSEA_TAX': lambda x: str_to_number(x['for_amt_r'], float),
             'OVERSEA_TAX_REFUND': lambda x: str_to_number(x['for_amt_r'], float),
     }
+        # classify_categories 용 컬럼 단위 계산, amount_func_map 과 같은 규칙
+        self.amount_vector_func_map = {
+            'INPUT': lambda df: str_to_numbers(df['trd_amt'], int),
+            'OUTPUT': lambda df: str_to_numbers(df['trd_amt'], int),
+            'INPUT_USD': lambda df: np.trunc(str_to_numbers(df['for_amt_r'], float) * str_to_numbers(df['ex_chg_rate'], float)).astype(int),
+            'OUTPUT_USD': lambda df: np.trunc(str_to_numbers(df['for_amt_r'], float) * str_to_numbers(df['ex_chg_rate'], float)).astype(int),
+            'IMPORT': lambda df: self.get_transfer_amounts(df),
+            'EXPORT': lambda df: self.get_transfer_amounts(df),
+            'DIVIDEND_INPUT': lambda df: str_to_numbers(df['for_amt_r'], float),
+            'DIVIDEND_OUTPUT': lambda df: str_to_numbers(df['for_amt_r'], float),
+            'OVERSEA_TAX': lambda df: str_to_numbers(df['for_amt_r'], float),
+            'OVERSEA_TAX_REFUND': lambda df: str_to_numbers(df['for_amt_r'], float),
+        }
         self.df = trade_df
+        self.executions = dict()  # {code_name: [execution]}, prefetch_executions 로 조회한 체결 내역
         SumUp = apps.get_model(app_label='accounts', model_name='SumUp')
         self.j_name_map = SumUp.get_amount_func_types(SumUp.objects.exclude(amount_func_type__isnull=True))
 
@@ -64,12 +99,49 @@ class BaseAmountCalculator(AccountBaseCalculateMixin):
                           'currency_name': None,
                           'amt': _amt})
 
+    @staticmethod
+    def get_j_name_lookup(j_name_map) -> dict:
+        """{category: [j_name]} -> {j_name: category}, 중복 j_name 은 classify_category 와 같이 먼저 나온 category"""
+        lookup = {}
+        for category, j_names in j_name_map.items():
+            for j_name in j_names:
+                lookup.setdefault(j_name, category)
+        return lookup
+
+    def classify_categories(self, df: pd.DataFrame) -> pd.DataFrame:
+        """classify_category 를 전체 행에 적용한 결과와 동일, category 별 컬럼 연산으로 계산"""
+        if df.empty:
+            return pd.DataFrame(index=df.index)
+
+        categories = df['j_name'].map(self.get_j_name_lookup(self.j_name_map))
+        matched = categories.notna().values
+
+        if 'currency_name' in df:
+            currency_names = df['currency_name'].where(df['currency_name'].astype(bool), 'KRW')
+        else:
+            currency_names = pd.Series('KRW', index=df.index)
+
+        positions = np.arange(len(df))
+        amounts = [pd.Series(0.0, index=positions[~matched])]
+        for category in categories.dropna().unique():
+            in_category = (categories == category).values
+            if category in self.amount_vector_func_map:
+                _amt = self.amount_vector_func_map[category](df.loc[in_category])
+                amounts.append(pd.Series(_amt.values, index=positions[in_category]))
+            else:
+                amounts.append(pd.Series(0, index=positions[in_category]))
+
+        return pd.DataFrame({'category': categories.where(matched),
+                             'currency_name': currency_names.where(matched),
+                             'amt': pd.concat(amounts).sort_index().values},
+                            index=df.index).infer_objects()
+
     def classify(self):
         if self.df.index.name != 'trd_date':
             classified = self.df.set_index('trd_date')
         else:
             classified = self.df.copy()
-        classified = classified.apply(self.classify_category, axis=1)
+        classified = self.classify_categories(classified)
         if classified.empty:
             classified = pd.DataFrame(columns=['amt', 'category'])
         classified.amt.fillna(0, inplace=True)
@@ -77,7 +149,7 @@ class BaseAmountCalculator(AccountBaseCalculateMixin):
         return classified
 
     def calculate(self):
-        classified = self.df.apply(self.classify_category, axis=1)
+        classified = self.classify_categories(self.df)
         if classified.empty:
             classified = pd.DataFrame(columns=['amt', 'category'])
         classified.amt.fillna(0, inplace=True)
@@ -120,19 +192,73 @@ class BaseAmountCalculator(AccountBaseCalculateMixin):
             base_dic[key] = round(value, 4)
         return base_dic
 
+    def calculate_daily(self) -> pd.DataFrame:
+        """일자(index)별 calculate() 결과, 일자 x category 합계로 한 번에 계산"""
+        classified = self.classify_categories(self.df)
+        if classified.empty:
+            return pd.DataFrame()
+        classified.amt.fillna(0, inplace=True)
+        summed = classified.groupby([classified.index, 'category'])['amt'].sum().unstack('category')
+        summed = summed.reindex(index=classified.index.unique(), columns=list(self.amount_vector_func_map)).fillna(0)
+
+        daily_df = pd.DataFrame({
+            'input_amt': np.trunc(summed['INPUT']) + np.trunc(summed['INPUT_USD']),
+            'output_amt': np.trunc(summed['OUTPUT']) + np.trunc(summed['OUTPUT_USD']),
+            'input_usd_amt': np.trunc(summed['INPUT_USD']),
+            'output_usd_amt': np.trunc(summed['OUTPUT_USD']),
+            'dividend_input_amt': summed['DIVIDEND_INPUT'],
+            'oversea_tax_amt': summed['OVERSEA_TAX'],
+            'dividend_output_amt': summed['DIVIDEND_OUTPUT'],
+            'oversea_tax_refund_amt': summed['OVERSEA_TAX_REFUND'],
+            'stock_import_amt': summed['IMPORT'],
+            'stock_export_amt': summed['EXPORT'],
+        })
+        daily_df['stock_transfer_amt'] = daily_df['stock_import_amt'] - daily_df['stock_export_amt']
+        daily_df['base'] = daily_df['input_amt'] - daily_df['output_amt'] + daily_df['stock_transfer_amt']
+        daily_df['base_changed'] = daily_df['base']
+        pretax_dividend = daily_df['dividend_input_amt'] - daily_df['dividend_output_amt']
+        dividend_tax = daily_df['oversea_tax_amt'] - daily_df['oversea_tax_refund_amt']
+        daily_df['dividend'] = pretax_dividend - dividend_tax
+
+        return daily_df.round(4)
+
+    def prefetch_executions(self, stock_names):
+        """
+        종목명(code_name) 별 체결 내역을 한 번에 조회해 self.executions 에 저장, 이미 조회한 종목은 제외
+        """
+        stock_names = set(stock_names) - set(self.executions)
+        if not stock_names:
+            return
+
+        executions = defaultdict(list)
+        queryset = self.acct.execution_set.filter(code_name__in=stock_names, order_status='체결')
+        for execution in queryset.values():
+            executions[execution['code_name']].append(execution)
+        self.executions.update({stock_name: executions[stock_name] for stock_name in stock_names})
+
     def get_amount_from_execution(self, trade):
-        # From DB
-        filter_kwargs = {
-            'code_name': trade['stock_name'],
-            'order_status': '체결'
-        }
-        queryset = self.acct.execution_set.filter(**filter_kwargs)
-        executions = list(queryset.values())
+        # From DB, 종목별 1회 조회(prefetch_executions)
+        self.prefetch_executions([trade['stock_name']])
+        executions = [dict(execution) for execution in self.executions[trade['stock_name']]]
 
         solution = self.get_solution_for_execution(trade, executions)
         solution_func = getattr(self, solution)
         return int(solution_func(trade, executions))
 
+    def get_transfer_amounts(self, df: pd.DataFrame) -> pd.Series:
+        """IMPORT/EXPORT: trd_p * quantity, trd_p 가 없는 행만 체결 내역(DB, 종목 일괄 조회)에서 계산"""
+        has_price = df['trd_p'].astype(bool).values
+        if not has_price.all():
+            self.prefetch_executions(df.loc[~has_price, 'stock_name'].unique())
+        positions = np.arange(len(df))
+        priced = df.loc[has_price]
+        amounts = [
+            pd.Series((str_to_numbers(priced['trd_p'], float) * str_to_numbers(priced['quantity'], int)).values,
+                      index=positions[has_price]),
+            pd.Series([self.get_amount_from_execution(trade=row) for _, row in df.loc[~has_price].iterrows()],
+                      index=positions[~has_price], dtype=int),
+        ]
+        return pd.concat([amount for amount in amounts if not amount.empty]).sort_index()
 
     def asset_prev_calculate(self) -> dict:
         """타겟 계좌의 Trade 모델 적요를 이용하여, 전일자 예수금을 계산합니다.
@@ -160,7 +286,7 @@ class BaseAmountCalculator(AccountBaseCalculateMixin):
         return prev_dic
 
 
-class CheckBaseAmountCalculator(AccountBaseCalculateMixin, BaseAmountCalculator):
+class CheckBaseAmountCalculator(BaseAmountCalculator):
     def __init__(self, acct, trade_df):
         super().__init__(trade_df)
         self.acct = acct
@@ -176,17 +302,3 @@ class CheckBaseAmountCalculator(AccountBaseCalculateMixin, BaseAmountCalculator)
             'OVERSEA_TAX': lambda x: str_to_number(x['for_amt_r'], float),
             'OVERSEA_TAX_REFUND': lambda x: str_to_number(x['for_amt_r'], float),
         }
-
-
-    def get_amount_from_execution(self, trade):
-        # From DB
-        filter_kwargs = {
-            'code_name': trade['stock_name'],
-            'order_status': '체결'
-        }
-        queryset = self.acct.execution_set.filter(**filter_kwargs)
-        executions = list(queryset.values())
-
-        solution = self.get_solution_for_execution(trade, executions)
-        solution_func = getattr(self, solution)
-        return int(solution_func(trade, executions))
@@ -1,12 +1,13 @@
 import logging
 from collections import defaultdict
 from datetime import datetime, timedelta
+from uuid import uuid4
 
-import numpy as np
 import pandas as pd
 import pytz
 import requests as req
 from django.conf import settings
+from django.core.cache import cache
 from django.db import models
 from django.utils import timezone
 from fernet_fields import EncryptedCharField
@@ -365,73 +366,91 @@ class SettlementManager(models.Manager):
     FILL_ZERO_COLUMNS = ['input_amt', 'dividend', 'dividend_input_amt', 'output_amt', 'settled_for_amt', 'commission',
                          'in_come_tax', 'for_trd_tax', 'for_commission', 'reside_tax']
     ROUND_COLUMNS = ['base', 'settled_for_amt', 'for_commission', 'for_trd_tax']
-    TRADE_TYPE_MAPS = SumUp.get_trade_types(SumUp.objects.all())
+    SETTLED_COLUMNS = ['trd_tax', 'trd_amt', 'for_amt_r', 'for_comm_r', 'reside_tax']
     DECIMAL_POINTS = 2
+    TRADE_TYPE_MAPS_VERSION_KEY = 'accounts:settlement:trade_type_maps:version'
+    _trade_type_maps = None
+    _trade_type_maps_version = None
+
+    @classmethod
+    def get_trade_type_maps(cls):
+        """
+        SumUp 거래 그룹별 적요명, 프로세스별로 재사용
+
+        공유 cache 의 version 이 바뀌면(다른 프로세스의 SumUp 변경, cache 만료 포함) 다시 조회
+        """
+        version = cache.get(cls.TRADE_TYPE_MAPS_VERSION_KEY)
+        if cls._trade_type_maps is None or version != cls._trade_type_maps_version:
+            cls._trade_type_maps = SumUp.get_trade_types(SumUp.objects.all())
+            cls._trade_type_maps_version = version
+        return cls._trade_type_maps
+
+    @classmethod
+    def invalidate_trade_type_maps(cls):
+        """SumUp 변경 시 호출, 공유 cache version 을 바꿔 모든 프로세스(celery worker 포함)에서 다시 조회"""
+        cls._trade_type_maps = None
+        cache.set(cls.TRADE_TYPE_MAPS_VERSION_KEY, uuid4().hex, timeout=None)
 
     def settle(self, account_alias_id, to_date=None, use_registered=True):
+        """
+        마지막 정산(Settlement) 이후 거래일만 정산
+
+        use_registered=False 이면 전체 거래내역 재정산
+        """
+        last_settlement = None
         if use_registered:
-            registered_settle_df = self.get_settle_df(account_alias_id=account_alias_id, to_date=to_date)
-        else:
-            registered_settle_df = pd.DataFrame()
+            last_settlement = self.get_last_settlement(account_alias_id=account_alias_id, to_date=to_date)
 
-        settle_df = self._settle_df(account_alias_id=account_alias_id,
-                                    registered_settle_df=registered_settle_df, to_date=to_date)
-        unregistered_settle_df = settle_df.loc[set(settle_df.index) - set(registered_settle_df.index)]
+        settle_df = self._settle_df(account_alias_id=account_alias_id, last_settlement=last_settlement, to_date=to_date)
 
-        if not unregistered_settle_df.empty:
+        if not settle_df.empty:
             _updated_at = timezone.now()
-            unregistered_settle_df.index = unregistered_settle_df.index.tz_localize(settings.TIME_ZONE)
-            _instances = [Settlement(**row, created_at=i, updated_at=_updated_at) for i, row in
-                          unregistered_settle_df.iterrows()]
+            settle_df.index = settle_df.index.tz_localize(settings.TIME_ZONE)
+            _instances = [Settlement(**row, created_at=i, updated_at=_updated_at) for i, row in settle_df.iterrows()]
         else:
             _instances = []
         return _instances
 
-    def _settle_df(self, account_alias_id, registered_settle_df, to_date):
+    def _settle_df(self, account_alias_id, last_settlement: pd.Series, to_date):
         _last_settle_date = None
-        if not registered_settle_df.empty:
-            _last_settle_date = registered_settle_df.index[-1]
+        if last_settlement is not None:
+            _last_settle_date = last_settlement.name
 
         trade_df = self.get_trade_df(account_alias_id=account_alias_id,
                                      last_settle_date=_last_settle_date, to_date=to_date)
-        settlement_df = trade_df.groupby(by='base_date').apply(self._settle_daily, self.TRADE_TYPE_MAPS)
+        settlement_df = self._settle_daily(trade_df, self.get_trade_type_maps())
 
         if settlement_df.empty:
             return settlement_df
 
-        settlement_df.loc[registered_settle_df.index] = registered_settle_df
         settlement_df['account_alias_id'] = account_alias_id
 
-        if not registered_settle_df.empty:
-            calculated_settle_df = settlement_df.loc[set(settlement_df.index) - set(registered_settle_df.index)]
-            calculated_settle_df.loc[registered_settle_df.index[-1]] = registered_settle_df.iloc[-1]
-        else:
-            calculated_settle_df = settlement_df
-
-        calculated_settle_df = calculated_settle_df.sort_index()
-        calculated_settle_df[self.FFILL_COLUMNS] = calculated_settle_df[self.FFILL_COLUMNS].ffill().fillna(0)
-        calculated_settle_df[self.FILL_ZERO_COLUMNS] = calculated_settle_df[self.FILL_ZERO_COLUMNS].fillna(0)
-        calculated_settle_df['base'] = calculated_settle_df['base'].fillna(0).cumsum()
-        calculated_settle_df[self.ROUND_COLUMNS] = calculated_settle_df[self.ROUND_COLUMNS].round(self.DECIMAL_POINTS)
-        settlement_df.loc[calculated_settle_df.index] = calculated_settle_df
+        # 마지막 정산 행에서 이어서 예수금 ffill, 투자원금 누적
+        if last_settlement is not None:
+            settlement_df = pd.concat([last_settlement[['base', *self.FFILL_COLUMNS]].astype(float).to_frame().T,
+                                       settlement_df])
+        settlement_df[self.FFILL_COLUMNS] = settlement_df[self.FFILL_COLUMNS].ffill().fillna(0)
+        settlement_df[self.FILL_ZERO_COLUMNS] = settlement_df[self.FILL_ZERO_COLUMNS].fillna(0)
+        settlement_df['base'] = settlement_df['base'].fillna(0).cumsum()
+        settlement_df[self.ROUND_COLUMNS] = settlement_df[self.ROUND_COLUMNS].round(self.DECIMAL_POINTS)
+        if last_settlement is not None:
+            settlement_df = settlement_df.iloc[1:]
         return settlement_df.fillna(0)
 
-    @staticmethod
-    def _settle_daily(daily_trade_df: pd.DataFrame, trade_type_maps):
-        columns = [
-            'account_alias_id',
-            'base', 'deposit', 'for_deposit', 'dividend', 'dividend_input_amt',
-            'settled_for_amt',
-            'commission', 'in_come_tax', 'reside_tax', 'for_trd_tax',
-            'for_commission']
-        _row = {k: np.nan for k in columns}
-
-        base_amt_calculator = BaseAmountCalculator(daily_trade_df)
-        _base_amt = base_amt_calculator.calculate()
-
-        for k in ['base', 'input_amt', 'output_amt', 'dividend', 'dividend_input_amt', 'stock_import_amt',
-                  'stock_export_amt']:
-            _row[k] = _base_amt[k]
+    @classmethod
+    def _settle_daily(cls, trade_df: pd.DataFrame, trade_type_maps) -> pd.DataFrame:
+        """거래일(index)별 정산, 일자 단위 groupby 집계"""
+        if trade_df.empty:
+            return pd.DataFrame()
+
+        trade_df = trade_df.sort_index(kind='stable')
+        base_dates = trade_df.index.unique()
+
+        columns = ['base', 'input_amt', 'output_amt', 'dividend', 'dividend_input_amt', 'stock_import_amt',
+                   'stock_export_amt']
+        settlement_df = BaseAmountCalculator(trade_df).calculate_daily()[columns].reindex(base_dates)
+        settlement_df = settlement_df.rename(columns={'stock_import_amt': 'import_amt',
+                                                      'stock_export_amt': 'export_amt'})
 
         krw_cash_io_sumup = []
         for k in ['INPUT', 'OUTPUT', 'SETTLEMENT_IN', 'SETTLEMENT_OUT']:
@@ -442,58 +461,51 @@ class SettlementManager(models.Manager):
                   'OVERSEA_TAX']:
             for_cash_io_sumup += trade_type_maps[k]
 
-        settlement_cash = daily_trade_df[daily_trade_df.j_name.isin(krw_cash_io_sumup)]
-        settlement_for_cash = daily_trade_df[daily_trade_df.j_name.isin(for_cash_io_sumup)]
-        _settled_bid_basis = daily_trade_df[daily_trade_df.j_name.isin(['매수'])]
-        _settled_ask_basis = daily_trade_df[daily_trade_df.j_name.isin(['매도'])]
-
-        daily_trade_aggr = daily_trade_df[['commission', 'in_come_tax']].sum(axis=0)
-        settled_bid_aggr = _settled_bid_basis[['trd_tax', 'trd_amt', 'for_amt_r', 'for_comm_r', 'reside_tax']].astype(
-            float).sum(axis=0)
-        settled_ask_aggr = _settled_ask_basis[['trd_tax', 'trd_amt', 'for_amt_r', 'for_comm_r', 'reside_tax']].astype(
-            float).sum(axis=0)
-
-        if not settlement_cash.empty:
-            _last_settlement_cash = settlement_cash.sort_values(by='ord_no', ascending=False)
-            _row['deposit'] = _last_settlement_cash.deposit_amt.values[0]
-
-        if not settlement_for_cash.empty:
-            _last_settlement_for_cash = settlement_for_cash.sort_values(by='ord_no', ascending=False)
-            _row['for_deposit'] = _last_settlement_for_cash.ex_deposit.values[0]
-
-        settled_for_amt = 0.0
-        if not _settled_bid_basis.empty:
-            settled_for_amt += settled_bid_aggr['trd_amt']
-
-        if not _settled_ask_basis.empty:
-            settled_for_amt -= settled_ask_aggr['trd_amt']
-
-        _row['settled_for_amt'] = settled_for_amt
-        _row['for_commission'] = settled_bid_aggr.for_comm_r + settled_ask_aggr.for_comm_r
-        _row['for_trd_tax'] = settled_bid_aggr.trd_tax + settled_ask_aggr.trd_tax
-        _row['reside_tax'] = settled_bid_aggr.reside_tax + settled_ask_aggr.reside_tax
-        _row['commission'] = daily_trade_aggr['commission']
-        _row['in_come_tax'] = daily_trade_aggr['in_come_tax']
-        _row['import_amt'] = _row.pop('stock_import_amt', 0)
-        _row['export_amt'] = _row.pop('stock_export_amt', 0)
-        return pd.Series(_row)
+        settlement_df['deposit'] = cls.get_last_by_ord_no(trade_df[trade_df.j_name.isin(krw_cash_io_sumup)],
+                                                          'deposit_amt')
+        settlement_df['for_deposit'] = cls.get_last_by_ord_no(trade_df[trade_df.j_name.isin(for_cash_io_sumup)],
+                                                              'ex_deposit')
+
+        daily_trade_aggr = trade_df[['commission', 'in_come_tax']].groupby(level=0).sum()
+        settled_bid_aggr = trade_df.loc[trade_df.j_name.isin(['매수']), cls.SETTLED_COLUMNS].astype(float).groupby(
+            level=0).sum().reindex(base_dates, fill_value=0.0)
+        settled_ask_aggr = trade_df.loc[trade_df.j_name.isin(['매도']), cls.SETTLED_COLUMNS].astype(float).groupby(
+            level=0).sum().reindex(base_dates, fill_value=0.0)
+
+        settlement_df['settled_for_amt'] = settled_bid_aggr['trd_amt'] - settled_ask_aggr['trd_amt']
+        settlement_df['for_commission'] = settled_bid_aggr.for_comm_r + settled_ask_aggr.for_comm_r
+        settlement_df['for_trd_tax'] = settled_bid_aggr.trd_tax + settled_ask_aggr.trd_tax
+        settlement_df['reside_tax'] = settled_bid_aggr.reside_tax + settled_ask_aggr.reside_tax
+        settlement_df['commission'] = daily_trade_aggr['commission']
+        settlement_df['in_come_tax'] = daily_trade_aggr['in_come_tax']
+        return settlement_df
+
+    @staticmethod
+    def get_last_by_ord_no(trade_df: pd.DataFrame, column) -> pd.Series:
+        """거래일별 마지막 거래(ord_no 최대)의 column 값"""
+        last_df = trade_df[['ord_no', column]].rename_axis('base_date').reset_index()
+        last_df = last_df.sort_values(by=['base_date', 'ord_no'])
+        last_df = last_df[~last_df['base_date'].duplicated(keep='last')]
+        return last_df.set_index('base_date')[column]
 
     @staticmethod
-    def get_settle_df(account_alias_id, to_date):
+    def get_last_settlement(account_alias_id, to_date=None):
+        """마지막 정산 행(base, deposit, for_deposit), name 은 정산일(base_date)"""
         filter_kwargs = {
         }
 
         if to_date:
             filter_kwargs['created_at__date__lte'] = to_date
 
-        _settle_df = pd.DataFrame(Settlement.objects.filter(
-            account_alias_id=account_alias_id, **filter_kwargs).values())
+        _last_settlement = Settlement.objects.filter(
+            account_alias_id=account_alias_id, **filter_kwargs).order_by('created_at').values(
+            'created_at', 'base', 'deposit', 'for_deposit').last()
+
+        if _last_settlement is None:
+            return None
 
-        if not _settle_df.empty:
-            _settle_df = _settle_df.set_index('created_at')
-            _settle_df.index = pd.to_datetime(_settle_df.index.tz_convert(pytz.timezone('Asia/Seoul')).date)
-        _settle_df.index.name = 'base_date'
-        return _settle_df
+        _created_at = _last_settlement.pop('created_at')
+        return pd.Series(_last_settlement, name=pd.Timestamp(_created_at.astimezone(pytz.timezone('Asia/Seoul')).date()))
 
     @staticmethod
     def get_trade_df(account_alias_id, last_settle_date=None, to_date=None):
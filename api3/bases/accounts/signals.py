@@ -1,6 +1,6 @@
-from api.bases.accounts.models import Account
+from api.bases.accounts.models import Account, Settlement, SumUp
 from reversion.models import Version
-from django.db.models.signals import pre_delete
+from django.db.models.signals import pre_delete, post_save, post_delete
 from django.dispatch import receiver
 import logging
 
@@ -16,3 +16,9 @@ def delete_reversion(sender, instance: Account, **kwargs):
         _version_queryset.delete()
     except Exception as e:
         logger.warning(f"{instance} versions are failed to delete: {str(e)}")
+
+
+@receiver(post_save, sender=SumUp, dispatch_uid='sumup_save_signal')
+@receiver(post_delete, sender=SumUp, dispatch_uid='sumup_delete_signal')
+def invalidate_trade_type_maps(sender, instance: SumUp, **kwargs):
+    Settlement.objects.invalidate_trade_type_maps()
@@ -1,6 +1,9 @@
 import logging
+import math
 
-from celery import shared_task
+from celery import chord, shared_task
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 
 from api.bases.accounts.models import Account, SumUp, Trade
@@ -8,22 +11,133 @@ from api.versioned.v1.accounts.serializers import (
     AmountHistoryCreateSerializer, AmountHistoryUpdateSerializer, HoldingCreateSerializer
 )
 from common.exceptions import PreconditionFailed, DuplicateAccess
-from common.utils import get_datetime_kst
 
 logger = logging.getLogger('django.server')
 
+# 계좌 배치(settle_daily_amount, calculate_holdings): 계좌를 concurrency 개 chunk 로 나눠 chord 로 실행
+ACCOUNT_BATCH_CONCURRENCY = getattr(settings, 'ACCOUNT_BATCH_CONCURRENCY', 8)  # 워커 풀 크기에 맞춤
+ACCOUNT_BATCH_MAX_RETRIES = getattr(settings, 'ACCOUNT_BATCH_MAX_RETRIES', 3)
+ACCOUNT_BATCH_RETRY_COUNTDOWN = 60  # seconds
+ACCOUNT_BATCH_LOCK_TIMEOUT = 60 * 30  # seconds, 계좌 처리 중 표시
+ACCOUNT_BATCH_DONE_TIMEOUT = 60 * 60 * 24  # seconds, (계좌, 기준일) 처리 완료 표시
+# already_done: (계좌, 기준일) 이미 처리 중이거나 완료
+# invalid: 처리 대상 아님(serializer 검증 실패 등)
+ACCOUNT_BATCH_COUNTS = ['trial', 'success', 'already_done', 'invalid', 'fail']
+
+
+def chunk_account_aliases(account_aliases, concurrency) -> list:
+    account_aliases = list(account_aliases)
+    chunk_size = max(math.ceil(len(account_aliases) / max(concurrency, 1)), 1)
+    return [account_aliases[i:i + chunk_size] for i in range(0, len(account_aliases), chunk_size)]
+
+
+def get_idempotency_key(task_name, account_alias, base_date) -> str:
+    return f"{task_name}:{account_alias}:{base_date}"
+
+
+def get_empty_account_result() -> dict:
+    return dict({k: 0 for k in ACCOUNT_BATCH_COUNTS}, failed_accounts={})
+
+
+def run_account_chunk(task_name, account_aliases, base_date, func) -> dict:
+    """
+    chunk 내 계좌별 func(account_alias) 실행, 실패 계좌는 다음 계좌 처리를 막지 않음
+
+    - func 반환값 True: success, False: invalid, 예외: fail
+    - (task_name, 계좌, 기준일) 키로 이미 처리 중이거나 완료된 계좌는 already_done
+    """
+    result = get_empty_account_result()
+
+    for account_alias in account_aliases:
+        result['trial'] += 1
+        key = get_idempotency_key(task_name, account_alias, base_date)
+        if not cache.add(key, 'running', timeout=ACCOUNT_BATCH_LOCK_TIMEOUT):
+            result['already_done'] += 1
+            continue
 
-@shared_task(bind=True)
-def settle_daily_amount(*args, **kwargs):
-    logger.info("RUN TASK")
-    for acct in Account.objects.filter(trade__isnull=False).distinct():
-        serializer = AmountHistoryCreateSerializer(data={'account_alias': acct.pk})
         try:
-            if serializer.is_valid():
-                serializer.save()
+            succeeded = func(account_alias)
         except Exception as e:
-            logger.warning(e)
-    logger.info("DONE TASK")
+            logger.warning(f"{task_name} failed for {account_alias}, detail: {e}")
+            cache.delete(key)
+            result['fail'] += 1
+            result['failed_accounts'][account_alias] = str(e)
+            continue
+
+        cache.set(key, 'done', timeout=ACCOUNT_BATCH_DONE_TIMEOUT)
+        result['success' if succeeded else 'invalid'] += 1
+    return result
+
+
+def merge_account_results(results) -> dict:
+    merged = get_empty_account_result()
+    for result in results:
+        for k in ACCOUNT_BATCH_COUNTS:
+            merged[k] += result[k]
+        merged['failed_accounts'].update(result['failed_accounts'])
+    return merged
+
+
+def run_account_chunk_with_retry(task, task_name, account_aliases, base_date, func, prev_result=None, **kwargs):
+    """
+    run_account_chunk 후 실패 계좌만 chunk 단위로 재시도(task.retry), 재시도 소진 시 실패 계좌를 결과에 남김
+    """
+    result = run_account_chunk(task_name, account_aliases, base_date, func)
+    if prev_result:
+        # 이전 실행의 실패 계좌만 재시도했으므로 실패 내역은 이번 결과로 대체
+        prev_result = dict(prev_result, trial=prev_result['trial'] - result['trial'], fail=0, failed_accounts={})
+        result = merge_account_results([prev_result, result])
+
+    if result['fail'] and task.request.retries < task.max_retries:
+        raise task.retry(kwargs=dict(kwargs, account_aliases=list(result['failed_accounts']), base_date=base_date,
+                                     prev_result=result),
+                         countdown=ACCOUNT_BATCH_RETRY_COUNTDOWN)
+    return result
+
+
+def dispatch_account_chunks(task_name, chunk_task, account_aliases, base_date, concurrency=None, **kwargs) -> dict:
+    chunks = chunk_account_aliases(account_aliases, concurrency or ACCOUNT_BATCH_CONCURRENCY)
+    if not chunks:
+        logger.info(f"{task_name}: no accounts")
+        return {'chunks': 0, 'accounts': 0}
+
+    header = [chunk_task.s(account_aliases=chunk, base_date=base_date, **kwargs) for chunk in chunks]
+    async_result = chord(header)(summarize_account_batch.s(task_name=task_name, base_date=base_date))
+    logger.info(f"{task_name}: dispatched {len(chunks)} chunks, {sum(map(len, chunks))} accounts")
+    return {'chunks': len(chunks), 'accounts': sum(map(len, chunks)), 'summary_task_id': async_result.id}
+
+
+@shared_task(bind=True)
+def summarize_account_batch(self, results, task_name, base_date, *args, **kwargs):
+    summary = merge_account_results(results)
+    summary.update(task_name=task_name, base_date=base_date)
+    if summary['failed_accounts']:
+        logger.warning(f"{task_name}({base_date}) failed accounts: {summary['failed_accounts']}")
+    logger.info(f"DONE {task_name}({base_date}): {summary['success']}/{summary['trial']} "
+                f"(already done: {summary['already_done']}, invalid: {summary['invalid']}, fail: {summary['fail']})")
+    return summary
+
+
+def settle_account_amount(account_alias) -> bool:
+    serializer = AmountHistoryCreateSerializer(data={'account_alias': account_alias})
+    if not serializer.is_valid():
+        return False
+    serializer.save()
+    return True
+
+
+@shared_task(bind=True)
+def settle_daily_amount(self, concurrency=None, *args, **kwargs):
+    logger.info("RUN TASK")
+    account_aliases = Account.objects.filter(trade__isnull=False).distinct().values_list('account_alias', flat=True)
+    return dispatch_account_chunks('settle_daily_amount', settle_daily_amount_chunk, account_aliases,
+                                   base_date=timezone.localdate().isoformat(), concurrency=concurrency)
+
+
+@shared_task(bind=True, max_retries=ACCOUNT_BATCH_MAX_RETRIES)
+def settle_daily_amount_chunk(self, account_aliases, base_date, prev_result=None, *args, **kwargs):
+    return run_account_chunk_with_retry(self, 'settle_daily_amount', account_aliases, base_date,
+                                        settle_account_amount, prev_result=prev_result)
 
 
 @shared_task(bind=True)
@@ -42,8 +156,8 @@ def register_sum_up(*args, **kwargs):
 
 
 @shared_task(bind=True)
-def recalculate_amount(self, account_alias_whitelist=None, j_names=None, *args, **kwargs):
-    logger.info(f"TRY recalculate DailyAmount, J_NAMES: {j_names}")
+def recalculate_amount(self, account_alias_whitelist=None, j_names=None, dry_run=False, *args, **kwargs):
+    logger.info(f"TRY recalculate DailyAmount, J_NAMES: {j_names}, DRY_RUN: {dry_run}")
     self.update_state(state="PROGRESS")
     queryset = Account.objects.filter(trade__j_name__in=j_names, amounthistory__isnull=False).distinct()
 
@@ -51,27 +165,40 @@ def recalculate_amount(self, account_alias_whitelist=None, j_names=None, *args,
         logger.info(f"target AliasSet: {account_alias_whitelist}")
         queryset = queryset.filter(account_alias__in=account_alias_whitelist)
 
-    updated_accounts, updated_rows = 0, 0
+    updated_accounts, updated_rows, fields = 0, 0, {}
     for acct in queryset.iterator():
-        diffs = AmountHistoryUpdateSerializer.get_diffs(acct=acct, queryset=acct.amounthistory_set)
+        summary = AmountHistoryUpdateSerializer.recalculate(acct=acct, queryset=acct.amounthistory_set,
+                                                            dry_run=dry_run)
 
-        if not diffs.empty:
+        if summary['updated_rows']:
             updated_accounts += 1
-            for i, row in diffs.iterrows():
-                instance = acct.amounthistory_set.get(created_at=get_datetime_kst(i))
-                serializer = AmountHistoryUpdateSerializer(instance, data=row.to_dict())
-                serializer.is_valid(raise_exception=True)
-                serializer.save()
-                updated_rows += 1
-
-    result = {'updated_accounts': updated_accounts, 'updated_rows': updated_rows,
-              'j_names': j_names, 'account_alias_whitelist': account_alias_whitelist}
+            updated_rows += summary['updated_rows']
+            for k, field_summary in summary['fields'].items():
+                _field = fields.setdefault(k, {'rows': 0, 'delta': 0})
+                _field['rows'] += field_summary['rows']
+                _field['delta'] = round(_field['delta'] + field_summary['delta'], 4)
+
+    result = {'updated_accounts': updated_accounts, 'updated_rows': updated_rows, 'fields': fields,
+              'dry_run': dry_run, 'j_names': j_names, 'account_alias_whitelist': account_alias_whitelist}
     logger.info("Recalculated DailyAmount")
     return result
 
 
-@shared_task(bind=Trade)
-def calculate_holdings(self, *args, **kwargs):
+def calculate_account_holdings(account_alias, base_date, j_name_map) -> bool:
+    s = HoldingCreateSerializer(data={'account_alias': account_alias, 'to_date': base_date,
+                                      'j_name_map': j_name_map})
+    if not s.is_valid():
+        return False
+
+    try:
+        s.save()
+    except (PreconditionFailed, DuplicateAccess):
+        return False
+    return True
+
+
+@shared_task(bind=True)
+def calculate_holdings(self, concurrency=None, *args, **kwargs):
     today = timezone.now()
     registered_alias_set = Account.objects.filter(
         holding__created_at__date=today).distinct().values_list('account_alias', flat=True)
@@ -79,28 +206,15 @@ def calculate_holdings(self, *args, **kwargs):
 
     j_name_map = SumUp.get_trade_types(SumUp.objects.filter(trade_type__in=['BID', 'ASK', 'IMPORT', 'EXPORT']))
 
-    results = {
-        'trial': 0,
-        'success': 0,
-        'skipped': 0,
-        'fail': 0
-    }
+    return dispatch_account_chunks('calculate_holdings', calculate_holdings_chunk,
+                                   queryset.values_list('account_alias', flat=True),
+                                   base_date=today.date().isoformat(), concurrency=concurrency,
+                                   j_name_map=dict(j_name_map))
 
-    for acct in queryset.iterator():
-        s = HoldingCreateSerializer(data={'account_alias': acct.account_alias, 'to_date': today.date(),
-                                          'j_name_map': j_name_map})
-
-        results['trial'] += 1
-        if s.is_valid():
-            try:
-                s.save()
-                results['success'] += 1
-            except PreconditionFailed as e:
-                results['skipped'] += 1
-            except DuplicateAccess as e:
-                results['skipped'] += 1
-            except Exception as e:
-                logger.warning(f"Failed to calc qty for {acct.account_alias}, detail: {e}")
-                results['fail'] += 1
-
-    return results
+
+@shared_task(bind=True, max_retries=ACCOUNT_BATCH_MAX_RETRIES)
+def calculate_holdings_chunk(self, account_aliases, base_date, j_name_map, prev_result=None, *args, **kwargs):
+    return run_account_chunk_with_retry(
+        self, 'calculate_holdings', account_aliases, base_date,
+        lambda account_alias: calculate_account_holdings(account_alias, base_date, j_name_map),
+        prev_result=prev_result, j_name_map=j_name_map)
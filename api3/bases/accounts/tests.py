@@ -0,0 +1,381 @@
+import logging
+import os
+import time
+from datetime import datetime
+from unittest import mock, skipUnless
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.bases.accounts.calcuator import BaseAmountCalculator, str_to_number
+from api.bases.accounts.models import Account, AmountHistory, Execution, Settlement, SumUp, Trade
+from api.bases.accounts.tasks import (
+    ACCOUNT_BATCH_MAX_RETRIES, calculate_holdings_chunk, chunk_account_aliases, run_account_chunk,
+    summarize_account_batch
+)
+from api.versioned.v1.accounts.serializers import AmountHistoryCreateSerializer, AmountHistoryUpdateSerializer
+from common.utils import KST_TZ
+
+logger = logging.getLogger('django.server')
+
+# 실행 환경에 따라 달라지는 처리 시간 측정은 RUN_BENCHMARKS=1 인 경우에만 실행(기록만 함)
+RUN_BENCHMARKS = os.environ.get('RUN_BENCHMARKS') == '1'
+
+J_NAME_MAP = {
+    'INPUT': ['이체입금', '대체입금'],
+    'OUTPUT': ['이체출금'],
+    'INPUT_USD': ['외화입금'],
+    'OUTPUT_USD': ['외화출금'],
+    'IMPORT': ['타사입고'],
+    'EXPORT': ['타사출고'],
+    'DIVIDEND_INPUT': ['배당금입금'],
+    'DIVIDEND_OUTPUT': ['배당금출금'],
+    'OVERSEA_TAX': ['해외세금'],
+    'OVERSEA_TAX_REFUND': ['해외세금환급'],
+}
+
+
+def create_trades(size, seed=0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    j_names = [j_name for values in J_NAME_MAP.values() for j_name in values] + ['매수', '매도']
+
+    def amounts():
+        values = [f'{value:,.{digits}f}' for value, digits in zip(rng.uniform(0, 1e7, size), rng.integers(0, 4, size))]
+        for i in rng.integers(0, size, size // 20):
+            values[i] = rng.choice(['', None, '0'])
+        return values
+
+    return pd.DataFrame({
+        'trd_date': pd.date_range('2000-01-01', periods=size // 3 + 1).strftime('%Y%m%d').repeat(3)[:size],
+        'j_name': rng.choice(j_names, size),
+        'trd_amt': amounts(),
+        'for_amt_r': [f'{value:.2f}' for value in rng.uniform(0, 1e4, size)],
+        'ex_chg_rate': [f'{value:.2f}' for value in rng.uniform(1000, 1400, size)],
+        'trd_p': [f'{value:.4f}' for value in rng.uniform(1, 500, size)],  # 체결 내역(DB) 조회 경로 제외
+        'quantity': [str(value) for value in rng.integers(0, 100, size)],
+        'currency_name': rng.choice(np.array(['USD', 'KRW', '', None], dtype=object), size),
+    })
+
+
+class BaseAmountCalculatorTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        SumUp.objects.bulk_create([
+            SumUp(j_name=j_name, j_code=f'{i:03d}', amount_func_type=amount_func_type)
+            for i, (amount_func_type, j_name) in enumerate(
+                (amount_func_type, j_name) for amount_func_type, j_names in J_NAME_MAP.items() for j_name in j_names
+            )
+        ])
+
+    def test_classify_categories_equals_classify_category(self):
+        """
+        category 별 컬럼 연산 결과와 행 단위(classify_category) 결과 비교
+        """
+        trades = create_trades(size=3000).set_index('trd_date')
+        calculator = BaseAmountCalculator(trade_df=trades)
+
+        expected = trades.apply(calculator.classify_category, axis=1)
+        pd.testing.assert_frame_equal(calculator.classify_categories(trades), expected, check_exact=True)
+
+    @skipUnless(RUN_BENCHMARKS, 'benchmark, run with RUN_BENCHMARKS=1')
+    def test_classify_100k_trades(self):
+        """
+        100k 거래내역 분류 소요 시간(행 단위 분류는 수십 초)
+        """
+        calculator = BaseAmountCalculator(trade_df=create_trades(size=100000))
+
+        started_at = time.perf_counter()
+        classified = calculator.classify()
+        elapsed = time.perf_counter() - started_at
+
+        logger.info(f'classify 100k trades: {elapsed:.3f}s')
+        self.assertEqual(len(classified), 100000)
+
+
+def create_execution(acct, ord_no, code_name, order_status='체결') -> Execution:
+    return Execution(account_alias=acct, order_date='2021-01-04', ord_no=ord_no, code_name=code_name,
+                     order_status=order_status, exec_qty=ord_no % 7 + 1, exec_price=100 + ord_no, ord_qty=10,
+                     ord_price=100, mkt_clsf_nm='NASDAQ', order_tool_name='API', aplc_excj_rate=1100,
+                     org_price=100, exchange_rate=1100, frgn_stp_prc=0)
+
+
+def get_transfer_amount_per_row(calculator, trade):
+    """prefetch_executions 이전 구현, trd_p 가 없는 거래내역 행마다 체결 내역 조회"""
+    if trade['trd_p']:
+        return str_to_number(trade['trd_p'], float) * str_to_number(trade['quantity'], int)
+    queryset = calculator.acct.execution_set.filter(code_name=trade['stock_name'], order_status='체결')
+    executions = list(queryset.values())
+    solution = calculator.get_solution_for_execution(trade, executions)
+    return int(getattr(calculator, solution)(trade, executions))
+
+
+class ExecutionPrefetchTestCase(TestCase):
+    STOCK_NAMES = ['APPLE', 'TESLA', 'NVIDIA', 'NO_EXECUTION']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.acct = Account.objects.create(vendor_code='kb', account_number='12345678901', account_type='etf')
+        Execution.objects.bulk_create([
+            create_execution(cls.acct, ord_no, code_name, order_status='체결' if ord_no % 5 else '거부')
+            for ord_no, code_name in enumerate(cls.STOCK_NAMES[:3] * 10)
+        ])
+
+    def create_transfer_trades(self, size) -> pd.DataFrame:
+        rng = np.random.default_rng(size)
+        return pd.DataFrame({
+            'trd_date': pd.date_range('2021-01-04', periods=size).strftime('%Y%m%d'),
+            'j_name': rng.choice(J_NAME_MAP['IMPORT'] + J_NAME_MAP['EXPORT'], size),
+            'trd_p': np.where(rng.random(size) < 0.2, '12.5', ''),
+            'quantity': [str(value) for value in rng.integers(1, 100, size)],
+            'stock_name': rng.choice(self.STOCK_NAMES, size),
+        })
+
+    def test_get_transfer_amounts(self):
+        """
+        trd_p 가 없는 입출고 거래내역 수와 관계없이 체결 내역 조회 1회, 행 단위 조회 결과와 동일
+        """
+        for size in (10, 200):
+            trades = self.create_transfer_trades(size)
+            calculator = BaseAmountCalculator(trade_df=trades, acct=self.acct)
+
+            with self.assertNumQueries(1):
+                amounts = calculator.get_transfer_amounts(trades)
+
+            expected = [get_transfer_amount_per_row(calculator, trade) for _, trade in trades.iterrows()]
+            self.assertEqual(amounts.tolist(), expected)
+
+
+class TradeTypeMapsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_invalidate_trade_type_maps(self):
+        """
+        SumUp 변경 시 다른 프로세스(공유 cache version 만 변경됨)에서도 다시 조회
+        """
+        SumUp.objects.create(j_name='이체입금', j_code='001', trade_type='INPUT')
+        self.assertEqual(Settlement.objects.get_trade_type_maps()['INPUT'], ['이체입금'])
+
+        with self.assertNumQueries(0):
+            Settlement.objects.get_trade_type_maps()
+
+        # 다른 프로세스의 SumUp 저장: 현재 프로세스의 class 캐시는 그대로, 공유 cache version 만 변경
+        SumUp.objects.bulk_create([SumUp(j_name='대체입금', j_code='002', trade_type='INPUT')])
+        cache.set(Settlement.objects.TRADE_TYPE_MAPS_VERSION_KEY, 'other-process')
+        self.assertEqual(Settlement.objects.get_trade_type_maps()['INPUT'], ['이체입금', '대체입금'])
+
+
+SETTLEMENT_FIELDS = ['base', 'deposit', 'for_deposit', 'input_amt', 'output_amt', 'import_amt', 'export_amt',
+                     'dividend', 'dividend_input_amt', 'commission', 'in_come_tax', 'reside_tax', 'settled_for_amt',
+                     'for_trd_tax', 'for_commission']
+
+
+def create_settlement_trades(acct, base_dates, no_cash_io_dates) -> list:
+    """
+    거래일별 1~3건, no_cash_io_dates 는 매수/매도만(예수금 변동 거래 없음, 예수금 ffill 대상)
+    """
+    rng = np.random.default_rng(0)
+    cash_io_j_names = ['이체입금', '이체출금', '외화입금', '환전', '배당금입금']
+    trades, deposit, ex_deposit = [], 0, 0.0
+    for i, base_date in enumerate(base_dates):
+        j_names = ['매수', '매도'] if base_date in no_cash_io_dates else cash_io_j_names + ['매수']
+        for ord_no, j_name in enumerate(rng.choice(j_names, i % 3 + 1), start=1):
+            trd_amt = int(rng.integers(1, 100)) * 10000
+            deposit += -trd_amt if j_name == '이체출금' else trd_amt
+            ex_deposit = round(ex_deposit + float(rng.uniform(0, 100)), 2)
+            trades.append(Trade(account_alias=acct, trd_date=base_date.date(), ord_no=ord_no, j_name=j_name,
+                                trd_amt=trd_amt, for_amt_r=round(float(rng.uniform(0, 100)), 2), ex_chg_rate=1100.0,
+                                deposit_amt=deposit, ex_deposit=ex_deposit, commission=int(rng.integers(0, 100)),
+                                in_come_tax=0, trd_tax=round(float(rng.uniform(0, 1)), 4),
+                                for_comm_r=round(float(rng.uniform(0, 5)), 2), reside_tax=int(rng.integers(0, 10)),
+                                pre_pay_repay=0, currency_name='USD' if j_name == '외화입금' else 'KRW'))
+    return trades
+
+
+class SettlementTestCase(TestCase):
+    BASE_DATES = pd.bdate_range('2021-01-04', periods=20)
+    LAST_SETTLE_INDEX = 6
+
+    @classmethod
+    def setUpTestData(cls):
+        SumUp.objects.bulk_create([
+            SumUp(j_name='이체입금', j_code='001', amount_func_type='INPUT', trade_type='INPUT'),
+            SumUp(j_name='이체출금', j_code='002', amount_func_type='OUTPUT', trade_type='OUTPUT'),
+            SumUp(j_name='외화입금', j_code='003', amount_func_type='INPUT_USD', trade_type='INPUT_USD'),
+            SumUp(j_name='환전', j_code='004', trade_type='EXCHANGE'),
+            SumUp(j_name='배당금입금', j_code='005', amount_func_type='DIVIDEND_INPUT', trade_type='DIVIDEND_INPUT'),
+            SumUp(j_name='매수', j_code='006', trade_type='BID'),
+            SumUp(j_name='매도', j_code='007', trade_type='ASK'),
+        ])
+        Settlement.objects.invalidate_trade_type_maps()
+
+        cls.acct = Account.objects.create(vendor_code='kb', account_number='12345678901', account_type='etf')
+        cls.no_cash_io_dates = cls.BASE_DATES[cls.LAST_SETTLE_INDEX + 1::4]
+        Trade.objects.bulk_create(create_settlement_trades(cls.acct, cls.BASE_DATES, cls.no_cash_io_dates))
+
+    @staticmethod
+    def to_frame(instances) -> pd.DataFrame:
+        return pd.DataFrame([[getattr(instance, field) for field in SETTLEMENT_FIELDS] for instance in instances],
+                            index=[instance.created_at for instance in instances],
+                            columns=SETTLEMENT_FIELDS).astype(float)
+
+    def test_settle_from_last_settlement(self):
+        """
+        마지막 정산(Settlement) 이후만 정산한 결과와 전체 재정산 결과 비교(예수금 ffill, 투자원금 누적)
+        """
+        account_alias_id = self.acct.account_alias
+        full = Settlement.objects.settle(account_alias_id=account_alias_id, use_registered=False)
+
+        last_settle_date = self.BASE_DATES[self.LAST_SETTLE_INDEX].strftime('%Y-%m-%d')
+        registered = Settlement.objects.settle(account_alias_id=account_alias_id, to_date=last_settle_date)
+        Settlement.objects.bulk_create(registered)
+        resumed = Settlement.objects.settle(account_alias_id=account_alias_id)
+
+        self.assertEqual(len(registered), self.LAST_SETTLE_INDEX + 1)
+        self.assertEqual(len(full), len(self.BASE_DATES))
+        pd.testing.assert_frame_equal(self.to_frame(registered + resumed), self.to_frame(full))
+
+        # 예수금 변동 거래가 없는 첫 정산일: 마지막 정산 행의 예수금, 투자원금 유지
+        self.assertEqual(resumed[0].created_at.date(), self.no_cash_io_dates[0].date())
+        self.assertEqual((resumed[0].deposit, resumed[0].for_deposit), (registered[-1].deposit,
+                                                                         registered[-1].for_deposit))
+        self.assertEqual(resumed[0].base, registered[-1].base)
+
+        trades = Trade.objects.filter(account_alias=self.acct)
+        expected_base = sum(int(trade.trd_amt) for trade in trades if trade.j_name == '이체입금') \
+            - sum(int(trade.trd_amt) for trade in trades if trade.j_name == '이체출금') \
+            + sum(int(trade.for_amt_r * trade.ex_chg_rate) for trade in trades if trade.j_name == '외화입금')
+        self.assertEqual(full[-1].base, expected_base)
+
+
+class AmountHistoryRecalculateTestCase(TestCase):
+    BASE_DATES = ['2021-01-05', '2021-01-06', '2021-01-07']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.acct = Account.objects.create(vendor_code='kb', account_number='12345678901', account_type='etf')
+        cls.updated_at = datetime(2021, 1, 8, tzinfo=KST_TZ)
+        AmountHistory.objects.bulk_create([
+            AmountHistory(account_alias=cls.acct, created_at=KST_TZ.localize(datetime.strptime(base_date, '%Y-%m-%d')),
+                          updated_at=cls.updated_at, input_amt=1000, dividend_input_amt=10)
+            for base_date in cls.BASE_DATES
+        ])
+
+    def get_amount_history(self, acct, filter_kwargs=None):
+        """재정산 결과: 2일차 입금액, 3일차 입금액/배당금 변경"""
+        changes = [{}, {'input_amt': 1500.0}, {'input_amt': 900.0, 'dividend_input_amt': 12.5}]
+        return [{'created_at': pd.Timestamp(base_date), 'account_alias': acct.pk, 'input_amt': 1000.0,
+                 'dividend_input_amt': 10.0, **change}
+                for base_date, change in zip(self.BASE_DATES, changes)]
+
+    def recalculate(self, dry_run):
+        with mock.patch.object(AmountHistoryCreateSerializer, 'get_amount_history', self.get_amount_history), \
+                CaptureQueriesContext(connection) as queries:
+            summary = AmountHistoryUpdateSerializer.recalculate(
+                acct=self.acct, queryset=AmountHistory.objects.filter(account_alias=self.acct), dry_run=dry_run)
+        updates = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        return summary, updates
+
+    def get_rows(self):
+        return list(AmountHistory.objects.filter(account_alias=self.acct).order_by('created_at').values_list(
+            'input_amt', 'dividend_input_amt', 'updated_at'))
+
+    def test_recalculate(self):
+        """
+        변경 행을 한 번의 bulk_update 로 반영, 필드별 변경 행 수/증감 합계 반환
+        """
+        summary, updates = self.recalculate(dry_run=False)
+
+        self.assertEqual(summary, {
+            'updated_rows': 2,
+            'dry_run': False,
+            'fields': {'input_amt': {'rows': 2, 'delta': 400.0}, 'dividend_input_amt': {'rows': 1, 'delta': 2.5}},
+        })
+        self.assertEqual(len(updates), 1)
+
+        rows = self.get_rows()
+        self.assertEqual([row[:2] for row in rows], [(1000, 10), (1500, 10), (900, 12.5)])
+        self.assertEqual(rows[0][2], self.updated_at)
+        self.assertTrue(all(row[2] > self.updated_at for row in rows[1:]))
+
+    def test_recalculate_dry_run(self):
+        rows = self.get_rows()
+        summary, updates = self.recalculate(dry_run=True)
+
+        self.assertEqual((summary['updated_rows'], summary['dry_run']), (2, True))
+        self.assertEqual(summary['fields']['input_amt'], {'rows': 2, 'delta': 400.0})
+        self.assertEqual(updates, [])
+        self.assertEqual(self.get_rows(), rows)
+
+
+class AccountBatchTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_chunk_account_aliases(self):
+        """
+        계좌를 concurrency 개 이하 chunk 로 분할
+        """
+        chunks = chunk_account_aliases([str(i) for i in range(10)], concurrency=4)
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 3, 1])
+        self.assertEqual(chunk_account_aliases([], concurrency=4), [])
+
+    def test_run_account_chunk(self):
+        """
+        실패 계좌는 결과에 남기고 다음 계좌 처리, (계좌, 기준일) 완료 계좌는 재실행하지 않음
+        """
+        def func(account_alias):
+            if account_alias == 'fail':
+                raise ValueError('bad account')
+            return account_alias != 'skip'
+
+        result = run_account_chunk('test_task', ['ok', 'fail', 'skip'], '2021-01-04', func)
+        self.assertEqual((result['success'], result['already_done'], result['invalid'], result['fail']),
+                         (1, 0, 1, 1))
+        self.assertEqual(result['failed_accounts'], {'fail': 'bad account'})
+
+        result = run_account_chunk('test_task', ['ok', 'fail', 'skip'], '2021-01-04', func)
+        self.assertEqual((result['success'], result['already_done'], result['invalid'], result['fail']),
+                         (0, 2, 0, 1))
+
+    def test_run_account_chunk_with_retry(self):
+        """
+        실패 계좌만 재시도, 재시도 간 trial/fail 누적은 chunk 계좌 기준, 재시도 소진 시 실패 계좌를 summary 에 남김
+        """
+        calls = []
+
+        def calculate(account_alias, base_date, j_name_map):
+            calls.append(account_alias)
+            if account_alias == 'flaky' and calls.count('flaky') == 1:
+                raise ValueError('timeout')
+            if account_alias == 'broken':
+                raise ValueError('bad account')
+            return account_alias != 'invalid'
+
+        def run_chunk(account_aliases):
+            return calculate_holdings_chunk.apply(
+                kwargs={'account_aliases': account_aliases, 'base_date': '2021-01-04', 'j_name_map': {}}).get()
+
+        with mock.patch('api.bases.accounts.tasks.calculate_account_holdings', side_effect=calculate):
+            recovered = run_chunk(['ok', 'flaky', 'invalid'])
+            exhausted = run_chunk(['ok2', 'broken'])
+            rerun = run_chunk(['ok', 'flaky', 'invalid'])
+
+        self.assertEqual(calls, ['ok', 'flaky', 'invalid', 'flaky', 'ok2']
+                         + ['broken'] * (ACCOUNT_BATCH_MAX_RETRIES + 1))
+        self.assertEqual(recovered, {'trial': 3, 'success': 2, 'already_done': 0, 'invalid': 1, 'fail': 0,
+                                     'failed_accounts': {}})
+        self.assertEqual(exhausted, {'trial': 2, 'success': 1, 'already_done': 0, 'invalid': 0, 'fail': 1,
+                                     'failed_accounts': {'broken': 'bad account'}})
+        self.assertEqual((rerun['trial'], rerun['already_done']), (3, 3))
+
+        summary = summarize_account_batch.apply(
+            args=[[recovered, exhausted]], kwargs={'task_name': 'calculate_holdings', 'base_date': '2021-01-04'}
+        ).get()
+        self.assertEqual(summary, {'trial': 5, 'success': 3, 'already_done': 0, 'invalid': 1, 'fail': 1,
+                                   'failed_accounts': {'broken': 'bad account'},
+                                   'task_name': 'calculate_holdings', 'base_date': '2021-01-04'})
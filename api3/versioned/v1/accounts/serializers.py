@@ -9,6 +9,7 @@ import aiohttp
 import pandas as pd
 import pytz
 from django.conf import settings
+from django.db import transaction
 from django.db.models import Max
 from django.utils import timezone
 from rest_framework import serializers, exceptions
@@ -280,9 +281,11 @@ class AmountHistoryCreateSerializer(serializers.ModelSerializer):
 
 
 class AmountHistoryUpdateInputSerializer(serializers.ModelSerializer):
+    dry_run = serializers.BooleanField(default=False, write_only=True, help_text="반영 없이 변경 요약만 조회")
+
     class Meta:
         model = AmountHistory
-        fields = ()
+        fields = ('dry_run',)
 
 
 class AmountHistoryUpdateSerializer(serializers.ModelSerializer):
@@ -319,6 +322,53 @@ class AmountHistoryUpdateSerializer(serializers.ModelSerializer):
             (resettled_df[compare_keys].astype(float) != registered_df[compare_keys].astype(float)).any(axis=1)]
         return diffs
 
+    @classmethod
+    def recalculate(cls, acct: Account, queryset, dry_run=False) -> dict:
+        """
+        재정산 diff 를 계좌 단위로 한 번에 반영(단일 transaction, bulk_update)
+
+        - 행별 검증은 기존과 같이 serializer 로 수행
+        - 반환: 변경 행 수, 필드별 변경 행 수/증감 합계
+        - dry_run=True 이면 반영 없이 요약만 반환
+        """
+        summary = {'updated_rows': 0, 'dry_run': dry_run, 'fields': {}}
+        diffs = cls.get_diffs(acct=acct, queryset=queryset)
+        if diffs.empty:
+            return summary
+
+        with transaction.atomic():
+            if not dry_run:
+                queryset = queryset.select_for_update()
+            instances = {pd.Timestamp(instance.created_at): instance
+                         for instance in queryset.filter(created_at__in=list(diffs.index.to_pydatetime()))}
+
+            _updated_at = timezone.now()
+            updated_instances, updated_fields = [], set()
+            for i, row in diffs.iterrows():
+                instance = instances[i]
+                serializer = cls(instance, data=row.to_dict())
+                serializer.is_valid(raise_exception=True)
+
+                for k, v in serializer.validated_data.items():
+                    prev = getattr(instance, k)
+                    if prev == v:
+                        continue
+                    field_summary = summary['fields'].setdefault(k, {'rows': 0, 'delta': 0})
+                    field_summary['rows'] += 1
+                    field_summary['delta'] += float(v) - float(prev or 0)
+                    updated_fields.add(k)
+                    setattr(instance, k, v)
+                instance.updated_at = _updated_at
+                updated_instances.append(instance)
+
+            if not dry_run and updated_fields:
+                AmountHistory.objects.bulk_update(updated_instances, fields=[*sorted(updated_fields), 'updated_at'])
+
+        summary['updated_rows'] = len(updated_instances)
+        for field_summary in summary['fields'].values():
+            field_summary['delta'] = round(field_summary['delta'], 4)
+        return summary
+
     @staticmethod
     def get_kst_timestamp(timestamps: pd.DatetimeIndex):
         if timestamps.tzinfo is None:
@@ -397,6 +447,7 @@ class AmountHistoryQueueCreateSerializer(serializers.Serializer):
     account_alias_whitelist = serializers.ListField(child=serializers.CharField(max_length=128, help_text="계좌 대체번호"),
                                                     default=[])
     j_names = serializers.ListField(child=serializers.CharField(max_length=35, help_text="적요명"))
+    dry_run = serializers.BooleanField(default=False, help_text="반영 없이 변경 요약만 조회")
 
 
 class TradeAmountSerializer(serializers.Serializer):
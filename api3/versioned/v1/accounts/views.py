@@ -23,7 +23,6 @@ from api.bases.infomax.models import ClosingPrice
 from api.bases.orders.models import Event
 from common.exceptions import PreconditionFailed, ConflictException
 from common.orm_utils import bulk_create_or_update
-from common.utils import get_datetime_kst
 from common.viewsets import MappingViewSetMixin
 from .filters import (
     AccountAliasFilterSet, PeriodFilterSet,
@@ -360,13 +359,11 @@ class AmountViewSet(MappingViewSetMixin,
         if not acct.amounthistory_set.exists():
             raise PreconditionFailed("Matched AmountHistory can't find to update")
 
-        diffs = AmountHistoryUpdateSerializer.get_diffs(acct=acct, queryset=acct.amounthistory_set)
-        for i, row in diffs.iterrows():
-            instance = acct.amounthistory_set.get(account_alias=acct, created_at=get_datetime_kst(i))
-            serializer = AmountHistoryUpdateSerializer(instance, data=row.to_dict())
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-        return Response({'updated': len(diffs)})
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        summary = AmountHistoryUpdateSerializer.recalculate(acct=acct, queryset=acct.amounthistory_set,
+                                                            dry_run=serializer.validated_data['dry_run'])
+        return Response({'updated': summary['updated_rows'], **summary})
 
     def create_queue(self, request, *args, **kwargs):
         s = self.get_serializer(data=request.data)
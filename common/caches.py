@@ -0,0 +1,19 @@
+def incr(cache, key, timeout, delta=1) -> int:
+    """cache.incr, 키가 없거나 만료된 경우 timeout 으로 생성"""
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:  # 만료된 경우
+        cache.set(key, delta, timeout=timeout)
+        return delta
+
+
+def get_redis_client(cache):
+    """django-redis, django RedisCache 인 경우 redis client, 그 외 None"""
+    client = getattr(cache, "client", None)
+    if client is not None and hasattr(client, "get_client"):
+        return client.get_client(write=True)  # django-redis
+    client = getattr(cache, "_cache", None)
+    if client is not None and hasattr(client, "get_client"):
+        return client.get_client(None, write=True)  # django.core.cache RedisCache
+    return None
@@ -0,0 +1,204 @@
+import logging
+import math
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import caches
+
+from common.caches import get_redis_client, incr
+
+logger = logging.getLogger(__name__)
+
+# endpoint class
+ORDERS = "orders"
+INQUIRIES = "inquiries"
+EXCHANGE = "exchange"
+
+# {endpoint class: (capacity, refill rate per second)}, settings.BROKER_RATE_LIMITS 로 vendor 별 변경
+DEFAULT_RATE_LIMITS = {
+    ORDERS: (10, 10.0),
+    INQUIRIES: (20, 20.0),
+    EXCHANGE: (2, 2.0),
+}
+ACQUIRE_TIMEOUT = 10  # seconds
+
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_FAILURE_WINDOW = 60  # seconds
+CIRCUIT_RESET_TIMEOUT = 30  # seconds
+
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class BrokerUnavailable(RuntimeError):
+    pass
+
+
+class RateLimitExceeded(BrokerUnavailable):
+    pass
+
+
+class CircuitOpen(BrokerUnavailable):
+    pass
+
+
+class TokenBucket:
+    """
+    워커 간 공유 token bucket
+
+    Redis cache 인 경우 lua script 로 원자적으로 처리하고,
+    그 외 cache 는 초 단위 고정 윈도우(cache.add + cache.incr)로 근사
+    """
+
+    def __init__(self, key, capacity, rate, cache=None):
+        self.key = key
+        self.capacity = capacity
+        self.rate = rate
+        self.cache = cache or caches["default"]
+        self._redis = get_redis_client(self.cache)
+        self._script = (
+            self._redis.register_script(TOKEN_BUCKET_SCRIPT) if self._redis else None
+        )
+
+    def try_acquire(self) -> float:
+        """
+        :return: 0 이면 획득, 그 외 다음 시도까지 대기 시간(초)
+        """
+        now = time.time()
+        if self._script is not None:
+            return float(
+                self._script(keys=[self.key], args=[self.capacity, self.rate, now])
+            )
+
+        window_key = f"{self.key}:{int(now)}"
+        if incr(self.cache, window_key, timeout=2) <= max(int(self.rate), 1):
+            return 0.0
+        return math.ceil(now) - now
+
+    def acquire(self, timeout=ACQUIRE_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(f"rate limit exceeded: {self.key}")
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    연속 실패(5xx, timeout, 연결 오류)가 failure_threshold 를 넘으면 reset_timeout 동안 요청 차단
+    차단 해제 후 첫 요청이 실패하면 다시 차단(half-open)
+    """
+
+    def __init__(
+        self,
+        key,
+        failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+        failure_window=CIRCUIT_FAILURE_WINDOW,
+        reset_timeout=CIRCUIT_RESET_TIMEOUT,
+        cache=None,
+    ):
+        self.key = key
+        self.failure_threshold = failure_threshold
+        self.failure_window = failure_window
+        self.reset_timeout = reset_timeout
+        self.cache = cache or caches["default"]
+
+    @property
+    def failures_key(self):
+        return f"{self.key}:failures"
+
+    @property
+    def open_key(self):
+        return f"{self.key}:open"
+
+    @property
+    def is_open(self) -> bool:
+        return bool(self.cache.get(self.open_key))
+
+    def check(self):
+        if self.is_open:
+            raise CircuitOpen(f"circuit open: {self.key}")
+
+    def record_success(self):
+        self.cache.delete(self.failures_key)
+
+    def record_failure(self):
+        failures = incr(self.cache, self.failures_key, timeout=self.failure_window)
+        if failures >= self.failure_threshold:
+            logger.warning(f"circuit open: {self.key}, failures({failures})")
+            self.cache.set(self.open_key, True, timeout=self.reset_timeout)
+            self.cache.set(
+                self.failures_key,
+                self.failure_threshold - 1,
+                timeout=self.reset_timeout + self.failure_window,
+            )
+
+
+class BrokerTrafficGuard:
+    """
+    vendor_code, endpoint class 단위 rate limit + circuit breaker
+
+    usage:
+    guard = BrokerTrafficGuard(vendor_code="kb", endpoint_class=ORDERS)
+    resp = guard.call(session.post, url, json=payload, timeout=timeout)
+    """
+
+    def __init__(self, vendor_code, endpoint_class, cache=None):
+        vendor_code = str(vendor_code).lower()
+        rate_limits = {
+            **DEFAULT_RATE_LIMITS,
+            **getattr(settings, "BROKER_RATE_LIMITS", {}).get(vendor_code, {}),
+        }
+        capacity, rate = rate_limits[endpoint_class]
+        self.vendor_code = vendor_code
+        self.endpoint_class = endpoint_class
+        key = f"broker:{vendor_code}:{endpoint_class}"
+
+        self.bucket = TokenBucket(
+            key=f"{key}:bucket", capacity=capacity, rate=rate, cache=cache
+        )
+        self.breaker = CircuitBreaker(key=f"{key}:circuit", cache=cache)
+
+    def call(self, func, *args, **kwargs):
+        self.breaker.check()
+        self.bucket.acquire()
+        return self.send(func, *args, **kwargs)
+
+    def send(self, func, *args, **kwargs):
+        """요청 실행 결과로 circuit breaker 상태 갱신(rate limit 대기 시간 제외)"""
+        try:
+            resp = func(*args, **kwargs)
+        except (requests.Timeout, requests.ConnectionError):
+            self.breaker.record_failure()
+            raise
+
+        if self.is_failure(resp):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return resp
+
+    @staticmethod
+    def is_failure(resp) -> bool:
+        status_code = getattr(resp, "status_code", None)
+        return status_code is not None and status_code >= 500